@@ -0,0 +1,275 @@
+"""Class-level progress aggregates for the teacher dashboard.
+
+Three summary tables are kept up to date by MySQL triggers, so every write
+path (progress saves, registration, roster import, a student moving class)
+adjusts them by the difference between the old and the new row:
+
+    class_stats         class_name                            students
+    class_map_stats     class_name, map                       attempts, accuracy, stuck, difficulty mix
+    class_stage_stats   class_name, map_name, stage_number    stars distribution
+
+Reports read a handful of rows by primary key, so their cost depends on the
+number of maps and stages, not on the number of students. Students without
+a class are grouped under ''. ``rebuild`` recomputes everything from the base
+tables after manual data fixes (``flask --app app rebuild-aggregates``).
+"""
+
+# A student is stuck on a map after this many answers with more wrong than right
+STUCK_MIN_ANSWERS = 10
+DIFFICULTIES = ('easy', 'normal', 'hard', 'extreme')
+
+# Aggregate column -> contribution of one source row ({r} is the row alias)
+MAP_COLUMNS = {
+    'students': '1',
+    'correct': '{r}.correct',
+    'wrong': '{r}.wrong',
+    'total': '{r}.total',
+    'stuck': f'({{r}}.total >= {STUCK_MIN_ANSWERS} AND {{r}}.wrong > {{r}}.correct)',
+    **{f'on_{level}': f"({{r}}.difficulty = '{level}')" for level in DIFFICULTIES},
+}
+STAGE_COLUMNS = {
+    'players': '1',
+    'stars_total': '{r}.stars',
+    'stars_0': '({r}.stars <= 0)',
+    'stars_1': '({r}.stars = 1)',
+    'stars_2': '({r}.stars = 2)',
+    'stars_3': '({r}.stars >= 3)',
+}
+
+# (aggregate table, its key columns, source table, matching source columns, contributions)
+_SOURCES = (
+    ('class_map_stats', ('map',), 'user_game_progress', ('map',), MAP_COLUMNS),
+    ('class_stage_stats', ('map_name', 'stage_number'), 'user_progress', ('map_name', 'stage_number'), STAGE_COLUMNS),
+)
+
+_CLASS_OF = "(SELECT COALESCE(class_name, '') FROM users WHERE id = {r}.user_id)"
+
+
+def _contributions(columns, row):
+    return [expr.format(r=row) for expr in columns.values()]
+
+
+def _add_row(table, keys, columns, cls, row):
+    """Upsert one source row's contribution into the aggregate row for ``cls``."""
+    names = ('class_name',) + keys + tuple(columns)
+    values = [cls] + [f'{row}.{key}' for key in keys] + _contributions(columns, row)
+    updates = ', '.join(f'{name} = {name} + VALUES({name})' for name in columns)
+    return (f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(values)}) "
+            f"ON DUPLICATE KEY UPDATE {updates}")
+
+
+def _subtract_row(table, keys, columns, cls, row):
+    sets = ', '.join(f'{name} = {name} - {expr}' for name, expr in zip(columns, _contributions(columns, row)))
+    where = ' AND '.join([f'class_name = {cls}'] + [f'{key} = {row}.{key}' for key in keys])
+    return f"UPDATE {table} SET {sets} WHERE {where}"
+
+
+def _apply_delta(table, keys, columns, cls):
+    # Constant contributions (the row counts) cancel out
+    sets = ', '.join(f'{name} = {name} + {new} - {old}' for name, new, old
+                     in zip(columns, _contributions(columns, 'NEW'), _contributions(columns, 'OLD'))
+                     if new != old)
+    where = ' AND '.join([f'class_name = {cls}'] + [f'{key} = NEW.{key}' for key in keys])
+    return f"UPDATE {table} SET {sets} WHERE {where}"
+
+
+def _move_user(table, keys, source, source_keys, columns, cls, sign):
+    """Add (sign '+') or remove (sign '-') all of one user's rows in ``source``."""
+    if sign == '+':
+        names = ('class_name',) + keys + tuple(columns)
+        selected = [cls] + [f's.{key}' for key in source_keys] + _contributions(columns, 's')
+        updates = ', '.join(f'{name} = {name} + VALUES({name})' for name in columns)
+        return (f"INSERT INTO {table} ({', '.join(names)}) SELECT {', '.join(selected)} "
+                f"FROM {source} s WHERE s.user_id = NEW.id ON DUPLICATE KEY UPDATE {updates}")
+    sets = ', '.join(f'a.{name} = a.{name} - {expr}' for name, expr in zip(columns, _contributions(columns, 's')))
+    join = ' AND '.join(f's.{skey} = a.{key}' for key, skey in zip(keys, source_keys))
+    return (f"UPDATE {table} a JOIN {source} s ON {join} SET {sets} "
+            f"WHERE a.class_name = {cls} AND s.user_id = OLD.id")
+
+
+def _trigger(name, timing, table, declare, body):
+    statements = ''.join(f'    {statement};\n' for statement in body)
+    return (f"CREATE TRIGGER {name} {timing} ON {table} FOR EACH ROW\nBEGIN\n"
+            f"{declare}{statements}END")
+
+
+def _update_conditions(source_keys, columns):
+    """(the row still counts for the same aggregate row, no column the aggregates read changed)."""
+    watched = tuple(source_keys) + tuple(
+        column for column in ('correct', 'wrong', 'total', 'difficulty', 'stars')
+        if any(f'.{column}' in expr for expr in columns.values()))
+    same_key = ' AND '.join(f'NEW.{column} <=> OLD.{column}' for column in ('user_id',) + source_keys)
+    unchanged = ' AND '.join(f'NEW.{column} <=> OLD.{column}' for column in ('user_id',) + watched)
+    return same_key, unchanged
+
+
+def trigger_statements():
+    """DROP/CREATE statements for every aggregate trigger (safe to run again)."""
+    triggers = []
+    declare_new = f"    DECLARE cls VARCHAR(64);\n    SET cls = {_CLASS_OF.format(r='NEW')};\n"
+    declare_old = f"    DECLARE cls VARCHAR(64);\n    SET cls = {_CLASS_OF.format(r='OLD')};\n"
+    for table, keys, source, source_keys, columns in _SOURCES:
+        same_key, unchanged = _update_conditions(source_keys, columns)
+        prefix = f'trg_{source}'
+        triggers.append((f'{prefix}_insert', _trigger(
+            f'{prefix}_insert', 'AFTER INSERT', source, declare_new,
+            [f"IF cls IS NOT NULL THEN {_add_row(table, keys, columns, 'cls', 'NEW')}; END IF"])))
+        triggers.append((f'{prefix}_delete', _trigger(
+            f'{prefix}_delete', 'AFTER DELETE', source, declare_old,
+            [f"IF cls IS NOT NULL THEN {_subtract_row(table, keys, columns, 'cls', 'OLD')}; END IF"])))
+        triggers.append((f'{prefix}_update', _trigger(
+            f'{prefix}_update', 'AFTER UPDATE', source,
+            "    DECLARE cls VARCHAR(64);\n    DECLARE old_cls VARCHAR(64);\n",
+            [f"IF NOT ({unchanged}) THEN\n"
+             f"        SET cls = {_CLASS_OF.format(r='NEW')};\n"
+             f"        IF {same_key} THEN\n"
+             f"            IF cls IS NOT NULL THEN {_apply_delta(table, keys, columns, 'cls')}; END IF;\n"
+             f"        ELSE\n"
+             f"            SET old_cls = {_CLASS_OF.format(r='OLD')};\n"
+             f"            IF old_cls IS NOT NULL THEN {_subtract_row(table, keys, columns, 'old_cls', 'OLD')}; END IF;\n"
+             f"            IF cls IS NOT NULL THEN {_add_row(table, keys, columns, 'cls', 'NEW')}; END IF;\n"
+             f"        END IF;\n"
+             f"    END IF"])))
+
+    # Accounts: head counts, and moving a student's rows when their class changes
+    new_cls, old_cls = "COALESCE(NEW.class_name, '')", "COALESCE(OLD.class_name, '')"
+    triggers.append(('trg_users_insert', _trigger(
+        'trg_users_insert', 'AFTER INSERT', 'users', '',
+        [f"INSERT INTO class_stats (class_name, students) VALUES ({new_cls}, 1) "
+         "ON DUPLICATE KEY UPDATE students = students + 1"])))
+    triggers.append(('trg_users_delete', _trigger(
+        'trg_users_delete', 'AFTER DELETE', 'users', '',
+        [f"UPDATE class_stats SET students = students - 1 WHERE class_name = {old_cls}"]
+        + [_move_user(table, keys, source, source_keys, columns, old_cls, '-')
+           for table, keys, source, source_keys, columns in _SOURCES])))
+    triggers.append(('trg_users_update', _trigger(
+        'trg_users_update', 'AFTER UPDATE', 'users', '',
+        [f"IF NOT ({new_cls} <=> {old_cls}) THEN\n"
+         f"        UPDATE class_stats SET students = students - 1 WHERE class_name = {old_cls};\n"
+         f"        INSERT INTO class_stats (class_name, students) VALUES ({new_cls}, 1) "
+         "ON DUPLICATE KEY UPDATE students = students + 1;\n"
+         + ''.join(f"        {_move_user(table, keys, source, source_keys, columns, old_cls, '-')};\n"
+                   f"        {_move_user(table, keys, source, source_keys, columns, new_cls, '+')};\n"
+                   for table, keys, source, source_keys, columns in _SOURCES)
+         + "    END IF"])))
+
+    statements = []
+    for name, create in triggers:
+        statements.append(f"DROP TRIGGER IF EXISTS {name}")
+        statements.append(create)
+    return statements
+
+
+def sqlite_trigger_statements():
+    """The same triggers for the embedded SQLite backend (sqlite_db.py).
+
+    SQLite triggers have no variables or IF blocks, so each branch above is a
+    trigger of its own with a WHEN condition, and the class is looked up inline.
+    """
+    from sqlite_db import translate
+
+    triggers = []
+
+    def add(name, event, table, when, body):
+        statements = ''.join(f'    {translate(statement)[0]};\n' for statement in body)
+        triggers.append((name, f"CREATE TRIGGER {name} {event} ON {table} FOR EACH ROW\n"
+                               f"WHEN {translate(when)[0]}\nBEGIN\n{statements}END"))
+
+    new_cls, old_cls = _CLASS_OF.format(r='NEW'), _CLASS_OF.format(r='OLD')
+    for table, keys, source, source_keys, columns in _SOURCES:
+        same_key, unchanged = _update_conditions(source_keys, columns)
+        prefix = f'trg_{source}'
+        add(f'{prefix}_insert', 'AFTER INSERT', source, f'{new_cls} IS NOT NULL',
+            [_add_row(table, keys, columns, new_cls, 'NEW')])
+        add(f'{prefix}_delete', 'AFTER DELETE', source, f'{old_cls} IS NOT NULL',
+            [_subtract_row(table, keys, columns, old_cls, 'OLD')])
+        add(f'{prefix}_update', 'AFTER UPDATE', source, f'NOT ({unchanged}) AND {same_key} AND {new_cls} IS NOT NULL',
+            [_apply_delta(table, keys, columns, new_cls)])
+        add(f'{prefix}_move_out', 'AFTER UPDATE', source, f'NOT ({same_key}) AND {old_cls} IS NOT NULL',
+            [_subtract_row(table, keys, columns, old_cls, 'OLD')])
+        add(f'{prefix}_move_in', 'AFTER UPDATE', source, f'NOT ({same_key}) AND {new_cls} IS NOT NULL',
+            [_add_row(table, keys, columns, new_cls, 'NEW')])
+
+    new_cls, old_cls = "COALESCE(NEW.class_name, '')", "COALESCE(OLD.class_name, '')"
+    add('trg_users_insert', 'AFTER INSERT', 'users', 'true',
+        [f"INSERT INTO class_stats (class_name, students) VALUES ({new_cls}, 1) "
+         "ON DUPLICATE KEY UPDATE students = students + 1"])
+    add('trg_users_delete', 'AFTER DELETE', 'users', 'true',
+        [f"UPDATE class_stats SET students = students - 1 WHERE class_name = {old_cls}"]
+        + [_move_user(table, keys, source, source_keys, columns, old_cls, '-')
+           for table, keys, source, source_keys, columns in _SOURCES])
+    add('trg_users_update', 'AFTER UPDATE', 'users', f'NOT ({new_cls} <=> {old_cls})',
+        [f"UPDATE class_stats SET students = students - 1 WHERE class_name = {old_cls}",
+         f"INSERT INTO class_stats (class_name, students) VALUES ({new_cls}, 1) "
+         "ON DUPLICATE KEY UPDATE students = students + 1"]
+        + [statement for table, keys, source, source_keys, columns in _SOURCES
+           for statement in (_move_user(table, keys, source, source_keys, columns, old_cls, '-'),
+                             _move_user(table, keys, source, source_keys, columns, new_cls, '+'))])
+
+    statements = []
+    for name, create in triggers:
+        statements.append(f"DROP TRIGGER IF EXISTS {name}")
+        statements.append(create)
+    return statements
+
+
+def install_triggers(cursor):
+    for statement in trigger_statements():
+        cursor.execute(statement)
+
+
+def rebuild(cursor):
+    """Recompute every aggregate from the base tables; the caller commits."""
+    cursor.execute("DELETE FROM class_stats")
+    cursor.execute("""
+        INSERT INTO class_stats (class_name, students)
+        SELECT COALESCE(class_name, ''), COUNT(*) FROM users GROUP BY COALESCE(class_name, '')
+    """)
+    for table, keys, source, source_keys, columns in _SOURCES:
+        cursor.execute(f"DELETE FROM {table}")
+        group = ["COALESCE(u.class_name, '')"] + [f's.{key}' for key in source_keys]
+        sums = [f'SUM({expr})' for expr in _contributions(columns, 's')]
+        cursor.execute(
+            f"INSERT INTO {table} (class_name, {', '.join(keys)}, {', '.join(columns)}) "
+            f"SELECT {', '.join(group + sums)} FROM {source} s JOIN users u ON u.id = s.user_id "
+            f"GROUP BY {', '.join(group)}"
+        )
+
+
+# --- Reports (aggregate tables only) ---
+
+def classes(cursor):
+    cursor.execute("SELECT class_name, students FROM class_stats WHERE students > 0 ORDER BY class_name")
+    return [{'class_name': row['class_name'], 'students': row['students']} for row in cursor.fetchall()]
+
+
+def class_summary(cursor, class_name):
+    """Per-map and per-stage figures for one class, as plain dicts for JSON."""
+    cursor.execute("SELECT students FROM class_stats WHERE class_name = %s", (class_name,))
+    row = cursor.fetchone()
+    summary = {'class_name': class_name, 'students': row['students'] if row else 0, 'maps': {}}
+
+    cursor.execute("SELECT * FROM class_map_stats WHERE class_name = %s ORDER BY map", (class_name,))
+    for row in cursor.fetchall():
+        summary['maps'][row['map']] = {
+            'students': row['students'],
+            'correct': row['correct'],
+            'wrong': row['wrong'],
+            'attempts': row['total'],
+            'accuracy': round(row['correct'] / row['total'], 3) if row['total'] else None,
+            'stuck': row['stuck'],
+            'difficulty': {level: row[f'on_{level}'] for level in DIFFICULTIES},
+            'stages': {},
+        }
+
+    cursor.execute("""
+        SELECT * FROM class_stage_stats WHERE class_name = %s ORDER BY map_name, stage_number
+    """, (class_name,))
+    for row in cursor.fetchall():
+        stages = summary['maps'].setdefault(row['map_name'], {'stages': {}})['stages']
+        stages[row['stage_number']] = {
+            'players': row['players'],
+            'average_stars': round(row['stars_total'] / row['players'], 2) if row['players'] else None,
+            'stars': [row['stars_0'], row['stars_1'], row['stars_2'], row['stars_3']],
+        }
+    return summary
@@ -0,0 +1,100 @@
+"""Worker cold start: how long a fresh process takes to serve its first request.
+
+    python benchmarks/coldstart.py --runs 10
+    python benchmarks/coldstart.py --importtime      # also list the slowest imports
+
+Each run is a new Python process (as a gunicorn worker or a serverless
+instance would be) that imports ``app``, calls ``create_app()`` and sends one
+request through the test client; the parent reports the median and worst of
+each phase. The default request, GET /login, renders a template without
+touching MySQL or the LLM, so no server is needed; ``--path`` picks another
+one (anything that queries needs the DB_* settings of a reachable database).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+response = application.test_client().get(sys.argv[1])
+served = time.perf_counter()
+print(json.dumps({
+    'import': imported - started, 'create_app': created - imported,
+    'first_request': served - created, 'status': response.status_code,
+    'modules': len(sys.modules),
+}))
+"""
+
+PHASES = ('import', 'create_app', 'first_request')
+
+
+def run_once(path, env):
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD, path], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - started
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process'] = wall
+    return result
+
+
+def slowest_imports(env, top):
+    """The modules ``app`` imports directly, by cumulative time from ``python -X importtime``."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stderr
+    children, totals = [], []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # A module's own imports are printed (one level deeper) before it
+        if depth == 1:
+            children.append((name.strip(), int(cumulative)))
+        elif depth == 0:
+            if name.strip() == 'app':
+                totals = children
+            children = []
+    return sorted(totals, key=lambda item: item[1], reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/login', help='first request to send')
+    parser.add_argument('--importtime', action='store_true', help="list the slowest of app's imports")
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args(argv)
+
+    # Keep the snapshot autosave and log writer quiet; nothing else is configured here
+    env = dict(os.environ, LOG_LEVEL=os.getenv('LOG_LEVEL', 'WARNING'), PYTHONDONTWRITEBYTECODE='')
+    run_once(args.path, env)   # warm the bytecode and OS file caches
+
+    runs = [run_once(args.path, env) for _ in range(args.runs)]
+    print(f"{args.runs} runs, GET {args.path} -> {runs[0]['status']}, {runs[0]['modules']} modules loaded")
+    print(f"{'phase':<16}{'median ms':>10}{'max ms':>10}")
+    for phase in PHASES + ('process',):
+        values = [run[phase] * 1000 for run in runs]
+        print(f"{phase:<16}{statistics.median(values):>10.1f}{max(values):>10.1f}")
+
+    if args.importtime:
+        print(f"\n{'imported by app (cumulative)':<40}{'ms':>8}")
+        for name, micros in slowest_imports(env, args.top):
+            print(f"{name:<40}{micros / 1000:>8.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Synthetic players at scale, for sizing hardware and the other benchmarks.
+
+    docker compose -f benchmarks/docker-compose.yml up -d
+    python benchmarks/datagen.py --users 1000000                 # the benchmark MySQL (--db-* options)
+    python benchmarks/datagen.py --users 200000 --sqlite instance/scale.db
+    python benchmarks/datagen.py --users 1000000 --documents     # also the PROGRESS_STORAGE=document rows
+
+Fills every player table the way the game would have: users (in classes of
+--class-size), a user_game_progress row per map and the default skin as
+provisioning creates them, then stars, counters, stage rewards, map skins and
+tutorials. Players follow the roadmap in order. How far each one gets, their
+stars, accuracy and difficulty come from a per-player skill and persistence,
+so most are early on and a few finish every map. Activity is spread over
+--days from --start.
+
+Player n's rows depend only on --seed and n, so the same seed gives the same
+data on MySQL and on SQLite, whatever the batch size. A run stopped halfway
+continues where it stopped (the ``--prefix`` players already there are kept).
+Rows are written --batch players at a time, one transaction and one
+executemany per table. mysql.connector sends those as multi-row INSERTs. The
+class aggregate triggers are dropped during the load, and the aggregates are
+rebuilt and the triggers installed again at the end, which also happens if
+a stopped run is started again. Run it against a benchmark database, not one
+the app is using. Delete instance/leaderboards.json afterwards, so the
+leaderboards are rebuilt from the new rows.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from catalogue import DEFAULT_SKIN, MAPS, TUTORIAL_KEYS, reward_data, skin_code_mapping  # noqa: E402
+
+FIRST_NAMES = ('Ana', 'Ben', 'Lia', 'Noah', 'Ivy', 'Sam', 'Mia', 'Leo', 'Zoe', 'Eli', 'Ava', 'Kai', 'Nina', 'Theo')
+LAST_NAMES = ('Cruz', 'Reyes', 'Santos', 'Garcia', 'Lim', 'Tan', 'Dela Cruz', 'Mendoza', 'Ramos', 'Bautista')
+MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+          'November', 'December')
+DIFFICULTIES = ('easy', 'normal', 'hard', 'extreme')
+
+INSERTS = {
+    'users': "INSERT INTO users (id, username, first_name, last_name, birth_day, birth_month, birth_year, "
+             "gender, password, role, class_name) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'student', %s)",
+    'user_game_progress': "INSERT INTO user_game_progress (user_id, map, stage_key, correct, wrong, total, "
+                          "difficulty, updated_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+    'user_progress': "INSERT INTO user_progress (user_id, map_name, stage_number, stars, updated_at) "
+                     "VALUES (%s, %s, %s, %s, %s)",
+    'stage_rewards_claimed': "INSERT INTO stage_rewards_claimed (user_id, map_name, stage_number, claimed, "
+                             "updated_at) VALUES (%s, %s, %s, 1, %s)",
+    'user_skins': "INSERT INTO user_skins (user_id, skin_code, map, claimed, equipped, updated_at) "
+                  "VALUES (%s, %s, %s, 1, %s, %s)",
+    'user_tutorials': "INSERT INTO user_tutorials (user_id, tutorial_key, completed, completed_at) "
+                      "VALUES (%s, %s, 1, %s)",
+}
+
+
+def player(args, index, user_id, password):
+    """table -> rows of player ``index`` (deterministic in --seed and index)."""
+    rng = random.Random(f'{args.seed}:{index}')
+    skill = rng.betavariate(2.5, 2)          # accuracy and stars
+    persistence = rng.betavariate(2, 1.5)    # how far along the roadmap
+    joined = args.start + datetime.timedelta(minutes=rng.randrange(args.days * 24 * 60))
+    when = joined
+
+    def later():
+        nonlocal when
+        when += datetime.timedelta(minutes=rng.randint(3, 60 * 24))
+        return when
+
+    rows = {table: [] for table in INSERTS}
+    rows['users'].append((
+        user_id, f'{args.prefix}{index:07d}', rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+        rng.randint(1, 28), rng.choice(MONTHS), rng.randint(2013, 2018), rng.choice(('male', 'female')),
+        password, f'{args.prefix}class{index // args.class_size:05d}'))
+
+    claimed_skins = []
+    playing = True
+    for map_name in MAPS:
+        stages = sorted(reward_data[map_name])
+        # Stages cleared on this map; a player stops somewhere along the roadmap
+        cleared = 0
+        while playing and cleared < len(stages) and rng.random() < 0.55 + 0.45 * persistence:
+            cleared += 1
+        playing = playing and cleared == len(stages)
+        if not cleared:
+            rows['user_game_progress'].append((user_id, map_name, '1', 0, 0, 0, 'easy', joined))
+            continue
+
+        for stage in stages[:cleared]:
+            stars = 1 + (rng.random() < skill) + (rng.random() < skill * skill)
+            at = later()
+            rows['user_progress'].append((user_id, map_name, stage, stars, at))
+            if rng.random() < 0.85:
+                rows['stage_rewards_claimed'].append((user_id, map_name, stage, at))
+        total = sum(rng.randint(10, 40) for _ in range(cleared))
+        accuracy = min(0.98, max(0.2, rng.gauss(0.35 + 0.6 * skill, 0.08)))
+        correct = round(total * accuracy)
+        difficulty = DIFFICULTIES[min(3, int(skill * 4 * rng.uniform(0.6, 1.2)))]
+        rows['user_game_progress'].append((user_id, map_name, f'stage{min(cleared + 1, len(stages))}',
+                                           correct, total - correct, total, difficulty, when))
+        if cleared == len(stages) and rng.random() < 0.75:
+            claimed_skins.append((skin_code_mapping[map_name], map_name, later()))
+
+    equipped = claimed_skins[-1][0] if claimed_skins and rng.random() < 0.6 else DEFAULT_SKIN
+    rows['user_skins'].append((user_id, DEFAULT_SKIN, None, int(equipped == DEFAULT_SKIN), joined))
+    rows['user_skins'] += [(user_id, code, map_name, int(equipped == code), at)
+                           for code, map_name, at in claimed_skins]
+
+    # Tutorials in the order the pages are first met
+    seen = 1 + sum(rng.random() < 0.5 + 0.5 * persistence for _ in TUTORIAL_KEYS[1:])
+    rows['user_tutorials'] += [(user_id, key, joined + datetime.timedelta(minutes=i * rng.randint(1, 90)))
+                               for i, key in enumerate(TUTORIAL_KEYS[:seen])]
+    return rows
+
+
+def connect(args):
+    import database
+
+    if args.sqlite:
+        os.environ['DB_SQLITE_PATH'] = args.sqlite
+    else:
+        os.environ.pop('DB_SQLITE_PATH', None)
+        os.environ.update(DB_HOST=args.db_host, DB_PORT=str(args.db_port), DB_USER=args.db_user,
+                          DB_PASSWORD=args.db_password, DB_DATABASE=args.db_name)
+    return database.connect(**database.settings())
+
+
+def trigger_statements(args):
+    import analytics
+
+    return analytics.sqlite_trigger_statements() if args.sqlite else analytics.trigger_statements()
+
+
+def generate(args):
+    import analytics
+    import migrate
+    import progress_doc
+    from flask_bcrypt import generate_password_hash
+
+    cnx = connect(args)
+    migrate.upgrade(cnx, out=lambda line: None)
+    cursor = cnx.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users WHERE username LIKE %s", (args.prefix + '%',))
+    have = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+    next_id = cursor.fetchone()[0] + 1
+    # One hash for every account: bcrypt per player would take longer than the rest
+    password = generate_password_hash(args.password).decode('utf-8')
+
+    for statement in trigger_statements(args):
+        if statement.startswith('DROP TRIGGER'):
+            cursor.execute(statement)
+    cnx.commit()
+
+    counts = dict.fromkeys(INSERTS, 0)
+    started = time.perf_counter()
+    for start in range(have, args.users, args.batch):
+        batch = {table: [] for table in INSERTS}
+        indexes = range(start, min(start + args.batch, args.users))
+        for index in indexes:
+            for table, rows in player(args, index, next_id + index - have, password).items():
+                batch[table] += rows
+        for table, rows in batch.items():
+            if rows:
+                cursor.executemany(INSERTS[table], rows)
+                counts[table] += len(rows)
+        if args.documents:
+            ids = [next_id + index - have for index in indexes]
+            progress_doc.store_many(cursor, progress_doc.build_many(cursor, ids))
+        cnx.commit()
+        done = indexes.stop
+        rate = (done - have) / (time.perf_counter() - started)
+        print(f"  users {done}/{args.users}  {rate:,.0f} players/s", end='\r', flush=True)
+    elapsed = time.perf_counter() - started
+    print(f"generated {args.users - have} players in {elapsed:.1f}s ({have} were already there)" + ' ' * 20)
+    print('  ' + ', '.join(f"{table} {count:,}" for table, count in counts.items()))
+
+    started = time.perf_counter()
+    analytics.rebuild(cursor)
+    for statement in trigger_statements(args):
+        cursor.execute(statement)
+    cnx.commit()
+    print(f"class aggregates rebuilt and triggers installed in {time.perf_counter() - started:.1f}s")
+    cursor.close()
+    cnx.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000, help='players in total (with the ones already there)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--prefix', default='syn_', help='username prefix of the generated players')
+    parser.add_argument('--class-size', type=int, default=30)
+    parser.add_argument('--batch', type=int, default=1000, help='players per transaction')
+    parser.add_argument('--start', type=datetime.datetime.fromisoformat, default=datetime.datetime(2025, 1, 6, 8, 0),
+                        help='first day of activity (ISO date)')
+    parser.add_argument('--days', type=int, default=120, help='days over which players join')
+    parser.add_argument('--password', default='password', help='password of every generated account')
+    parser.add_argument('--documents', action='store_true', help='also build user_progress_docs (progress_doc.py)')
+    parser.add_argument('--sqlite', help='write to this SQLite file (DB_SQLITE_PATH) instead of MySQL')
+    parser.add_argument('--db-host', default=os.getenv('BENCH_DB_HOST', '127.0.0.1'))
+    parser.add_argument('--db-port', type=int, default=int(os.getenv('BENCH_DB_PORT', '3307')))
+    parser.add_argument('--db-user', default=os.getenv('BENCH_DB_USER', 'root'))
+    parser.add_argument('--db-password', default=os.getenv('BENCH_DB_PASSWORD', 'bench'))
+    parser.add_argument('--db-name', default=os.getenv('BENCH_DB_NAME', 'thesis_bench'))
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('SLOW_QUERY_MS', '100000')   # the rebuild is slow on purpose
+    generate(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
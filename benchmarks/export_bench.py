@@ -0,0 +1,152 @@
+"""Throughput and memory of the streaming exports on a large synthetic cohort.
+
+    docker compose -f benchmarks/docker-compose.yml up -d
+    python benchmarks/export_bench.py --rows 1000000          # seed once, then measure
+    python benchmarks/export_bench.py --skip-seed --buffered --memory
+
+Seeding creates ``export_*`` students through provisioning (so they get the
+usual default rows) and then fills user_progress for every map and stage with
+one INSERT ... SELECT on the server. The measurement runs exports.stream in
+this process, the same generator the /teacher/export endpoint sends, and
+reports time to first chunk, rows/s and MB/s; ``--memory`` repeats each export
+under tracemalloc for the peak Python allocation. ``--buffered`` adds the
+fetch-everything-first equivalent for comparison.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import exports  # noqa: E402
+from catalogue import MAPS  # noqa: E402
+
+USER_PREFIX = 'export_'
+STAGES = (1, 2, 3)
+CLASSES = 40
+
+
+def connect(args):
+    import mysql.connector
+
+    return mysql.connector.connect(host=args.db_host, port=args.db_port, user=args.db_user,
+                                   password=args.db_password, database=args.db_name)
+
+
+def seed(args):
+    import migrate
+    import provisioning
+
+    cnx = connect(args)
+    migrate.upgrade(cnx)
+    cursor = cnx.cursor()
+    users = -(-args.rows // (len(MAPS) * len(STAGES)))
+    cursor.execute("SELECT COUNT(*) FROM users WHERE username LIKE %s", (USER_PREFIX + '%',))
+    have = cursor.fetchone()[0]
+    started = time.perf_counter()
+    for start in range(have, users, 5000):
+        provisioning.provision_users(cursor, [
+            {'username': f'{USER_PREFIX}{i:07d}', 'first_name': 'Export', 'last_name': 'Student',
+             'birth_day': 1, 'birth_month': 'January', 'birth_year': 2017, 'gender': 'female',
+             'password': 'x', 'class_name': f'Class {i % CLASSES:02d}'}
+            for i in range(start, min(start + 5000, users))
+        ])
+        cnx.commit()
+        print(f"  users {min(start + 5000, users)}/{users}", end='\r', flush=True)
+
+    maps = ' UNION ALL '.join(['SELECT %s AS map_name'] * len(MAPS))
+    stages = ' UNION ALL '.join(['SELECT %s AS stage_number'] * len(STAGES))
+    cursor.execute(f"""
+        INSERT IGNORE INTO user_progress (user_id, map_name, stage_number, stars)
+        SELECT u.id, m.map_name, s.stage_number, (u.id + s.stage_number) % 4
+        FROM users u CROSS JOIN ({maps}) m CROSS JOIN ({stages}) s
+        WHERE u.username LIKE %s
+    """, [*MAPS, *STAGES, USER_PREFIX + '%'])
+    cnx.commit()
+    cursor.execute("SELECT COUNT(*) FROM user_progress p JOIN users u ON u.id = p.user_id "
+                   "WHERE u.username LIKE %s", (USER_PREFIX + '%',))
+    print(f"seeded {cursor.fetchone()[0]} user_progress rows for {users} students "
+          f"in {time.perf_counter() - started:.1f}s")
+    cnx.close()
+
+
+def streamed(args, dataset, fmt, **filters):
+    """exports.stream on a connection of its own, closed afterwards as the endpoint's response does."""
+    connection = connect(args)
+    try:
+        yield from exports.stream(connection, dataset, fmt, **filters)
+    finally:
+        connection.close()
+
+
+def buffered_stream(connection, dataset, fmt, **filters):
+    """What a naive export does: fetch every row, then encode."""
+    sql, params, columns = exports.build_query(dataset, **filters)
+    cursor = connection.cursor(buffered=True)
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    encode = exports.csv_chunks if fmt == 'csv' else exports.ndjson_chunks
+    yield from encode(columns, rows)
+    connection.close()
+
+
+def consume(chunks):
+    started = time.perf_counter()
+    first = None
+    size = lines = 0
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - started
+        size += len(chunk)
+        lines += chunk.count('\n')
+    return lines, size, time.perf_counter() - started, first or 0.0
+
+
+def measure(label, make_chunks, trace):
+    lines, size, seconds, first = consume(make_chunks())
+    peak = ''
+    if trace:
+        # Separate pass: tracemalloc slows allocation-heavy code several times over
+        tracemalloc.start()
+        consume(make_chunks())
+        peak = f"{tracemalloc.get_traced_memory()[1] / 1e6:.1f}"
+        tracemalloc.stop()
+    print(f"{label:<22}{lines:>10}{seconds:>9.2f}{lines / seconds:>11.0f}"
+          f"{size / seconds / 1e6:>8.1f}{first * 1000:>10.1f}{peak:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-host', default=os.getenv('BENCH_DB_HOST', '127.0.0.1'))
+    parser.add_argument('--db-port', type=int, default=int(os.getenv('BENCH_DB_PORT', '3307')))
+    parser.add_argument('--db-user', default=os.getenv('BENCH_DB_USER', 'root'))
+    parser.add_argument('--db-password', default=os.getenv('BENCH_DB_PASSWORD', 'bench'))
+    parser.add_argument('--db-name', default=os.getenv('BENCH_DB_NAME', 'thesis_bench'))
+    parser.add_argument('--rows', type=int, default=1_000_000, help='user_progress rows to seed')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the rows of an earlier run')
+    parser.add_argument('--dataset', default='stage-progress', choices=sorted(exports.DATASETS))
+    parser.add_argument('--class', dest='class_name', help='export one class only')
+    parser.add_argument('--buffered', action='store_true', help='also measure fetchall() + encode')
+    parser.add_argument('--memory', action='store_true', help='repeat each export under tracemalloc for the peak')
+    args = parser.parse_args(argv)
+
+    if not args.skip_seed:
+        seed(args)
+
+    filters = {'class_name': args.class_name}
+    print(f"{'export':<22}{'lines':>10}{'seconds':>9}{'rows/s':>11}{'MB/s':>8}{'first ms':>10}{'peak MB':>10}")
+    for fmt in exports.FORMATS:
+        measure(f"stream {fmt}", lambda: streamed(args, args.dataset, fmt, **filters), args.memory)
+        if args.buffered:
+            measure(f"buffered {fmt}", lambda: buffered_stream(connect(args), args.dataset, fmt, **filters),
+                    args.memory)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,439 @@
+"""Classroom load test for app.py.
+
+Boots the app against a local MySQL stand-in (see docker-compose.yml in this
+folder) and a stub LLM server, then lets N virtual students log in at once and
+play through roadmap -> stages -> game, saving answers, claiming rewards and
+chatting with Counticus. Reports p50/p95/p99 latency and throughput per
+endpoint and can compare the run with a stored baseline.
+
+    docker compose -f benchmarks/docker-compose.yml up -d
+    python benchmarks/loadtest.py --concurrency 30 --duration 60 \\
+        --save-baseline benchmarks/baselines/sync-30.json
+    python benchmarks/loadtest.py --concurrency 30 --duration 60 \\
+        --baseline benchmarks/baselines/sync-30.json   # exit 1 on regression
+
+Use --url to target an app that is already running instead of booting one,
+and --server-cmd to boot it some other way. --profile sync|gevent boots it
+under gunicorn with that profile of gunicorn.conf.py instead of flask run.
+
+Capacity: --ramp 50,100,200,400 repeats the measurement at each concurrency
+against the same server and reports the highest one whose p95 stays within
+--slo-ms without errors. --scenario chat only plays the LLM-backed chat turns
+(no login, no MySQL needed), which isolates the cost of waiting on the model:
+
+    python benchmarks/loadtest.py --scenario chat --profile sync --ramp 10,25,50,100,200
+    python benchmarks/loadtest.py --scenario chat --profile gevent --ramp 10,25,50,100,200
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+import stub_llm
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from catalogue import MAPS  # noqa: E402
+
+USER_PREFIX = 'bench_'
+PASSWORD = 'bench-password'
+
+DEFAULT_SERVER_CMD = (
+    '{python} -m flask --app app run --host 127.0.0.1 --port {port} '
+    '--no-reload --no-debugger --with-threads'
+)
+GUNICORN_SERVER_CMD = '{python} -m gunicorn -c gunicorn.conf.py --bind 127.0.0.1:{port} app:create_app()'
+
+
+# --- Database stand-in ---
+
+def db_settings(args):
+    return dict(host=args.db_host, port=args.db_port, user=args.db_user,
+                password=args.db_password, database=args.db_name)
+
+
+def prepare_database(args):
+    """Apply the schema migrations and (re)create the benchmark students."""
+    import bcrypt
+    import mysql.connector
+    import migrate
+    import provisioning
+
+    cnx = mysql.connector.connect(**db_settings(args))
+    migrate.upgrade(cnx)
+    cursor = cnx.cursor()
+
+    cursor.execute("SELECT id FROM users WHERE username LIKE %s", (USER_PREFIX + '%',))
+    old_ids = [row[0] for row in cursor.fetchall()]
+    if old_ids:
+        marks = ', '.join(['%s'] * len(old_ids))
+        for table in ('user_progress', 'user_game_progress', 'user_skins',
+                      'stage_rewards_claimed', 'user_tutorials'):
+            cursor.execute(f"DELETE FROM {table} WHERE user_id IN ({marks})", old_ids)
+        cursor.execute(f"DELETE FROM users WHERE id IN ({marks})", old_ids)
+
+    # One hash for everybody: the benchmark is not about bcrypt at setup time
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt()).decode()
+    usernames = [f'{USER_PREFIX}{i:05d}' for i in range(args.users)]
+    provisioning.provision_users(cursor, [
+        {'username': name, 'first_name': 'Bench', 'last_name': 'Student', 'birth_day': 1,
+         'birth_month': 'January', 'birth_year': 2018, 'gender': 'male', 'password': hashed}
+        for name in usernames
+    ])
+    cnx.commit()
+    cnx.close()
+    return usernames
+
+
+# --- App process ---
+
+def boot_app(args, llm_url):
+    env = dict(os.environ)
+    env.update({
+        'DB_HOST': args.db_host, 'DB_PORT': str(args.db_port),
+        'DB_USER': args.db_user, 'DB_PASSWORD': args.db_password,
+        'DB_DATABASE': args.db_name, 'DB_NAME': args.db_name,
+        'LLM_API_BASE': llm_url, 'LLM_API_KEY': 'stub', 'LOG_LEVEL': 'WARNING', 'LOG_LEVELS': 'werkzeug=WARNING',
+        # Every virtual student comes from this address; the limits are not what is measured
+        'LOGIN_RATE_LIMIT': '', 'CHAT_RATE_LIMIT': '',
+    })
+    if args.profile != 'flask':
+        env['GUNICORN_PROFILE'] = args.profile
+    if args.replicas:
+        env['DB_REPLICA_HOSTS'] = args.replicas
+    command = args.server_cmd.format(python=shlex.quote(sys.executable), port=args.port)
+    process = subprocess.Popen(shlex.split(command), cwd=ROOT, env=env)
+    base_url = f'http://127.0.0.1:{args.port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"app exited during startup with code {process.returncode}")
+        try:
+            urllib.request.urlopen(base_url + '/login', timeout=1).read()
+            return process, base_url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("app did not start within 30 seconds")
+
+
+# --- Virtual students ---
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}   # name -> [latency seconds]
+        self.errors = {}    # name -> count
+        self.recording = False
+
+    def add(self, name, seconds, ok, always=False):
+        if not (self.recording or always):
+            return
+        with self.lock:
+            self.samples.setdefault(name, []).append(seconds)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+class Student(threading.Thread):
+    def __init__(self, base_url, username, recorder, start_barrier, stop_at, rng, args):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.username = username
+        self.recorder = recorder
+        self.start_barrier = start_barrier
+        self.stop_at = stop_at
+        self.rng = rng
+        self.args = args
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.counters = {name: [0, 0, 0] for name in MAPS}
+
+    def call(self, name, path, json_body=None, form=None, always=False):
+        data, headers = None, {}
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode()
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers,
+                                         method=name.split()[0])
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                body = response.read()
+                ok = response.status < 400
+        except urllib.error.HTTPError as error:
+            body, ok = error.read(), False
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            body, ok = b'', False
+        self.recorder.add(name, time.perf_counter() - start, ok, always)
+        if self.args.think_ms:
+            time.sleep(self.rng.uniform(0, self.args.think_ms) / 1000)
+        try:
+            return json.loads(body) if body[:1] in (b'{', b'[') else None
+        except ValueError:
+            return None
+
+    def run(self):
+        self.start_barrier.wait()
+        if self.args.scenario == 'chat':
+            while time.monotonic() < self.stop_at:
+                self.chat(llm=True)
+            return
+        # The login burst happens during warm-up but is always recorded
+        self.call('POST /login', '/login', form={'username': self.username, 'password': PASSWORD}, always=True)
+        while time.monotonic() < self.stop_at:
+            self.journey()
+
+    def journey(self):
+        rng = self.rng
+        self.call('GET /dashboard', '/dashboard')
+        self.call('GET /roadmap', '/roadmap')
+        self.call('GET /get_stage_progress', '/get_stage_progress')
+
+        map_name = rng.choice(MAPS)
+        stage = rng.randint(1, 3)
+        self.call('GET /stages', f'/stages?map={map_name}')
+        self.call('GET /get_stage_progress', f'/get_stage_progress?map={map_name}')
+        self.call('GET /has_claimed_skin', f'/has_claimed_skin?map={map_name}')
+
+        self.call('GET /game', f'/game?map={map_name}&stage={stage}')
+        self.call('GET /get-progress', '/get-progress')
+        self.call('GET /get-difficulty', f'/get-difficulty?map={map_name}')
+        self.call('GET /get_stage_reward', f'/get_stage_reward?map={map_name}&stage={stage}')
+
+        counters = self.counters[map_name]
+        for _ in range(rng.randint(3, 10)):
+            counters[0 if rng.random() < 0.75 else 1] += 1
+            counters[2] += 1
+            self.call('POST /save-game-progress', '/save-game-progress', json_body={
+                'map': map_name, 'stage': stage, 'correctAnswersCount': counters[0],
+                'wrongAnswersCount': counters[1], 'totalQuestionsAnswered': counters[2],
+                'difficulty': 'easy',
+            })
+        self.call('POST /save_progress', '/save_progress',
+                  json_body={'map': map_name, 'stage': stage, 'stars': rng.randint(1, 3)})
+
+        claimed = self.call('POST /check_reward_claimed', '/check_reward_claimed',
+                            json_body={'map': map_name, 'stage': stage})
+        if not (claimed or {}).get('claimed'):
+            self.call('POST /claim_reward', '/claim_reward', json_body={'map': map_name, 'stage': stage})
+        self.call('GET /get_user_skins', '/get_user_skins')
+
+        if rng.random() < self.args.chat_ratio:
+            self.chat()
+
+    def chat(self, llm=None):
+        rng = self.rng
+        self.call('POST /reset-chat-session', '/reset-chat-session')
+        if llm is None:
+            llm = rng.random() >= 0.5
+        if not llm:
+            # Small numbers: tip + emoji explanation, no LLM
+            a, b = rng.randint(1, 9), rng.randint(1, 9)
+            self.call('POST /chatbot-api', '/chatbot-api', json_body={'message': f'what is {a} + {b}'})
+            self.call('POST /chatbot-api', '/chatbot-api', json_body={'message': 'yes'})
+            self.call('POST /chatbot-api', '/chatbot-api', json_body={'message': str(a + b)})
+        else:
+            # Big numbers: step-by-step and full solution come from the LLM
+            a, b = rng.randint(30, 90), rng.randint(30, 90)
+            self.call('POST /chatbot-api', '/chatbot-api', json_body={'message': f'what is {a} plus {b}'})
+            self.call('POST /chatbot-api (llm)', '/chatbot-api', json_body={'message': 'yes'})
+            self.call('POST /chatbot-api', '/chatbot-api', json_body={'message': '1'})
+            self.call('POST /chatbot-api (llm)', '/chatbot-api', json_body={'message': 'yes'})
+
+
+# --- Reporting ---
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarise(recorder, elapsed):
+    endpoints = {}
+    for name, values in sorted(recorder.samples.items()):
+        values = sorted(values)
+        endpoints[name] = {
+            'count': len(values),
+            'errors': recorder.errors.get(name, 0),
+            'rps': round(len(values) / elapsed, 2),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        }
+    total = sum(e['count'] for e in endpoints.values())
+    every = sorted(value for values in recorder.samples.values() for value in values)
+    return {'elapsed_s': round(elapsed, 2), 'requests': total,
+            'rps': round(total / elapsed, 2),
+            'p95_ms': round(percentile(every, 0.95) * 1000, 2) if every else 0.0,
+            'errors': sum(recorder.errors.values()), 'endpoints': endpoints}
+
+
+def print_report(report):
+    print(f"\n{'endpoint':<32}{'count':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, e in report['endpoints'].items():
+        print(f"{name:<32}{e['count']:>8}{e['errors']:>6}{e['rps']:>9.1f}"
+              f"{e['p50_ms']:>10.1f}{e['p95_ms']:>10.1f}{e['p99_ms']:>10.1f}")
+    print(f"\n{report['requests']} requests in {report['elapsed_s']} s = {report['rps']} req/s")
+
+
+def compare(report, baseline, tolerance, min_delta_ms):
+    """Return a list of human readable regressions against ``baseline``."""
+    regressions = []
+    for name, base in baseline['endpoints'].items():
+        current = report['endpoints'].get(name)
+        if current is None:
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            limit = base[key] * (1 + tolerance)
+            if current[key] > limit and current[key] - base[key] > min_delta_ms:
+                regressions.append(f"{name} {key}: {current[key]:.1f} ms > {base[key]:.1f} ms baseline")
+    if report['rps'] < baseline['rps'] * (1 - tolerance):
+        regressions.append(f"throughput: {report['rps']} req/s < {baseline['rps']} req/s baseline")
+    return regressions
+
+
+def run_level(base_url, usernames, concurrency, args):
+    """Let ``concurrency`` students loose for warm-up + duration; returns the summary."""
+    recorder = Recorder()
+    barrier = threading.Barrier(concurrency)
+    stop_at = time.monotonic() + args.warmup + args.duration
+    students = [
+        Student(base_url, usernames[i], recorder, barrier, stop_at, random.Random(args.seed * 100003 + i), args)
+        for i in range(concurrency)
+    ]
+    for student in students:
+        student.start()
+    time.sleep(args.warmup)
+    recorder.recording = True
+    started = time.monotonic()
+    for student in students:
+        student.join()
+    return summarise(recorder, time.monotonic() - started)
+
+
+def print_ramp(levels, slo_ms):
+    print(f"\n{'students':>9}{'req/s':>9}{'p95 ms':>10}{'errors':>8}  within SLO")
+    capacity = 0
+    for level in levels:
+        ok = level['p95_ms'] <= slo_ms and not level['errors']
+        if ok:
+            capacity = max(capacity, level['concurrency'])
+        print(f"{level['concurrency']:>9}{level['rps']:>9.1f}{level['p95_ms']:>10.1f}{level['errors']:>8}  "
+              f"{'yes' if ok else 'no'}")
+    print(f"\ncapacity: {capacity} concurrent students with p95 <= {slo_ms:.0f} ms and no errors")
+    return capacity
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='benchmark an already running app instead of booting one')
+    parser.add_argument('--server-cmd', help='command used to boot the app; {python} and {port} are substituted '
+                                             '(default: flask run, or gunicorn with --profile sync/gevent)')
+    parser.add_argument('--profile', choices=('flask', 'sync', 'gevent'), default='flask',
+                        help='boot under flask run or gunicorn.conf.py with this GUNICORN_PROFILE')
+    parser.add_argument('--scenario', choices=('journey', 'chat'), default='journey',
+                        help='full student journeys, or LLM chat turns only (no MySQL needed)')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--db-host', default=os.getenv('BENCH_DB_HOST', '127.0.0.1'))
+    parser.add_argument('--db-port', type=int, default=int(os.getenv('BENCH_DB_PORT', '3307')))
+    parser.add_argument('--db-user', default=os.getenv('BENCH_DB_USER', 'root'))
+    parser.add_argument('--db-password', default=os.getenv('BENCH_DB_PASSWORD', 'bench'))
+    parser.add_argument('--db-name', default=os.getenv('BENCH_DB_NAME', 'thesis_bench'))
+    parser.add_argument('--replicas', default=os.getenv('BENCH_DB_REPLICAS'),
+                        help='host:port,... read replicas for the app (DB_REPLICA_HOSTS)')
+    parser.add_argument('--concurrency', type=int, default=30, help='simultaneous students')
+    parser.add_argument('--ramp', help='comma-separated concurrencies to measure one after another')
+    parser.add_argument('--slo-ms', type=float, default=2000, help='p95 limit used to find the --ramp capacity')
+    parser.add_argument('--users', type=int, help='accounts to create (default: --concurrency)')
+    parser.add_argument('--duration', type=float, default=60, help='seconds of measured traffic')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds of unmeasured traffic first')
+    parser.add_argument('--think-ms', type=float, default=0, help='max random pause after each request')
+    parser.add_argument('--chat-ratio', type=float, default=0.3, help='share of journeys with a chat')
+    parser.add_argument('--llm-delay-ms', type=float, default=800)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--baseline', help='compare with this stored report and exit 1 on regression')
+    parser.add_argument('--save-baseline', help='store this run as a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='ignore smaller absolute slowdowns')
+    args = parser.parse_args(argv)
+    levels = [int(level) for level in args.ramp.split(',')] if args.ramp else [args.concurrency]
+    if args.ramp and (args.baseline or args.save_baseline):
+        parser.error('--baseline/--save-baseline compare single runs, not --ramp')
+    if args.server_cmd is None:
+        args.server_cmd = DEFAULT_SERVER_CMD if args.profile == 'flask' else GUNICORN_SERVER_CMD
+    args.users = max(args.users or max(levels), max(levels))
+
+    if args.scenario == 'chat':
+        usernames = [f'{USER_PREFIX}{i:05d}' for i in range(args.users)]   # never logged in
+    else:
+        usernames = prepare_database(args)
+    llm_server, llm_url = stub_llm.start(delay=args.llm_delay_ms / 1000)
+    process = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        process, base_url = boot_app(args, llm_url)
+
+    try:
+        reports = []
+        for concurrency in levels:
+            if args.ramp:
+                print(f"{concurrency} students ...", flush=True)
+            reports.append(run_level(base_url, usernames, concurrency, args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        llm_server.shutdown()
+
+    params = {key: getattr(args, key) for key in
+              ('concurrency', 'users', 'duration', 'warmup', 'think_ms', 'chat_ratio',
+               'llm_delay_ms', 'seed', 'server_cmd', 'profile', 'scenario')}
+    if args.ramp:
+        for concurrency, report in zip(levels, reports):
+            report['concurrency'] = concurrency
+        capacity = print_ramp(reports, args.slo_ms)
+        if args.json:
+            Path(args.json).write_text(json.dumps(
+                {'params': dict(params, ramp=levels, slo_ms=args.slo_ms), 'capacity': capacity,
+                 'levels': reports}, indent=2))
+        return 0
+
+    report = reports[0]
+    report['params'] = params
+    print_report(report)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+        print(f"baseline saved to {args.save_baseline}")
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()),
+                              args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("\nno regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""Row tables vs one progress document per player (PROGRESS_STORAGE, see progress_doc.py).
+
+    docker compose -f benchmarks/docker-compose.yml up -d
+    python benchmarks/progress_doc_bench.py --users 2000          # seed once, then measure
+    python benchmarks/progress_doc_bench.py --skip-seed
+    python benchmarks/progress_doc_bench.py --offline             # no MySQL: encoding and answer building only
+
+Seeding creates ``doc_*`` students through provisioning, gives each one
+played stages, claimed rewards and skins and a few tutorials, and builds their
+documents with progress_doc.build_many. The measurement then replays, for
+random players, what one visit to the stages page asks for: stage stars,
+game counters, skins, three tutorial flags and three reward claims. In the
+row layout that is the statements of the row-mode routes. In the document
+layout it is one SELECT and progress_doc's accessors. A star save is measured
+the same way: the row upsert alone, or the upsert plus the document update
+done by progress_doc.record. The report gives queries and p50/p95 ms per
+visit, and the bytes each layout takes per player (InnoDB data + indexes
+from information_schema).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import progress_doc  # noqa: E402
+from catalogue import MAPS, skin_code_mapping  # noqa: E402
+
+USER_PREFIX = 'doc_'
+STAGES = (1, 2, 3)
+TUTORIALS = ('roadmap', 'stages', 'game')
+ROW_TABLES = ('user_progress', 'user_game_progress', 'stage_rewards_claimed', 'user_skins', 'user_tutorials')
+
+
+def connect(args):
+    import mysql.connector
+
+    return mysql.connector.connect(host=args.db_host, port=args.db_port, user=args.db_user,
+                                   password=args.db_password, database=args.db_name)
+
+
+def player(rng):
+    """(stars rows, reward rows, skin codes, tutorial keys) of one plausible player."""
+    reached = rng.randint(0, len(MAPS))
+    stars = [(map_name, stage, rng.randint(1, 3)) for map_name in MAPS[:reached] for stage in STAGES]
+    rewards = [(map_name, stage) for map_name, stage, _ in stars]
+    skins = [skin_code_mapping[map_name] for map_name in MAPS[:reached] if rng.random() < 0.7]
+    tutorials = [key for key in TUTORIALS if rng.random() < 0.8]
+    return stars, rewards, skins, tutorials
+
+
+def seed(args):
+    import migrate
+    import provisioning
+
+    cnx = connect(args)
+    migrate.upgrade(cnx)
+    cursor = cnx.cursor()
+    rng = random.Random(args.seed)
+    cursor.execute("SELECT COUNT(*) FROM users WHERE username LIKE %s", (USER_PREFIX + '%',))
+    have = cursor.fetchone()[0]
+    started = time.perf_counter()
+    for start in range(have, args.users, 1000):
+        ids = provisioning.provision_users(cursor, [
+            {'username': f'{USER_PREFIX}{i:07d}', 'first_name': 'Doc', 'last_name': 'Student',
+             'birth_day': 1, 'birth_month': 'January', 'birth_year': 2017, 'gender': 'male', 'password': 'x'}
+            for i in range(start, min(start + 1000, args.users))
+        ]).values()
+        star_rows, reward_rows, skin_rows, tutorial_rows = [], [], [], []
+        for user_id in ids:
+            stars, rewards, skins, tutorials = player(rng)
+            star_rows += [(user_id, *row) for row in stars]
+            reward_rows += [(user_id, *row) for row in rewards]
+            skin_rows += [(user_id, code, map_name) for map_name, code in skin_code_mapping.items() if code in skins]
+            tutorial_rows += [(user_id, key) for key in tutorials]
+        for sql, rows in (
+            ("INSERT INTO user_progress (user_id, map_name, stage_number, stars) VALUES (%s, %s, %s, %s)", star_rows),
+            ("INSERT INTO stage_rewards_claimed (user_id, map_name, stage_number, claimed) VALUES (%s, %s, %s, 1)",
+             reward_rows),
+            ("INSERT INTO user_skins (user_id, skin_code, map, claimed) VALUES (%s, %s, %s, 1)", skin_rows),
+            ("INSERT INTO user_tutorials (user_id, tutorial_key, completed) VALUES (%s, %s, 1)", tutorial_rows),
+        ):
+            if rows:
+                cursor.executemany(sql, rows)
+        progress_doc.store_many(cursor, progress_doc.build_many(cursor, list(ids)))
+        cnx.commit()
+        print(f"  users {min(start + 1000, args.users)}/{args.users}", end='\r', flush=True)
+    print(f"seeded {args.users} players in {time.perf_counter() - started:.1f}s")
+    cnx.close()
+
+
+# --- One visit to the stages page in each layout ---
+
+def visit_rows(cursor, user_id, map_name):
+    cursor.execute("SELECT map_name, stage_number, stars FROM user_progress WHERE user_id = %s", (user_id,))
+    stars = {f"{m}-{s}": {'stars': n} for m, s, n in cursor.fetchall()}
+    cursor.execute("SELECT * FROM user_game_progress WHERE user_id = %s", (user_id,))
+    counters = cursor.fetchall()
+    cursor.execute("SELECT map, skin_code FROM user_skins WHERE user_id = %s AND claimed = 1", (user_id,))
+    skins = cursor.fetchall()
+    cursor.execute("SELECT skin_code FROM user_skins WHERE user_id = %s AND equipped = 1 LIMIT 1", (user_id,))
+    cursor.fetchall()
+    for key in TUTORIALS:
+        cursor.execute("SELECT completed FROM user_tutorials WHERE user_id = %s AND tutorial_key = %s",
+                       (user_id, key))
+        cursor.fetchall()
+    for stage in STAGES:
+        cursor.execute("SELECT claimed FROM stage_rewards_claimed "
+                       "WHERE user_id = %s AND map_name = %s AND stage_number = %s", (user_id, map_name, stage))
+        cursor.fetchall()
+    return 4 + len(TUTORIALS) + len(STAGES), (stars, counters, skins)
+
+
+def visit_document(cursor, user_id, map_name):
+    doc = progress_doc.load(cursor, user_id)['doc']
+    answers = (progress_doc.stage_progress(doc), progress_doc.game_progress(doc), progress_doc.skins(doc),
+               [progress_doc.tutorial_done(doc, key) for key in TUTORIALS],
+               [progress_doc.reward_claimed(doc, map_name, stage) for stage in STAGES])
+    return 1, answers
+
+
+def save_rows(cnx, cursor, user_id, map_name, stars):
+    cursor.execute("""
+        INSERT INTO user_progress (user_id, map_name, stage_number, stars) VALUES (%s, %s, 1, %s)
+        ON DUPLICATE KEY UPDATE stars = VALUES(stars)
+    """, (user_id, map_name, stars))
+    cnx.commit()
+    return 1
+
+
+def save_document(cnx, cursor, user_id, map_name, stars):
+    cursor.execute("""
+        INSERT INTO user_progress (user_id, map_name, stage_number, stars) VALUES (%s, %s, 1, %s)
+        ON DUPLICATE KEY UPDATE stars = VALUES(stars)
+    """, (user_id, map_name, stars))
+    # What progress_doc.record does without a cached copy: lock, change, write
+    found = progress_doc.load(cursor, user_id, for_update=True)
+    progress_doc.set_stars(found['doc'], map_name, 1, stars)
+    cursor.execute("UPDATE user_progress_docs SET doc = %s, version = version + 1 WHERE user_id = %s",
+                   (progress_doc.encode(found['doc']), user_id))
+    cnx.commit()
+    return 3
+
+
+def timed(label, runs, call):
+    times, queries = [], 0
+    for args in runs:
+        started = time.perf_counter()
+        queries = call(*args)
+        if isinstance(queries, tuple):
+            queries = queries[0]
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    print(f"{label:<22}{queries:>8}{statistics.median(times):>10.2f}{p95:>10.2f}")
+
+
+def table_bytes(cursor, tables):
+    cursor.execute(f"""
+        SELECT COALESCE(SUM(data_length + index_length), 0) FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name IN ({', '.join(['%s'] * len(tables))})
+    """, list(tables))
+    return cursor.fetchone()[0]
+
+
+def measure(args):
+    cnx = connect(args)
+    cursor = cnx.cursor(buffered=True)
+    cursor.execute("SELECT id FROM users WHERE username LIKE %s", (USER_PREFIX + '%',))
+    user_ids = [row[0] for row in cursor.fetchall()]
+    if not user_ids:
+        sys.exit("no doc_* players; run without --skip-seed first")
+    rng = random.Random(args.seed)
+    reads = [(cursor, rng.choice(user_ids), rng.choice(MAPS)) for _ in range(args.requests)]
+    writes = [(cnx, cursor, rng.choice(user_ids), rng.choice(MAPS), rng.randint(1, 3)) for _ in range(args.requests)]
+
+    print(f"{'layout':<22}{'queries':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    timed('rows: visit', reads, visit_rows)
+    timed('document: visit', reads, visit_document)
+    timed('rows: save stars', writes, save_rows)
+    timed('document: save stars', writes, save_document)
+
+    cursor.execute("ANALYZE TABLE " + ', '.join(ROW_TABLES + ('user_progress_docs',)))
+    cursor.fetchall()
+    cursor.execute("SELECT COUNT(*) FROM users")
+    players = cursor.fetchone()[0] or 1
+    print(f"bytes per player: rows {table_bytes(cursor, ROW_TABLES) / players:.0f}, "
+          f"document {table_bytes(cursor, ('user_progress_docs',)) / players:.0f} "
+          f"(InnoDB estimates over all {players} users)")
+    cnx.close()
+
+
+def offline(args):
+    """Without MySQL: document size and the Python cost of answering a visit from rows vs a document."""
+    rng = random.Random(args.seed)
+    sizes, row_counts, from_rows, from_doc = [], [], [], []
+    for _ in range(args.requests):
+        stars, rewards, skins, tutorials = player(rng)
+        doc = progress_doc.empty()
+        for map_name, stage, count in stars:
+            progress_doc.set_stars(doc, map_name, stage, count)
+        for map_name in MAPS:
+            progress_doc.set_counters(doc, map_name, '1', rng.randint(0, 200), rng.randint(0, 50), 250, 'easy')
+        for map_name, stage in rewards:
+            progress_doc.claim_reward(doc, map_name, stage)
+        for code in ['default', *skins]:
+            progress_doc.claim_skin(doc, code)
+        for key in tutorials:
+            progress_doc.complete_tutorial(doc, key)
+        raw = progress_doc.encode(doc)
+        sizes.append(len(raw))
+        counter_rows = [{'map': m, 'correct': c[0], 'wrong': c[1], 'total': c[2], 'difficulty': c[3]}
+                        for m, c in doc['g'].items()]
+        skin_rows = [(progress_doc.SKIN_MAPS.get(code), code) for code in ['default', *skins]]
+        row_counts.append(len(stars) + len(counter_rows) + len(rewards) + len(skin_rows) + len(tutorials))
+
+        # The same answers, built the way the row-mode routes build them from fetched rows
+        started = time.perf_counter()
+        {f"{m}-{s}": {'stars': n} for m, s, n in stars}
+        result = {'mapDifficulty': {}}
+        for row in counter_rows:
+            result['mapDifficulty'][row['map']] = row['difficulty']
+            result[row['map']] = {'correctAnswersCount': row['correct'], 'wrongAnswersCount': row['wrong'],
+                                  'totalQuestionsAnswered': row['total']}
+        [{'skin_code': code, 'map': m} for m, code in skin_rows]
+        from_rows.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        loaded = progress_doc.decode(raw)
+        progress_doc.stage_progress(loaded), progress_doc.game_progress(loaded), progress_doc.skins(loaded)
+        from_doc.append(time.perf_counter() - started)
+
+    print(f"players: {len(sizes)}   rows per player: {statistics.mean(row_counts):.1f}   "
+          f"document bytes: mean {statistics.mean(sizes):.0f}, max {max(sizes)}")
+    print(f"answer building per visit: rows {statistics.median(from_rows) * 1e6:.1f} us, "
+          f"document decode + answers {statistics.median(from_doc) * 1e6:.1f} us (median)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-host', default=os.getenv('BENCH_DB_HOST', '127.0.0.1'))
+    parser.add_argument('--db-port', type=int, default=int(os.getenv('BENCH_DB_PORT', '3307')))
+    parser.add_argument('--db-user', default=os.getenv('BENCH_DB_USER', 'root'))
+    parser.add_argument('--db-password', default=os.getenv('BENCH_DB_PASSWORD', 'bench'))
+    parser.add_argument('--db-name', default=os.getenv('BENCH_DB_NAME', 'thesis_bench'))
+    parser.add_argument('--users', type=int, default=2000, help='players to seed')
+    parser.add_argument('--requests', type=int, default=2000, help='visits and saves to time per layout')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the players of an earlier run')
+    parser.add_argument('--offline', action='store_true', help='no MySQL: sizes and Python cost only')
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        offline(args)
+        return 0
+    if not args.skip_seed:
+        seed(args)
+    measure(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""JSON encoding and compression per endpoint: CPU cost against bytes saved (see responses.py).
+
+    python benchmarks/response_bench.py
+    python benchmarks/response_bench.py --repeat 2000 --seed 3
+
+No server or database: each payload is built by the same code the route uses,
+for one player who has played every map (or, for the leaderboard and the
+export, a full page and 10,000 rows). For each endpoint it prints the body
+encoded by Flask's provider and by orjson (if installed), then the size and
+encoding time of gzip and brotli (if installed) at a few levels. The levels
+responses.py uses are marked with *.
+"""
+import argparse
+import datetime
+import gzip
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import chatbot_text  # noqa: E402
+import exports  # noqa: E402
+import progress_doc  # noqa: E402
+import responses  # noqa: E402
+from catalogue import MAPS, skin_code_mapping  # noqa: E402
+
+GZIP_LEVELS = (1, responses.GZIP_LEVEL, 9)
+BROTLI_QUALITIES = (1, responses.BROTLI_QUALITY, 11)
+
+
+def full_doc(rng):
+    doc = progress_doc.empty()
+    for map_name in MAPS:
+        for stage in (1, 2, 3):
+            progress_doc.set_stars(doc, map_name, stage, rng.randint(1, 3))
+            progress_doc.claim_reward(doc, map_name, stage)
+        progress_doc.set_counters(doc, map_name, 'stage3', rng.randint(20, 90), rng.randint(0, 30),
+                                  rng.randint(90, 120), 'hard')
+        progress_doc.claim_skin(doc, skin_code_mapping[map_name])
+    return doc
+
+
+def payloads(rng):
+    """endpoint -> body (a JSON-able object, or text chunks for the streamed export)."""
+    doc = full_doc(rng)
+    messages = [m for m in (ROOT / 'benchmarks' / 'corpus' / 'chat_messages.txt').read_text(
+        encoding='utf-8').splitlines() if m.strip() and not m.startswith('#')]
+    replies = [reply for reply in map(chatbot_text.emoji_math, messages) if reply]
+    names = ['Ana C.', 'Ben D.', 'Lia M.', 'Noah R.', 'Ivy T.']
+    day = datetime.datetime(2025, 3, 1, 8, 0)
+    rows = [(f'student{n % 400}', f'class{n % 12}', n % 400, MAPS[n % len(MAPS)], f'stage{n % 3 + 1}',
+             rng.randint(0, 90), rng.randint(0, 30), rng.randint(0, 120), 'normal',
+             day + datetime.timedelta(minutes=n)) for n in range(10000)]
+    columns = ('username', 'class_name') + exports.DATASETS['game-progress'][2]
+    return {
+        '/get-progress': progress_doc.game_progress(doc),
+        '/get_stage_progress': progress_doc.stage_progress(doc),
+        '/get_claimed_rewards': {'claimed': {m: [1, 2, 3] for m in MAPS}},
+        '/get_user_skins': {'skins': [{'skin_code': code, 'map': m} for code, m in progress_doc.skins(doc)],
+                            'equipped_skin': 'r2'},
+        '/leaderboard?limit=100': {
+            'metric': 'stars', 'map': None, 'players': 2000,
+            'entries': [{'rank': i + 1, 'user_id': rng.randint(1, 2000), 'score': 72 - i // 3,
+                         'name': rng.choice(names)} for i in range(100)],
+            'me': {'rank': 731, 'user_id': 7, 'score': 31},
+        },
+        '/chatbot-api (emoji reply)': {'reply': max(replies, key=len)},
+        '/teacher/export (ndjson)': list(exports.ndjson_chunks(columns, rows)),
+    }
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=500, help='timings per measurement (median reported)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    flask_json = DefaultJSONProvider(app)
+    fast_json = responses.FastJSONProvider(app)
+    print(f"orjson: {'yes' if responses.orjson else 'no (Flask provider only)'}   "
+          f"brotli: {'yes' if responses.brotli else 'no (gzip only)'}   "
+          f"COMPRESS_MIN_BYTES default: 1024")
+
+    for endpoint, body in payloads(random.Random(args.seed)).items():
+        print(f"\n{endpoint}")
+        with app.app_context():
+            if isinstance(body, list):   # streamed: encoded chunk by chunk, compressed as a stream
+                data = ''.join(body).encode()
+                print(f"  body {len(data):>9} B in {len(body)} chunks (exports.ndjson_chunks)")
+                chunks = [chunk.encode() for chunk in body]
+                repeat = max(args.repeat // 100, 3)
+            else:
+                data, flask_us = timed(lambda: flask_json.response(body).get_data(), args.repeat)
+                fast, fast_us = timed(lambda: fast_json.response(body).get_data(), args.repeat)
+                print(f"  json  Flask {len(data):>7} B {flask_us:>8.1f} us   fast {len(fast):>7} B {fast_us:>8.1f} us")
+                data, chunks, repeat = fast, None, args.repeat
+
+        encodings = [('gzip', level, level == responses.GZIP_LEVEL) for level in GZIP_LEVELS]
+        if responses.brotli:
+            encodings += [('br', quality, quality == responses.BROTLI_QUALITY) for quality in BROTLI_QUALITIES]
+        for encoding, level, used in encodings:
+            def encode():
+                saved = (responses.GZIP_LEVEL, responses.BROTLI_QUALITY)
+                responses.GZIP_LEVEL = responses.BROTLI_QUALITY = level
+                try:
+                    encoder = responses._Encoder(encoding)
+                    if chunks is None:   # as compress() does for a whole body
+                        return encoder.compress(data) + encoder.finish()
+                    return b''.join(responses._stream(chunks, encoder))
+                finally:
+                    responses.GZIP_LEVEL, responses.BROTLI_QUALITY = saved
+            packed, us = timed(encode, repeat)
+            if encoding == 'gzip':
+                assert gzip.decompress(packed) == data
+            mark = '*' if used else ' '
+            print(f"  {encoding:<4}{level:>3}{mark} {len(packed):>9} B ({len(packed) / len(data):>5.1%}) {us:>10.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Per-request latency of the embedded SQLite backend against MySQL (DB_SQLITE_PATH, see sqlite_db.py).
+
+    python benchmarks/sqlite_bench.py                        # SQLite only, in a temporary file
+    python benchmarks/sqlite_bench.py --sqlite instance/bench.db --users 2000
+    docker compose -f benchmarks/docker-compose.yml up -d
+    python benchmarks/sqlite_bench.py --mysql                # both, same players and requests
+
+Each backend gets the schema (migrate.upgrade) and ``sqlb_*`` students in
+one class, created through provisioning, with stars on every stage of the
+maps they have reached. Then the real app (create_app, test client) serves
+the same random sequence of requests to both: the progress reads of a stages
+page and the star and answer saves of a game. The players' caches are
+dropped before every request, so each one reaches the database. The report
+gives p50/p95 ms per endpoint for the whole request, and the p50 of the part
+spent waiting on the database (metrics' db time, the Server-Timing header).
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from catalogue import MAPS  # noqa: E402
+
+USER_PREFIX = 'sqlb_'
+CLASS_NAME = 'sqlite-bench'
+STAGES = (1, 2, 3)
+
+# (method, path, rng -> JSON body) of what one player's stages page and game send
+REQUESTS = (
+    ('GET', '/get_stage_progress', None),
+    ('GET', '/get-progress', None),
+    ('GET', '/get_user_skins', None),
+    ('GET', '/get_claimed_rewards', None),
+    ('POST', '/save_progress', lambda rng: {'map': rng.choice(MAPS), 'stage': 1, 'stars': rng.randint(1, 3)}),
+    ('POST', '/save-game-progress', lambda rng: {
+        'map': rng.choice(MAPS), 'stage': 'stage1', 'correctAnswersCount': rng.randint(0, 10),
+        'wrongAnswersCount': 1, 'totalQuestionsAnswered': 11, 'difficulty': 'easy'}),
+)
+_DB_MS = re.compile(r'db;dur=([\d.]+)')
+
+
+def use_backend(args, backend):
+    """Point database.py at one backend; the pool and replicas are opened again on first use."""
+    import database
+
+    if backend == 'sqlite':
+        os.environ['DB_SQLITE_PATH'] = args.sqlite
+    else:
+        os.environ.pop('DB_SQLITE_PATH', None)
+        os.environ.update(DB_HOST=args.db_host, DB_PORT=str(args.db_port), DB_USER=args.db_user,
+                          DB_PASSWORD=args.db_password, DB_DATABASE=args.db_name)
+    database._pool = None
+    database._replicas = None
+
+
+def seed(args):
+    """The bench players' ids, creating the ones that are missing."""
+    import database
+    import migrate
+    import provisioning
+
+    cnx = database.connect(**database.settings())
+    migrate.upgrade(cnx, out=lambda line: None)
+    cursor = cnx.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users WHERE username LIKE %s", (USER_PREFIX + '%',))
+    have = cursor.fetchone()[0]
+    rng = random.Random(args.seed + have)
+    for start in range(have, args.users, 500):
+        ids = provisioning.provision_users(cursor, [
+            {'username': f'{USER_PREFIX}{i:06d}', 'first_name': 'Bench', 'last_name': 'Student',
+             'birth_day': 1, 'birth_month': 'January', 'birth_year': 2017, 'gender': 'female',
+             'password': 'x', 'class_name': CLASS_NAME}
+            for i in range(start, min(start + 500, args.users))
+        ]).values()
+        rows = [(user_id, map_name, stage, rng.randint(1, 3))
+                for user_id in ids for map_name in MAPS[:rng.randint(0, len(MAPS))] for stage in STAGES]
+        if rows:
+            cursor.executemany("INSERT INTO user_progress (user_id, map_name, stage_number, stars) "
+                               "VALUES (%s, %s, %s, %s)", rows)
+        cnx.commit()
+    cursor.execute("SELECT id FROM users WHERE username LIKE %s ORDER BY id LIMIT %s",
+                   (USER_PREFIX + '%', args.users))
+    user_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    cnx.close()
+    return user_ids
+
+
+def measure(args, user_ids):
+    """endpoint -> ([request ms], [database ms]) for the same request sequence on the current backend."""
+    import app
+
+    application = app.create_app()
+    client = application.test_client()
+    caches = application.extensions['caches'].values()
+    rng = random.Random(args.seed)
+    results = {}
+    for n in range(args.requests + args.warmup):
+        user_id = rng.choice(user_ids)
+        method, path, body = rng.choice(REQUESTS)
+        body = body(rng) if body is not None else None
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        for cache in caches:
+            cache.invalidate(user_id)
+
+        started = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            sys.exit(f"{method} {path}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+        if n < args.warmup:
+            continue
+        db = _DB_MS.search(response.headers.get('Server-Timing', ''))
+        times, db_times = results.setdefault(path, ([], []))
+        times.append(elapsed)
+        db_times.append(float(db.group(1)) if db else 0.0)
+    return results
+
+
+def report(backend, results):
+    for path, (times, db_times) in sorted(results.items()):
+        times.sort()
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        print(f"{backend:<8}{path:<24}{len(times):>6}{statistics.median(times):>10.2f}{p95:>10.2f}"
+              f"{statistics.median(db_times):>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sqlite', help='SQLite file (default: a new one in a temporary directory)')
+    parser.add_argument('--mysql', action='store_true', help='also measure MySQL (the --db-* server)')
+    parser.add_argument('--db-host', default=os.getenv('BENCH_DB_HOST', '127.0.0.1'))
+    parser.add_argument('--db-port', type=int, default=int(os.getenv('BENCH_DB_PORT', '3307')))
+    parser.add_argument('--db-user', default=os.getenv('BENCH_DB_USER', 'root'))
+    parser.add_argument('--db-password', default=os.getenv('BENCH_DB_PASSWORD', 'bench'))
+    parser.add_argument('--db-name', default=os.getenv('BENCH_DB_NAME', 'thesis_bench'))
+    parser.add_argument('--users', type=int, default=500, help='players to seed')
+    parser.add_argument('--requests', type=int, default=3000, help='timed requests per backend')
+    parser.add_argument('--warmup', type=int, default=100, help='untimed requests first (pool, leaderboards)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.TemporaryDirectory()
+    args.sqlite = args.sqlite or os.path.join(scratch.name, 'bench.db')
+    os.environ.setdefault('SQL_PROFILE_HEADER', '1')
+    os.environ.setdefault('LEADERBOARD_SNAPSHOT', os.path.join(scratch.name, 'leaderboards.json'))
+    os.environ.setdefault('SLOW_QUERY_MS', '100000')
+
+    print(f"{'backend':<8}{'endpoint':<24}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'db p50':>10}")
+    for backend in ('sqlite', 'mysql') if args.mysql else ('sqlite',):
+        use_backend(args, backend)
+        report(backend, measure(args, seed(args)))
+    scratch.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Minimal OpenAI-compatible chat completion server for benchmarks.
+
+Answers every POST .../chat/completions with a canned step-by-step reply after
+a configurable delay, so chat turns exercise the real request path without
+network access or API cost.
+
+    python benchmarks/stub_llm.py --port 8099 --delay-ms 800
+    LLM_API_BASE=http://127.0.0.1:8099/v1 LLM_API_KEY=stub python app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "Let's solve it step by step!\n"
+    "1. Look at the first number.\n"
+    "2. Look at the second number.\n"
+    "3. Put them together and count carefully.\n"
+    "What do you think the answer is?"
+)
+
+
+def make_handler(delay):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self.send_error(404)
+                return
+            time.sleep(delay)
+            body = json.dumps({
+                'id': 'chatcmpl-stub',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', 'stub'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': REPLY},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class Server(ThreadingHTTPServer):
+    # The socketserver default backlog of 5 refuses bursts from cooperative workers
+    request_queue_size = 1024
+
+
+def start(port=0, delay=0.5):
+    """Start the stub in a daemon thread; returns (server, base_url)."""
+    server = Server(('127.0.0.1', port), make_handler(delay))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/v1'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--delay-ms', type=float, default=800)
+    args = parser.parse_args()
+    server, url = start(args.port, args.delay_ms / 1000)
+    print(f"stub LLM listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,130 @@
+"""Micro-benchmarks and a behaviour corpus for the chatbot text functions.
+
+    python benchmarks/text_bench.py            # time and allocation profile
+    python benchmarks/text_bench.py --check    # compare with corpus/text_expected.json
+    python benchmarks/text_bench.py --record   # rewrite the expected outputs
+
+Inputs come from corpus/chat_messages.txt. ``emoji_math`` and
+``get_random_tip`` use ``random.choice``, so the corpus is recorded with the
+global RNG re-seeded before every call; an optimised version has to draw
+from ``random`` in the same order to match exactly.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+
+import chatbot_text  # noqa: E402
+
+MESSAGES_FILE = HERE / 'corpus' / 'chat_messages.txt'
+EXPECTED_FILE = HERE / 'corpus' / 'text_expected.json'
+
+# (user answer, expected answer) pairs for check_answer
+ANSWER_CASES = [
+    ('7', 7), ('7', 8), ('its 12', 12), ('i think 12!!', 12.0), ('twelve', 12),
+    ('11.5', 11), ('0', 0), ('', 3), ('3 or 4', 4), ('1O', 10), ('-5', 5),
+    ('the answer is 100', 100), ('42', '42'), ('9', 'nine'),
+]
+
+
+def load_messages():
+    lines = MESSAGES_FILE.read_text(encoding='utf-8').splitlines()
+    return [line for line in lines if line.strip() and not line.startswith('#')]
+
+
+def seeded(func, seed):
+    def call(*args):
+        random.seed(seed)
+        return func(*args)
+    return call
+
+
+def cases(messages, answer_cases=ANSWER_CASES):
+    """name -> list of (callable, args) covering the corpus."""
+    return {
+        'emoji_math': [(seeded(chatbot_text.emoji_math, i), (m,)) for i, m in enumerate(messages)],
+        'is_math_question': [(chatbot_text.is_math_question, (m.lower(),)) for m in messages],
+        'compute_answer': [(chatbot_text.compute_answer, (m.lower(),)) for m in messages],
+        'check_answer': [(chatbot_text.check_answer, tuple(case)) for case in answer_cases],
+        'get_random_tip': [(seeded(chatbot_text.get_random_tip, i), (m,)) for i, m in enumerate(messages)],
+    }
+
+
+def outputs(messages, answer_cases=ANSWER_CASES):
+    return {name: [func(*args) for func, args in calls]
+            for name, calls in cases(messages, answer_cases).items()}
+
+
+def record(messages):
+    data = {'messages': messages, 'answer_cases': ANSWER_CASES, 'outputs': outputs(messages)}
+    EXPECTED_FILE.write_text(json.dumps(data, ensure_ascii=False, indent=1) + '\n', encoding='utf-8')
+    print(f"recorded {sum(len(v) for v in data['outputs'].values())} outputs to {EXPECTED_FILE}")
+
+
+def check():
+    expected = json.loads(EXPECTED_FILE.read_text(encoding='utf-8'))
+    messages, answer_cases = expected['messages'], expected['answer_cases']
+    actual = outputs(messages, answer_cases)
+    inputs = {name: [args for _, args in calls] for name, calls in cases(messages, answer_cases).items()}
+    failures = 0
+    for name, values in expected['outputs'].items():
+        for args, want, got in zip(inputs[name], values, actual[name]):
+            if want != got:
+                failures += 1
+                print(f"MISMATCH {name}{args!r}:\n  expected {want!r}\n  got      {got!r}")
+    total = sum(len(v) for v in expected['outputs'].values())
+    print(f"{total - failures}/{total} outputs match")
+    return 1 if failures else 0
+
+
+def bench(messages, rounds, repeat):
+    print(f"{'function':<18}{'calls':>7}{'ns/call':>11}{'best ns':>11}{'peak B/call':>13}{'max peak B':>12}")
+    for name, calls in cases(messages).items():
+        per_round = []
+        for _ in range(rounds):
+            start = time.perf_counter_ns()
+            for _ in range(repeat):
+                for func, args in calls:
+                    func(*args)
+            per_round.append((time.perf_counter_ns() - start) / (repeat * len(calls)))
+
+        # Allocation profile: peak traced memory while running each call once
+        peaks = []
+        tracemalloc.start()
+        for func, args in calls:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func(*args)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        tracemalloc.stop()
+
+        mean = sum(per_round) / len(per_round)
+        print(f"{name:<18}{len(calls):>7}{mean:>11.0f}{min(per_round):>11.0f}"
+              f"{sum(peaks) / len(peaks):>13.0f}{max(peaks):>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--check', action='store_true', help='validate against the recorded corpus')
+    parser.add_argument('--record', action='store_true', help='re-record the expected outputs')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=200, help='passes over the corpus per round')
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record(load_messages())
+        return 0
+    if args.check:
+        return check()
+    bench(load_messages(), args.rounds, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Login, registration and the access decorators used by the other blueprints."""
+import logging
+from functools import wraps
+
+import mysql.connector
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, abort
+from mysql.connector import errorcode
+
+import concurrency
+import profiles
+from database import get_db
+from extensions import bcrypt, rate_limited
+from provisioning import provision_user
+from session_store import regenerate
+
+log = logging.getLogger('app')
+
+bp = Blueprint('auth', __name__)
+
+
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            flash('You must be logged in to access this page.', 'warning')
+            return redirect(url_for('auth.login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+def start_session(user_id, role):
+    """A new session, under a new id, for a login or a change of role."""
+    regenerate(session)
+    session.permanent = True
+    session['user_id'] = user_id
+    session['role'] = role
+
+
+def teacher_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            flash('You must be logged in to access this page.', 'warning')
+            return redirect(url_for('auth.login'))
+        # The role as it is now (set-role may have changed it since login), from the cached profile
+        profile = profiles.get(session['user_id'])
+        if profile is None:
+            session.clear()
+            return redirect(url_for('auth.login'))
+        role = profile.get('role') or 'student'
+        if role != session.get('role'):
+            start_session(profile['id'], role)
+        if role != 'teacher':
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@bp.route('/')
+def index():
+    if 'user_id' in session:
+        return redirect(url_for('pages.dashboard'))
+    return redirect(url_for('auth.login'))
+
+
+
+@bp.route('/favicon.ico')
+def favicon():
+    return '', 204  # Returns no content, effectively ignoring the request
+
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+@rate_limited('LOGIN_RATE_LIMIT', lambda: request.form.get('username', '').strip().lower(),
+              {'success': False, 'message': 'Too many login attempts. Please wait a minute and try again.'})
+def login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+
+        # The user row with the equipped skin, so the profile cache starts out filled
+        cursor = get_db().cursor(dictionary=True)
+        cursor.execute("""
+            SELECT u.*, s.skin_code AS skin
+            FROM users u
+            LEFT JOIN user_skins s ON s.user_id = u.id AND s.equipped = 1
+            WHERE u.username = %s
+            LIMIT 1
+        """, (username,))
+        user = cursor.fetchone()
+        cursor.close()
+
+        if user and concurrency.offload(bcrypt.check_password_hash, user['password'], password):
+            # A new session id: never log in a session id the browser arrived with
+            start_session(user['id'], user.get('role') or 'student')
+            profiles.remember(profiles.from_row(user))
+            log.debug("User ID saved to session: %s", session['user_id'])
+            home = 'teacher.dashboard' if session['role'] == 'teacher' else 'pages.dashboard'
+            return jsonify({'success': True, 'redirect': url_for(home)})
+        else:
+            return jsonify({'success': False, 'message': 'Invalid username or password.'})
+
+    return render_template('login.html')
+
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form['username'].strip()
+        first_name = request.form['first_name'].strip()
+        last_name = request.form['last_name'].strip()
+        birth_day = request.form['birth_day']
+        birth_month = request.form['birth_month']
+        birth_year = request.form['birth_year']
+        gender = request.form['gender']
+        password = request.form['password']
+        confirm_password = request.form['confirm_password']
+
+        # Validate minimum username length
+        if len(username) < 3:
+            flash('Username must be at least 3 characters.', 'danger')
+            return redirect(url_for('auth.register'))
+
+        # Validate minimum password length
+        if len(password) < 6:
+            flash('Password must be at least 6 characters.', 'danger')
+            return redirect(url_for('auth.register'))
+
+        # Check password match
+        if password != confirm_password:
+            flash('Passwords do not match!', 'danger')
+            return redirect(url_for('auth.register'))
+
+        # Hash the password
+        hashed_pw = concurrency.offload(bcrypt.generate_password_hash, password).decode('utf-8')
+
+        db = get_db()
+        cursor = db.cursor()
+        try:
+            # One transaction: the user row, default skin and progress for every map.
+            # The unique key on username rejects duplicates, no separate lookup needed.
+            provision_user(cursor, {
+                'username': username, 'first_name': first_name, 'last_name': last_name,
+                'birth_day': birth_day, 'birth_month': birth_month, 'birth_year': birth_year,
+                'gender': gender, 'password': hashed_pw,
+            })
+            db.commit()
+
+            flash('Registration successful! You can now log in.', 'success')
+            return redirect(url_for('auth.register'))
+
+        except mysql.connector.IntegrityError as e:
+            db.rollback()
+            if e.errno == errorcode.ER_DUP_ENTRY:
+                flash('Username already exists.', 'danger')
+            else:
+                log.exception("Registration error")
+                flash('An error occurred during registration. Please try again.', 'danger')
+            return redirect(url_for('auth.register'))
+
+        except Exception:
+            db.rollback()
+            log.exception("Registration error")
+            flash('An error occurred during registration. Please try again.', 'danger')
+            return redirect(url_for('auth.register'))
+        finally:
+            cursor.close()
+
+    return render_template('register.html')
+
+
+@bp.route('/logout')
+def logout():
+    session.clear()  # This removes all session data, including 'user_id'
+    flash('You have been logged out.', 'info')
+    return redirect(url_for('auth.login'))
@@ -0,0 +1,203 @@
+"""Counticus, the step-by-step math chatbot.
+
+The conversation state (step, last question, expected answer) lives in the
+session; the model is only asked for worked solutions (see llm.py).
+"""
+import re
+
+from flask import Blueprint, request, session, jsonify
+
+import llm
+import page_cache
+from blueprints.auth import login_required
+from extensions import rate_limited
+from chatbot_text import (
+    allowed_interactions, yes_responses, no_responses,
+    is_math_question, compute_answer, check_answer, emoji_math, get_random_tip,
+)
+
+bp = Blueprint('chatbot', __name__)
+
+
+@bp.route('/chatbot-api', methods=['POST'])
+@rate_limited('CHAT_RATE_LIMIT', lambda: session.get('user_id') or request.remote_addr,
+              {"reply": "Counticus needs a short break! Try again in a minute."})
+def chatbot_api():
+    data = request.json
+    user_message = data.get("message", "").strip().lower()
+
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+
+    # Initialize session variables if missing
+    if 'last_question' not in session:
+        session['last_question'] = ""
+    if 'step' not in session:
+        session['step'] = 0
+    if 'expected_answer' not in session:
+        session['expected_answer'] = None
+    if 'tip_sent' not in session:
+        session['tip_sent'] = False  # track if tip sent in step 1
+
+    # Step 0: Greeting or math question detection
+    if session['step'] == 0:
+        if user_message in allowed_interactions:
+            friendly_responses = {
+                "hello": "Hello! I'm Counticus, your friendly math helper!",
+                "hi": "Hello! I'm Counticus, your friendly math helper!",
+                "hey": "Hey! I'm here if you need help with math.",
+                "good morning": "Good morning! I'm here to help with math problems.",
+                "good afternoon": "Good afternoon! Ready to learn some math?",
+                "good evening": "Good evening! Counticus at your service!",
+                "thank you": "You're welcome!",
+                "thanks": "No problem!",
+                "ty": "You're welcome!",
+                "ok": "Okay!",
+                "okay": "Okay!",
+                "sure": "Okay! Just send me a math question when you're ready.",
+                "alright": "Alright! I'm here when you need help."
+            }
+            return jsonify({"reply": friendly_responses.get(user_message, "I'm here to help with math!")})
+
+        if not is_math_question(user_message):
+            return jsonify({"reply": "Sorry, I can only help with math questions only."})
+
+        # Save question and expected answer, then move to step 1
+        session['last_question'] = user_message
+        session['expected_answer'] = compute_answer(user_message)
+        session['step'] = 1
+        session['tip_sent'] = False  # reset tip sent flag for new question
+
+    if session['step'] == 1:
+        if user_message in yes_responses:
+            session['step'] = 2
+            session['tip_sent'] = False
+        elif user_message in no_responses:
+            session['step'] = 0
+            session['last_question'] = ""
+            session['expected_answer'] = None
+            session['tip_sent'] = False
+            return jsonify({"reply": "Alright! Let me know if you have another math question."})
+        else:
+            if not session.get('tip_sent', False):
+                try:
+                    # Use your own tip function instead of OpenAI call
+                    tip_reply = get_random_tip(session.get('last_question', ''))
+
+                    # Just in case tip too long, truncate or fallback
+                    if len(tip_reply) > 300:
+                        tip_reply = (
+                            "Hi! When you add numbers, you just put them together. "
+                            "For example, if you have 1 apple and 1 more apple, how many apples do you have? "
+                            "Try counting them one by one! "
+                            "Would you like more help?"
+                        )
+
+                    final_reply = f"{tip_reply}\n\n👇 Please answer YES or NO 👇"
+                    session['tip_sent'] = True
+                    return jsonify({"reply": final_reply})
+
+                except Exception:
+                    session['tip_sent'] = True
+                    return jsonify({"reply": (
+                        "Hi! When you add numbers, you just put them together. "
+                        "For example, if you have 1 apple and 1 more apple, how many apples do you have? "
+                        "Try counting them one by one! "
+                        "Would you like more help?\n\n👇 Please answer YES or NO 👇"
+                    )})
+            else:
+                return jsonify({"reply": "I'm sorry, I can't understand that.\n\nPlease reply with YES or NO only."})
+
+
+    # Step 2: Provide step-by-step solution without final answer, then ask for user's answer
+    if session['step'] == 2:
+        emoji_response = emoji_math(session['last_question'])
+        if emoji_response:
+            session['step'] = 2.5
+            return jsonify({"reply": f"{emoji_response}\n\nWhat do you think the answer is?"})
+
+        step_prompt = f"Give a step-by-step solution without the final answer for this math problem: '{session['last_question']}'. Then ask: 'What do you think the answer is?'"
+        try:
+            reply = llm.complete(step_prompt)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+        session['step'] = 2.5
+        return jsonify({"reply": reply})
+
+    # Step 2.5: Check user's answer, if correct reset else ask if want full explanation
+    if session['step'] == 2.5:
+        expected = session.get('expected_answer')
+        if expected is None:
+            session['step'] = 3
+        else:
+            if check_answer(user_message, expected):
+                session['step'] = 0
+                session['last_question'] = ""
+                session['expected_answer'] = None
+                session['tip_sent'] = False
+                return jsonify({"reply": "That's correct! Great job! 🎉 Let me know if you want to try another question."})
+            else:
+                session['step'] = 3
+                return jsonify({"reply": "That's not quite right. Would you like me to explain the full solution?\n\nPlease answer YES or NO"})
+
+    # Step 3: Provide full solution if asked
+    if session['step'] == 3:
+        if user_message in yes_responses:
+            full_prompt = (
+                f"Give a full step-by-step solution including the final answer "
+                f"for this math problem: '{session['last_question']}'. "
+                f"Keep it short and friendly for Grade 1. "
+                f"End the explanation with the final answer clearly stated at the bottom in bold."
+            )
+            try:
+                reply = llm.complete(full_prompt)
+
+                # Remove any "The answer is ..." lines to avoid duplication
+                reply = re.sub(r"(The answer is\s*[0-9]+\.?)", "", reply, flags=re.IGNORECASE).strip()
+
+                # Add consistent final answer line at the bottom if expected_answer is set
+                if session.get("expected_answer") is not None:
+                    reply += f"\n\n**Final Answer: {session['expected_answer']}**"
+
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+            # Reset session state
+            session['step'] = 0
+            session['last_question'] = ""
+            session['expected_answer'] = None
+            session['tip_sent'] = False
+
+            return jsonify({"reply": reply})
+
+        elif user_message in no_responses:
+            # Reset on no explanation request
+            session['step'] = 0
+            session['last_question'] = ""
+            session['expected_answer'] = None
+            session['tip_sent'] = False
+            return jsonify({"reply": "Okay! Feel free to ask me another math question anytime."})
+
+        else:
+            return jsonify({
+                "reply": "Sorry, your answer is not wrong or not valid. "
+                        "Please reply with 'YES' or 'NO' if you want the full explanation."
+            })
+
+    # Default fallback
+    return jsonify({"reply": "Sorry, I didn't understand that. Please ask a math question or say hello!"})
+
+
+@bp.route('/reset-chat-session', methods=['POST'])
+def reset_chat_session():
+    keys_to_clear = ['last_question', 'step', 'expected_answer', 'tip_sent']
+    for key in keys_to_clear:
+        session.pop(key, None)
+    return jsonify({"message": "Chat session reset"})
+
+
+@bp.route('/chatbot')
+@login_required
+def chatbot():
+    return page_cache.render('chatbot.html')
@@ -0,0 +1,120 @@
+"""Server-rendered game pages: dashboard, roadmap, stages, game and friends."""
+import json
+import logging
+
+from flask import Blueprint, abort, render_template, request, redirect, url_for, session, flash
+
+import page_cache
+import profiles
+from blueprints.auth import login_required
+from catalogue import reward_data
+from database import get_db
+
+skins_log = logging.getLogger('app.skins')
+
+bp = Blueprint('pages', __name__)
+
+
+def get_user_from_db():
+    user_id = session.get('user_id')
+    if not user_id:
+        flash('You must be logged in to view your profile.', 'warning')
+        return redirect(url_for('auth.login'))
+
+    return profiles.get(user_id)
+
+
+@bp.route('/stages')
+@login_required
+def stages():
+    # Retrieve the selected map from the URL query parameters
+    selected_map = request.args.get('map', None)  # Get the selected map (e.g., multiplication)
+    if selected_map not in reward_data:
+        abort(404)
+    # Only the map goes into the page (and its cache key); the template does not use the stage
+    return page_cache.render('stages.html', selected_map=selected_map)
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    user = get_user_from_db()  # Cached profile (profiles.py)
+    if not user:
+        flash('User not found or not logged in.', 'danger')
+        return redirect(url_for('auth.login'))
+
+    # Pass first_name, last_name, gender, and id to the template
+    return render_template('dashboard.html',
+                           first_name=user['first_name'],
+                           last_name=user['last_name'],
+                           gender=user['gender'],
+                           id=user['id'])
+
+
+@bp.route('/roadmap')
+@login_required
+def roadmap():
+    return page_cache.render('roadmap.html')
+
+@bp.route('/shop')
+@login_required
+def shop():
+    return page_cache.render('shop.html')
+
+@bp.route('/settings')
+def settings():
+    return render_template('settings.html')
+
+@bp.route('/collectibles')
+@login_required
+def collectibles():
+    user_id = session.get('user_id')  # Get user_id from session or other source
+
+    if not user_id:
+        # Redirect to login or show error if user not logged in
+        return redirect('/login')
+
+    try:
+        cursor = get_db().cursor()
+        cursor.execute("SELECT skin_code FROM user_skins WHERE user_id = %s AND claimed = 1", (user_id,))
+        claimed_skins = cursor.fetchall()
+        claimed_skin_ids = [skin[0] for skin in claimed_skins]
+
+        skins_log.debug("Claimed skin IDs: %s", claimed_skin_ids)
+
+        cursor.close()
+    except Exception:
+        skins_log.exception("Error fetching skins")
+        claimed_skin_ids = []
+
+    # Convert to JSON for passing to JavaScript
+    claimed_skin_ids_json = json.dumps(claimed_skin_ids)
+
+    return render_template('collectibles.html', claimed_skin_ids_json=claimed_skin_ids_json)
+
+
+@bp.route('/monster_atlas')
+@login_required
+def monster_atlas():
+    return page_cache.render('monster_atlas.html')
+
+
+@bp.route('/game', methods=['GET'])
+@login_required
+def game():
+    user_id = session['user_id']
+
+    # Get selected map and stage from query parameters
+    selected_map = request.args.get('map', '')
+    selected_stage = request.args.get('stage', '')
+
+    # Get user's first name
+    user = profiles.get(user_id)
+    first_name = user['first_name'] if user and user['first_name'] else "PLAYER"
+
+    # Render the game template with the necessary context
+    return render_template(
+        'game.html',
+        first_name=first_name,
+        selected_map=selected_map,
+        selected_stage=selected_stage
+    )
@@ -0,0 +1,341 @@
+"""Stage stars, per-map answer counters and difficulty, and the leaderboard read."""
+import logging
+
+import click
+import mysql.connector
+from flask import Blueprint, request, session, jsonify
+
+import database
+import progress_doc
+from catalogue import reward_data
+from database import get_db
+from extensions import cache, get_leaderboards
+from leaderboard import METRICS
+
+progress_log = logging.getLogger('app.progress')
+
+bp = Blueprint('progress', __name__, cli_group=None)
+
+LEADERBOARD_WAIT_SECONDS = 10   # for a worker that is still loading them (leaderboard.load_in_background)
+
+
+@bp.route('/save_progress', methods=['POST'])
+def save_progress():
+    if not session.get('user_id'):
+        return jsonify({"error": "Not logged in"}), 403  # Unauthorized if not logged in
+
+    user_id = session['user_id']
+    data = request.get_json()
+
+    map_name = data.get('map')
+    stage_number = data.get('stage')
+    stars = data.get('stars')
+
+    if not map_name or not stage_number or stars is None:
+        return jsonify({"error": "Missing data"}), 400
+
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("""
+        INSERT INTO user_progress (user_id, map_name, stage_number, stars)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE stars = VALUES(stars)
+    """, (user_id, map_name, stage_number, stars))
+    # Rows affected: 1 inserted, 2 updated, 0 same stars as before
+    changed = cursor.rowcount > 0
+    if changed:
+        progress_doc.record(db, user_id, lambda doc: progress_doc.set_stars(doc, map_name, stage_number, stars))
+
+    db.commit()
+    cursor.close()
+    if changed:
+        cache('stage-progress').invalidate(user_id)
+        get_leaderboards().record_stars(user_id, map_name, stage_number, stars)
+
+    return jsonify({"message": "Progress saved successfully"}), 200
+
+
+@bp.route('/get_stage_progress')
+def get_stage_progress():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({})  # Return an empty response if the user is not logged in
+
+    if progress_doc.enabled():
+        return jsonify(progress_doc.stage_progress(progress_doc.get(user_id)))
+
+    # Return the stage progress as JSON
+    return jsonify(cache('stage-progress').get(user_id, lambda: load_stage_progress(user_id)))
+
+
+def load_stage_progress(user_id):
+    # Query to get all stage progress for the logged-in user
+    cursor = get_db(read_only=True).cursor(dictionary=True)
+    cursor.execute("""
+        SELECT map_name, stage_number, stars
+        FROM user_progress
+        WHERE user_id = %s
+    """, (user_id,))
+
+    rows = cursor.fetchall()
+    cursor.close()
+
+    # Prepare the stage progress in the required format
+    progress = {}
+    for row in rows:
+        # Use a combined key for map and stage like 'subtraction-2'
+        key = f"{row['map_name']}-{row['stage_number']}"
+        progress[key] = {"stars": row['stars']}
+
+    progress_log.debug("Stage progress for user %s: %d stages", user_id, len(progress))
+    return progress
+
+
+@bp.route('/leaderboard')
+def leaderboard():
+    """?metric=stars|accuracy|streak&map=NAME&limit=&offset= -> one page plus the caller's rank."""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    metric = request.args.get('metric', 'stars')
+    map_name = request.args.get('map') or None
+    if metric not in METRICS:
+        return jsonify({'error': f"metric must be one of {', '.join(METRICS)}"}), 400
+    if map_name is not None and map_name not in reward_data:
+        return jsonify({'error': 'Map not found'}), 404
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+
+    boards = get_leaderboards()
+    if not boards.wait_loaded(LEADERBOARD_WAIT_SECONDS):
+        response = jsonify({'error': 'The leaderboards are still loading, try again shortly'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    page = boards.top(metric, map_name, offset, limit)
+    mine = boards.position(metric, user_id, map_name)
+
+    names = {}
+    if page:
+        ids = [entry_user for _, entry_user, _ in page]
+        cursor = get_db().cursor(dictionary=True)
+        cursor.execute(
+            f"SELECT id, first_name, last_name FROM users WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+        names = {row['id']: f"{row['first_name']} {row['last_name'][:1]}.".strip() for row in cursor.fetchall()}
+        cursor.close()
+
+    def entry(rank, entry_user, score):
+        item = {'rank': rank, 'user_id': entry_user, 'score': score[0]}
+        if metric == 'accuracy':
+            item['answers'] = score[1]
+        return item
+
+    return jsonify({
+        'metric': metric,
+        'map': map_name,
+        'players': len(boards.board(metric, map_name)),
+        'entries': [dict(entry(*item), name=names.get(item[1], 'Player')) for item in page],
+        'me': entry(mine[0], user_id, mine[1]) if mine else None,
+    })
+
+
+@bp.route('/get-progress')
+def get_progress():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'success': False, 'message': 'User not logged in'}), 400
+
+    try:
+        if progress_doc.enabled():
+            doc = progress_doc.get(user_id)
+            if doc['g']:
+                return jsonify(progress_doc.game_progress(doc))
+        # (also creates the first row for players who have none)
+        return jsonify(cache('game-progress').get(user_id, lambda: load_game_progress(user_id)))
+
+    except Exception as e:
+        progress_log.exception("Error loading progress")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+def load_game_progress(user_id):
+    cursor = get_db(read_only=True).cursor(dictionary=True)
+    cursor.execute("SELECT * FROM user_game_progress WHERE user_id = %s", (user_id,))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    if not rows:
+        # First visit: create the default row on the primary and read it back from there
+        db = get_db()
+        cursor = db.cursor(dictionary=True)
+        cursor.execute("""
+            INSERT INTO user_game_progress (user_id, map, stage_key, correct, wrong, total, difficulty)
+            VALUES (%s, 'multiplication', 'stage1', 0, 0, 0, 'easy')
+        """, (user_id,))
+        progress_doc.record(db, user_id, lambda doc: progress_doc.set_counters(
+            doc, 'multiplication', 'stage1', 0, 0, 0, 'easy'))
+        db.commit()
+
+        cursor.execute("SELECT * FROM user_game_progress WHERE user_id = %s", (user_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+
+    result = {'success': True, 'mapDifficulty': {}, 'selectedMap': 'multiplication', 'selectedStageKey': 'stage1'}
+
+    for row in rows:
+        map_name = row['map']
+        result['mapDifficulty'][map_name] = row['difficulty']
+        result[map_name] = {
+            'correctAnswersCount': row['correct'],
+            'wrongAnswersCount': row['wrong'],
+            'totalQuestionsAnswered': row['total']
+        }
+
+    return result
+
+
+@bp.route('/save-game-progress', methods=['POST'])
+def save_game_progress():
+    try:
+        data = request.get_json()
+        user_id = session.get('user_id')
+
+        if not user_id:
+            raise ValueError("User not logged in")
+
+        selected_map = data.get('map')
+        selected_stage = data.get('stage')
+        correct = data.get('correctAnswersCount', 0)
+        wrong = data.get('wrongAnswersCount', 0)
+        total = data.get('totalQuestionsAnswered', 0)
+        difficulty = data.get('difficulty')
+
+        db = get_db()
+        cursor = db.cursor()
+
+        cursor.execute("""
+            INSERT INTO user_game_progress (user_id, map, stage_key, correct, wrong, total, difficulty)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            correct = VALUES(correct),
+            wrong = VALUES(wrong),
+            total = VALUES(total),
+            difficulty = VALUES(difficulty)
+        """, (user_id, selected_map, selected_stage, correct, wrong, total, difficulty))
+        progress_doc.record(db, user_id, lambda doc: progress_doc.set_counters(
+            doc, selected_map, selected_stage, correct, wrong, total, difficulty))
+
+        db.commit()
+        cursor.close()
+        cache('game-progress').invalidate(user_id)
+        get_leaderboards().record_answers(user_id, selected_map, correct, total)
+
+        return jsonify({'success': True, 'message': 'Progress saved successfully'})
+
+    except ValueError as ve:
+        progress_log.info("ValueError: %s", ve)
+        return jsonify({'success': False, 'message': str(ve)}), 400  # Bad request
+    except mysql.connector.Error as mysql_err:
+        progress_log.error("MySQL Error: %s", mysql_err)
+        return jsonify({'success': False, 'message': 'Database error occurred'}), 500  # Internal server error
+    except Exception:
+        progress_log.exception("Unexpected error saving game progress")
+        return jsonify({'success': False, 'message': 'An unexpected error occurred'}), 500  # Generic server error
+
+
+@bp.route('/get-difficulty')
+def get_difficulty():
+    user_id = session.get('user_id')
+    map_name = request.args.get('map')
+
+    if progress_doc.enabled() and user_id:
+        level = progress_doc.difficulty(progress_doc.get(user_id), map_name)
+        return jsonify({'success': True, 'difficulty': level} if level is not None else {'success': False})
+
+    cursor = get_db(read_only=True).cursor()
+    cursor.execute("SELECT difficulty FROM user_game_progress WHERE user_id = %s AND map = %s", (user_id, map_name))
+    result = cursor.fetchone()
+    cursor.close()
+
+    if result:
+        return jsonify({'success': True, 'difficulty': result[0]})
+    return jsonify({'success': False})
+
+
+@bp.route('/update-difficulty', methods=['POST'])
+def update_difficulty():
+    data = request.json
+    user_id = session.get('user_id')
+    map_name = data['map']
+    difficulty = data['difficulty']
+
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("""
+        UPDATE user_game_progress SET difficulty = %s WHERE user_id = %s AND map = %s
+    """, (difficulty, user_id, map_name))
+    progress_doc.record(db, user_id, lambda doc: progress_doc.set_difficulty(doc, map_name, difficulty))
+
+    db.commit()
+    cursor.close()
+    cache('game-progress').invalidate(user_id)
+    return jsonify({'success': True})
+
+
+@bp.route('/reset-counters', methods=['POST'])
+def reset_counters():
+    data = request.get_json()
+    user_id = session.get('user_id')  # Make sure user is logged in
+    selected_map = data.get('map')
+
+    if not user_id or not selected_map:
+        return jsonify({"message": "Missing user ID or map"}), 400
+
+    connection = get_db()
+    cursor = connection.cursor()
+    try:
+        reset_query = """
+            UPDATE user_game_progress
+            SET correct = 0,
+                wrong = 0,
+                total = 0
+            WHERE user_id = %s AND map = %s
+        """
+
+        progress_log.debug("Resetting counters for user_id=%s, map=%s", user_id, selected_map)
+
+        cursor.execute(reset_query, (user_id, selected_map))
+        progress_doc.record(connection, user_id, lambda doc: progress_doc.reset_counters(doc, selected_map))
+        connection.commit()
+        cache('game-progress').invalidate(user_id)
+
+        if cursor.rowcount > 0:
+            get_leaderboards().record_answers(user_id, selected_map, 0, 0)
+            return jsonify({"message": "Counters reset successfully!"}), 200
+        else:
+            return jsonify({"message": "No progress found for this map."}), 404
+
+    except Exception as e:
+        connection.rollback()
+        progress_log.exception("❌ Error resetting counters")
+        return jsonify({"message": "Error resetting counters", "error": str(e)}), 500
+
+    finally:
+        cursor.close()
+
+
+@bp.cli.command('build-progress-docs')
+@click.option('--batch', default=1000, show_default=True, help='players per round of queries')
+def build_progress_docs(batch):
+    """Build (or rebuild) every player's progress document from the row tables."""
+    db = database.connect(**database.settings())
+    cursor = db.cursor()
+    cursor.execute("SELECT id FROM users ORDER BY id")
+    user_ids = [row[0] for row in cursor.fetchall()]
+    for start in range(0, len(user_ids), batch):
+        progress_doc.store_many(cursor, progress_doc.build_many(cursor, user_ids[start:start + batch]))
+        db.commit()
+        click.echo(f"  {min(start + batch, len(user_ids))}/{len(user_ids)}\r", nl=False)
+    db.close()
+    click.echo(f"{len(user_ids)} progress documents built")
+
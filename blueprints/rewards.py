@@ -0,0 +1,125 @@
+"""Stage rewards: what a stage gives and whether it has been claimed."""
+import logging
+
+from flask import Blueprint, request, session, jsonify
+
+import flags
+import progress_doc
+from catalogue import reward_data
+from database import get_db
+from extensions import idempotent
+
+rewards_log = logging.getLogger('app.rewards')
+
+bp = Blueprint('rewards', __name__)
+
+
+@bp.route('/get_stage_reward', methods=['GET'])
+def get_stage_reward():
+    map_name = request.args.get('map')
+    stage = request.args.get('stage')
+
+    if not map_name or not stage:
+        return jsonify({'error': 'Map and stage are required'}), 400
+
+    try:
+        stage = int(stage)
+    except ValueError:
+        return jsonify({'error': 'Stage must be an integer'}), 400
+
+    if map_name not in reward_data:
+        return jsonify({'error': 'Map not found'}), 404
+
+    if stage not in reward_data[map_name]:
+        return jsonify({'error': 'Stage not found for this map'}), 404
+
+    return jsonify(reward_data[map_name][stage])
+
+
+@bp.route('/claim_reward', methods=['POST'])
+@idempotent('claim_reward')
+def claim_reward():
+    try:
+        # Kunin ang user_id mula sa session
+        user_id = session.get('user_id')
+
+        # Kunin ang map_name at stage_number mula sa JSON body ng request
+        map_name = request.json.get('map')
+        stage_number = request.json.get('stage')
+
+        # Siguraduhing kumpleto ang mga parameters
+        if not user_id or not map_name or not stage_number:
+            return jsonify({"error": "User ID, map, and stage parameters are required"}), 400
+
+        rewards_log.debug("Claiming reward for user_id=%s, map=%s, stage=%s", user_id, map_name, stage_number)
+
+        # I-execute ang INSERT o UPDATE query sa database para i-claim ang reward
+        db = get_db()
+        cursor = db.cursor()
+        cursor.execute("""
+            INSERT INTO stage_rewards_claimed (user_id, map_name, stage_number, claimed)
+            VALUES (%s, %s, %s, TRUE)
+            ON DUPLICATE KEY UPDATE claimed = TRUE
+        """, (user_id, map_name, stage_number))
+        # Rows affected: 1 inserted, 2 updated, 0 it was claimed already
+        already_claimed = cursor.rowcount == 0
+        if not already_claimed:
+            progress_doc.record(db, user_id, lambda doc: progress_doc.claim_reward(doc, map_name, stage_number))
+
+        # I-commit ang changes sa database
+        db.commit()
+        cursor.close()
+        if not already_claimed:
+            flags.changed(user_id)
+
+        rewards_log.info("Reward claimed", extra={'user_id': user_id, 'map': map_name, 'stage': stage_number})
+
+        # Ibalik ang success response
+        return jsonify({"success": True, "already_claimed": already_claimed})
+
+    except Exception:
+        # I-log ang error kung may mangyari
+        rewards_log.exception("/claim_reward failed")
+
+        # Ibalik ang error response sa client
+        return jsonify({"error": "Unable to claim reward"}), 500
+
+
+@bp.route('/check_reward_claimed', methods=['POST'])
+def check_reward_claimed():
+    try:
+        user_id = session.get('user_id')
+
+        if not user_id:
+            return jsonify({"error": "User not logged in"}), 400
+
+        map_name = request.json.get('map')
+        stage_number = request.json.get('stage')
+
+        rewards_log.debug("Checking reward for user %s, map: %s, stage: %s", user_id, map_name, stage_number)
+
+        if not map_name or not stage_number:
+            return jsonify({"error": "Map and stage are required"}), 400
+
+        return jsonify({"claimed": flags.reward_claimed(flags.get(user_id), map_name, stage_number)})
+
+    except Exception:
+        rewards_log.exception("Error in /check_reward_claimed")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@bp.route('/get_claimed_rewards')
+def get_claimed_rewards():
+    """Every stage reward claim at once: {"claimed": {"addition": [1, 2], ...}}."""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({"error": "User not logged in"}), 400
+
+    claimed = flags.get(user_id)['r']
+    result = {}
+    for map_name, stage in flags.REWARDS.unpack(claimed):
+        result.setdefault(map_name, []).append(stage)
+    for name in claimed[1]:   # stages the catalogue does not know
+        map_name, _, stage = name.rpartition('-')
+        result.setdefault(map_name, []).append(int(stage) if stage.isdigit() else stage)
+    return jsonify({"claimed": result})
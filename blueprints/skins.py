@@ -0,0 +1,199 @@
+"""Map skins: claiming them and choosing the equipped one."""
+import logging
+
+from flask import Blueprint, request, session, jsonify
+
+import profiles
+import progress_doc
+from catalogue import DEFAULT_SKIN, skin_code_mapping
+from database import get_db
+from extensions import idempotent
+
+skins_log = logging.getLogger('app.skins')
+
+bp = Blueprint('skins', __name__)
+
+
+@bp.route('/has_claimed_skin')
+def has_claimed_skin():
+    user_id = session.get('user_id')
+    map_param = request.args.get('map')
+
+    if not user_id or not map_param:
+        skins_log.debug("Missing user ID or map parameter")
+        return jsonify({'claimed': False, 'error': 'Missing user ID or map parameter'})
+
+    if progress_doc.enabled():
+        return jsonify({'claimed': progress_doc.skin_claimed(progress_doc.get(user_id), map_param)})
+
+    cursor = None
+    try:
+        cursor = get_db(read_only=True).cursor()
+        cursor.execute("""
+            SELECT claimed FROM user_skins WHERE user_id = %s AND map = %s
+        """, (user_id, map_param))
+        result = cursor.fetchone()
+
+        if result is None:
+            skins_log.debug("No result found for user %s and map %s", user_id, map_param)
+            return jsonify({'claimed': False, 'error': 'No skin data found'})
+
+        if result[0] == 1:
+            return jsonify({'claimed': True})
+        else:
+            return jsonify({'claimed': False})
+
+    except Exception as e:
+        skins_log.exception("Error in /has_claimed_skin")
+        return jsonify({'claimed': False, 'error': str(e)})
+    finally:
+        if cursor:
+            cursor.close()
+
+
+@bp.route('/claim_skin', methods=['POST'])
+@idempotent('claim_skin')
+def claim_skin():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'success': False, 'message': 'User not logged in'})
+
+    data = request.get_json()
+    selected_map = data.get('map')
+
+    if not selected_map:
+        return jsonify({'error': 'Missing map parameter'}), 400
+
+    skin_code = skin_code_mapping.get(selected_map)
+
+    if not skin_code:
+        return jsonify({'error': 'Invalid map provided'}), 400
+
+    cursor = None
+    try:
+        skins_log.debug("User %s claiming skin for map: %s => skin_code: %s", user_id, selected_map, skin_code)
+
+        db = get_db()
+        cursor = db.cursor()
+
+        # One statement claims it whether or not the row exists; a row that is
+        # already claimed is left alone (skin_code is assigned before claimed)
+        cursor.execute("""
+            INSERT INTO user_skins (user_id, map, claimed, skin_code)
+            VALUES (%s, %s, 1, %s)
+            ON DUPLICATE KEY UPDATE
+            skin_code = IF(claimed = 1, skin_code, VALUES(skin_code)),
+            claimed = 1
+        """, (user_id, selected_map, skin_code))
+
+        # Rows affected: 1 inserted, 2 updated, 0 already claimed
+        if cursor.rowcount == 0:
+            return jsonify({'success': False, 'message': 'Skin already claimed by this user'})
+        progress_doc.record(db, user_id, lambda doc: progress_doc.claim_skin(doc, skin_code))
+
+        db.commit()
+        return jsonify({'success': True, 'message': 'Skin claimed successfully'})
+
+    except Exception:
+        skins_log.exception("Error in /claim_skin")
+        return jsonify({'error': 'Internal server error'}), 500
+    finally:
+        if cursor:
+            cursor.close()
+
+
+@bp.route('/get_user_skins')
+def get_user_skins():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User not logged in'}), 401
+
+    if progress_doc.enabled():
+        doc = progress_doc.get(user_id)
+        return jsonify({
+            'skins': [{'skin_code': code, 'map': map_name} for code, map_name in progress_doc.skins(doc)],
+            'equipped_skin': doc['e'] or 'default'
+        })
+
+    cursor = None
+    try:
+        cursor = get_db(read_only=True).cursor()
+
+        # Fetch claimed skins
+        cursor.execute("""
+            SELECT map, skin_code FROM user_skins WHERE user_id = %s AND claimed = 1
+        """, (user_id,))
+        skins = cursor.fetchall()
+
+        # Get the equipped skin
+        cursor.execute("""
+            SELECT skin_code FROM user_skins WHERE user_id = %s AND equipped = 1 LIMIT 1
+        """, (user_id,))
+        equipped = cursor.fetchone()
+        equipped_skin = equipped[0] if equipped else 'default'
+
+        # Return skins data with equipped skin info
+        return jsonify({
+            'skins': [{'skin_code': skin[1], 'map': skin[0]} for skin in skins],
+            'equipped_skin': equipped_skin
+        })
+
+    except Exception:
+        skins_log.exception("Error fetching user skins")
+        return jsonify({'error': 'Internal server error'}), 500
+    finally:
+        if cursor:
+            cursor.close()
+
+
+@bp.route('/update_equipped_skin', methods=['POST'])
+def update_equipped_skin():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User not logged in'}), 401
+
+    skin_id = request.json.get('skin_id')
+    if skin_id is None:
+        return jsonify({'error': 'Skin ID is required'}), 400
+
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        # Swap in one statement: the join only matches when the user has this
+        # skin, so an unknown skin changes nothing
+        cursor.execute("""
+            UPDATE user_skins AS skin
+            JOIN user_skins AS chosen ON chosen.user_id = skin.user_id AND chosen.skin_code = %s
+            SET skin.equipped = (skin.skin_code = %s)
+            WHERE skin.user_id = %s
+        """, (skin_id, skin_id, user_id))
+
+        if cursor.rowcount == 0:
+            # Nothing changed: it is already the equipped skin, or the user has no such skin
+            cursor.execute("""
+                SELECT 1 FROM user_skins WHERE user_id = %s AND skin_code = %s
+            """, (user_id, skin_id))
+            if cursor.fetchone() is None:
+                if skin_id != DEFAULT_SKIN:
+                    return jsonify({'error': 'Skin not found for this user'}), 404
+
+                # Accounts from before provisioning had no default skin row
+                cursor.execute("""
+                    UPDATE user_skins SET equipped = 0 WHERE user_id = %s
+                """, (user_id,))
+                cursor.execute("""
+                    INSERT INTO user_skins (user_id, skin_code, map, claimed, equipped)
+                    VALUES (%s, %s, NULL, 1, 1)
+                """, (user_id, DEFAULT_SKIN))
+
+        progress_doc.record(db, user_id, lambda doc: progress_doc.equip(doc, skin_id))
+        db.commit()
+        profiles.changed(user_id)
+        return jsonify({'message': 'Skin equipped successfully'})
+
+    except Exception:
+        skins_log.exception("Error equipping skin")
+        db.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+    finally:
+        cursor.close()
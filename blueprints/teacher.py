@@ -0,0 +1,149 @@
+"""Teacher tools: roster import, class dashboard, exports and maintenance commands."""
+import logging
+
+import click
+from flask import Blueprint, Response, render_template, request, jsonify, abort, current_app, stream_with_context
+
+import analytics
+import database
+import exports
+import profiles
+import roster
+from blueprints.auth import teacher_required
+from database import get_db
+from extensions import bcrypt
+
+log = logging.getLogger('app')
+
+bp = Blueprint('teacher', __name__, url_prefix='/teacher', cli_group=None)
+
+
+@bp.route('/roster/import', methods=['POST'])
+@teacher_required
+def import_roster():
+    """Create a class of accounts from a CSV upload (form field 'roster' or a text/csv body)."""
+    upload = request.files.get('roster')
+    if upload is not None:
+        stream = upload.stream
+    elif request.mimetype == 'text/csv':
+        stream = request.stream
+    else:
+        return jsonify({'error': "Upload a CSV file as 'roster' or send a text/csv body."}), 400
+    class_name = (request.form.get('class_name') or request.args.get('class_name') or '').strip() or None
+
+    conn = get_db()
+    try:
+        report = roster.import_roster(
+            stream, conn,
+            lambda password: bcrypt.generate_password_hash(password).decode('utf-8'),
+            class_name=class_name,
+        )
+        return jsonify(report)
+    except roster.RosterError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception:
+        conn.rollback()
+        log.exception("Roster import error")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@bp.route('/dashboard')
+@teacher_required
+def dashboard():
+    cursor = get_db().cursor(dictionary=True)
+    classes = analytics.classes(cursor)
+    selected = request.args.get('class')
+    if selected is None:
+        selected = classes[0]['class_name'] if classes else ''
+    summary = analytics.class_summary(cursor, selected)
+    cursor.close()
+    return render_template('teacher_dashboard.html', classes=classes, summary=summary)
+
+
+@bp.route('/api/classes')
+@teacher_required
+def api_classes():
+    cursor = get_db().cursor(dictionary=True)
+    try:
+        return jsonify(analytics.classes(cursor))
+    finally:
+        cursor.close()
+
+
+@bp.route('/api/class-summary')
+@teacher_required
+def api_class_summary():
+    """Aggregates for ?class=NAME (students without a class: class=)."""
+    cursor = get_db().cursor(dictionary=True)
+    try:
+        return jsonify(analytics.class_summary(cursor, request.args.get('class', '')))
+    finally:
+        cursor.close()
+
+
+@bp.route('/export/<dataset>.<fmt>')
+@teacher_required
+def export_data(dataset, fmt):
+    """Stream a dataset as CSV or NDJSON; filters: ?class=&map=&since=&until= (YYYY-MM-DD)."""
+    if dataset not in exports.DATASETS or fmt not in exports.FORMATS:
+        abort(404)
+    try:
+        filters = {
+            'class_name': request.args.get('class'),
+            'map_name': request.args.get('map'),
+            'since': exports.parse_day(request.args.get('since')),
+            'until': exports.parse_day(request.args.get('until'), end=True),
+        }
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Its own connection: the stream outlives the request's. The response gives
+    # it back when closed, which happens even if the body is never iterated.
+    conn = database.connection()
+    response = Response(
+        stream_with_context(exports.stream(conn, dataset, fmt, **filters)),
+        mimetype=exports.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{dataset}.{fmt}"'},
+    )
+    response.call_on_close(conn.close)
+    return response
+
+
+@bp.route('/leaderboards/rebuild', methods=['POST'])
+@teacher_required
+def rebuild_leaderboards():
+    boards = current_app.extensions['leaderboards']
+    boards.rebuild(get_db())
+    boards.save()
+    boards.announce_reload()
+    return jsonify({'success': True, 'players': len(boards.board('stars'))})
+
+
+@bp.cli.command('rebuild-aggregates')
+def rebuild_aggregates():
+    """Recompute the class summary tables from the progress tables."""
+    db = database.connect(**database.settings())
+    cursor = db.cursor()
+    analytics.rebuild(cursor)
+    db.commit()
+    db.close()
+    click.echo("class aggregates rebuilt")
+
+
+@bp.cli.command('set-role')
+@click.argument('username')
+@click.argument('role', type=click.Choice(['student', 'teacher']))
+def set_role(username, role):
+    """Make an existing account a teacher (or a student again)."""
+    db = database.connect(**database.settings())
+    cursor = db.cursor()
+    cursor.execute("UPDATE users SET role = %s WHERE username = %s", (role, username))
+    changed = cursor.rowcount
+    cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
+    row = cursor.fetchone()
+    db.commit()
+    db.close()
+    if changed:
+        # Their next teacher page sees the new role and starts a new session (teacher_required)
+        profiles.changed(row[0])
+    click.echo(f"{username}: {role}" if changed else f"{username}: no change (unknown user or same role)")
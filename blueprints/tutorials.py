@@ -0,0 +1,63 @@
+"""Which in-game tutorials a player has already seen."""
+from flask import Blueprint, request, session, jsonify
+
+import flags
+import progress_doc
+from database import get_db
+
+bp = Blueprint('tutorials', __name__, url_prefix='/api')
+
+
+@bp.route('/tutorial-status')
+def tutorial_status():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'tutorial_done': False})
+
+    tutorial_key = request.args.get('tutorialKey')
+    if not tutorial_key:
+        return jsonify({'error': 'Missing tutorialKey parameter'}), 400
+
+    return jsonify({'tutorial_done': flags.tutorial_done(flags.get(user_id), tutorial_key)})
+
+
+@bp.route('/tutorials')
+def tutorials():
+    """Every tutorial flag at once: {"tutorials": {"roadmap": true, ...}} (registered keys plus any others seen)."""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'tutorials': {}})
+
+    seen = flags.get(user_id)['t']
+    done = dict.fromkeys(flags.TUTORIALS.keys, False)
+    done.update(dict.fromkeys(flags.TUTORIALS.unpack(seen) + seen[1], True))
+    return jsonify({'tutorials': done})
+
+
+@bp.route('/tutorial-complete', methods=['POST'])
+def tutorial_complete():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Not logged in'}), 401
+
+    data = request.get_json()
+    tutorial_key = data.get('tutorialKey') if data else None
+    if not tutorial_key:
+        return jsonify({'success': False, 'error': 'Missing tutorialKey'}), 400
+
+    db = get_db()
+    cursor = db.cursor()
+
+    # Upsert pattern: Insert or update if exists
+    cursor.execute("""
+        INSERT INTO user_tutorials (user_id, tutorial_key, completed, completed_at)
+        VALUES (%s, %s, 1, NOW())
+        ON DUPLICATE KEY UPDATE completed = 1, completed_at = NOW()
+    """, (user_id, tutorial_key))
+    progress_doc.record(db, user_id, lambda doc: progress_doc.complete_tutorial(doc, tutorial_key))
+
+    db.commit()
+    cursor.close()
+    flags.changed(user_id)
+
+    return jsonify({'success': True})
@@ -0,0 +1,132 @@
+"""Static game catalogue: the maps, their stage rewards and map skins.
+
+Everything that needs the list of maps (registration defaults, reward and
+skin claims, reports) reads it from here.
+"""
+
+reward_data = {
+    'multiplication': {
+        1: {
+            'badge': "/static/images/gameimg/rewardimg/badge/badge-1.png",
+        },
+        2: {
+            'title': "/static/images/gameimg/rewardimg/title/title-1.png",
+        },
+        3: {
+            'border': "/static/images/gameimg/rewardimg/border/border-1.png"
+        }
+    },
+    'addition': {
+        1: {
+            'badge': "/static/images/gameimg/rewardimg/badge/badge-2.png",
+        },
+        2: {
+            'title': "/static/images/gameimg/rewardimg/title/title-2.png",
+        },
+        3: {
+            'border': "/static/images/gameimg/rewardimg/border/border-2.png"
+        }
+    },
+    'subtraction': {
+        1: {
+            'badge': "/static/images/gameimg/rewardimg/badge/badge-3.png",
+        },
+        2: {
+            'title': "/static/images/gameimg/rewardimg/title/title-3.png",
+        },
+        3: {
+            'border': "/static/images/gameimg/rewardimg/border/border-3.png"
+        }
+    },
+    'division': {
+        1: {
+            'badge': "/static/images/gameimg/rewardimg/badge/badge-4.png",
+        },
+        2: {
+            'title': "/static/images/gameimg/rewardimg/title/title-4.png",
+        },
+        3: {
+            'border': "/static/images/gameimg/rewardimg/border/border-4.png"
+        }
+    },
+    'counting': {
+        1: {
+            'badge': "/static/images/gameimg/rewardimg/badge/badge-5.png",
+        },
+        2: {
+            'title': "/static/images/gameimg/rewardimg/title/title-5.png",
+        },
+        3: {
+            'border': "/static/images/gameimg/rewardimg/border/border-5.png"
+        }
+    },
+    'comparison': {
+        1: {
+            'badge': "/static/images/gameimg/rewardimg/badge/badge-6.png",
+        },
+        2: {
+            'title': "/static/images/gameimg/rewardimg/title/title-6.png",
+        },
+        3: {
+            'border': "/static/images/gameimg/rewardimg/border/border-6.png"
+        }
+    },
+    'numerals': {
+        1: {
+            'badge': "/static/images/gameimg/rewardimg/badge/badge-7.png",
+        },
+        2: {
+            'title': "/static/images/gameimg/rewardimg/title/title-7.png",
+        },
+        3: {
+            'border': "/static/images/gameimg/rewardimg/border/border-7.png"
+        }
+    },
+    'placevalue': {
+        1: {
+            'badge': "/static/images/gameimg/rewardimg/badge/badge-8.png",
+        },
+        2: {
+            'title': "/static/images/gameimg/rewardimg/title/title-8.png",
+        },
+        3: {
+            'border': "/static/images/gameimg/rewardimg/border/border-8.png"
+        }
+    }
+    # Add more maps and stages as needed
+}
+
+# Skin unlocked by finishing each map
+skin_code_mapping = {
+    'multiplication': 'r1',
+    'addition': 'r2',
+    'subtraction': 'r3',
+    'division': 'r4',
+    'counting': 'r5',
+    'comparison': 'r6',
+    'numerals': 'r7',
+    'placevalue': 'r8',
+}
+
+DEFAULT_SKIN = 'default'
+
+# Maps in roadmap order
+MAPS = tuple(reward_data)
+
+# Key registries for the per-player flag bitsets (flags.py): bit i is the i-th
+# key, so these lists may only ever be appended to
+TUTORIAL_KEYS = ('dashboard', 'roadmap', 'stages', 'game', 'shop', 'collectibles', 'monster_atlas')
+REWARD_KEYS = (
+    ('multiplication', 1), ('multiplication', 2), ('multiplication', 3),
+    ('addition', 1), ('addition', 2), ('addition', 3),
+    ('subtraction', 1), ('subtraction', 2), ('subtraction', 3),
+    ('division', 1), ('division', 2), ('division', 3),
+    ('counting', 1), ('counting', 2), ('counting', 3),
+    ('comparison', 1), ('comparison', 2), ('comparison', 3),
+    ('numerals', 1), ('numerals', 2), ('numerals', 3),
+    ('placevalue', 1), ('placevalue', 2), ('placevalue', 3),
+)
+# A new stage in reward_data needs its key appended above, not inserted where it sorts
+assert set(REWARD_KEYS) >= {(map_name, stage) for map_name in MAPS for stage in reward_data[map_name]}, \
+    "every reward_data stage needs an entry in REWARD_KEYS"
+assert len(set(REWARD_KEYS)) == len(REWARD_KEYS), "REWARD_KEYS has a duplicate"
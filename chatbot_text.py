@@ -0,0 +1,299 @@
+"""Pure text helpers behind the Counticus chatbot.
+
+No Flask or database access here, so these can be benchmarked and checked in
+isolation (see benchmarks/text_bench.py).
+"""
+import json
+import logging
+import random
+import re
+from functools import lru_cache
+from pathlib import Path
+
+log = logging.getLogger('app.chatbot')
+
+
+def emoji_math(question: str):
+    question = question.lower().strip()
+    numbers = list(map(int, re.findall(r'\d+', question)))
+    if len(numbers) != 2:
+        return None  # This function only supports 2-number questions
+
+    n1, n2 = numbers
+
+    MAX_EMOJIS = 20
+    emojis = ["🍎", "🍉", "🍓", "🎂", "🍭"]
+    emoji = random.choice(emojis)
+
+    # Addition
+    if any(op in question for op in ["add", "addition", "plus", "+"]):
+        if n1 <= MAX_EMOJIS and n2 <= MAX_EMOJIS:
+            lines = []
+            lines.append("Please count the emoji below\n")
+            lines.append("Addition means putting two groups together to find out how many there are in total.\n")
+            lines.append(f"Here is the first group of {n1} {emoji}:\n")
+            lines.append(f"{emoji * n1}\n")
+            lines.append(f"Here is the second group of {n2} {emoji}:\n")
+            lines.append(f"{emoji * n2}\n")
+            lines.append("Now, let's put them together:\n")
+            lines.append(f"{emoji * (n1 + n2)}\n")
+            lines.append("How many are there in total?")
+            return '\n'.join(lines)
+        else:
+            return None
+
+
+    # Subtraction (ensure n1 >= n2 to avoid negative emojis)
+    if any(op in question for op in ["subtract", "subtraction", "minus", "-"]) and n1 >= n2:
+        if n1 <= MAX_EMOJIS and n2 <= MAX_EMOJIS:
+            lines = []
+            lines.append("Please count the emoji below\n")
+            lines.append("Subtraction helps us find out how many are left when some are taken away.\n")
+            lines.append(f"Imagine you have {n1} {emoji}, but then you give away {n2} {emoji}.\n")
+            lines.append(f"Here are your {n1} {emoji}:\n")
+            lines.append(f"{emoji * n1}\n")
+            # Show the remaining emojis after taking away n2 emojis
+            remaining = n1 - n2
+            lines.append(f"After giving away {n2} {emoji}, you have:\n")
+            lines.append(f"{emoji * remaining}\n")
+            lines.append("How many do you think are left?")
+            return '\n'.join(lines)
+        else:
+            return None
+
+
+
+    # Multiplication (show n1 groups each containing n2 emojis)
+    if any(op in question for op in ["multiply", "multiplication", "times", "x", "*"]):
+        total = n1 * n2
+        if total <= MAX_EMOJIS:
+            lines = []
+            lines.append("Multiplication is like having several groups of the same number of things!\n")
+            lines.append(f"Imagine you have {n1} baskets, and each basket has {n2} {emoji} inside.\n")
+            lines.append("Let's look at each basket:\n")
+            for i in range(n1):
+                lines.append(f"Basket {i+1}: {emoji * n2}\n")
+            lines.append("Now, let's count all the emojis in all the baskets together.\n")
+            lines.append("Can you figure out how many emojis there are in total?")
+            return '\n'.join(lines)
+        else:
+            return None
+
+
+    # Division (clean version — no repeated line)
+    if any(op in question for op in ["divide", "division", "/"]):
+        if n1 <= MAX_EMOJIS and n2 != 0 and n1 % n2 == 0:
+            group_size = n1 // n2
+            lines = []
+            lines.append("Please count the emoji below\n")
+            lines.append(f"Let's divide {n1} {emoji} into {n2} equal groups.\n")
+            lines.append(f"We want to share {n1} {emoji} equally into {n2} groups.\n")
+            lines.append(f"Each group will have some {emoji}. Let's see how many:\n")
+            for i in range(n2):
+                lines.append(f"Group {i+1}: {emoji * group_size}")
+            lines.append(f"So, each group has {group_size} {emoji}.\n")
+            return '\n'.join(lines)
+        else:
+            return None
+
+
+    # Comparison
+    if any(op in question for op in ["greater than", "less than", "equal", "greater", "less", "which is greater", "which is less"]):
+        if n1 <= MAX_EMOJIS and n2 <= MAX_EMOJIS:
+            emoji1 = emoji
+            emoji2 = random.choice(["🍇", "🍍", "🍉", "🍎", "🍓"])  # Different emoji for contrast
+
+            lines = []
+            lines.append("Let's learn about comparing numbers and groups!\n")
+            lines.append(f"{emoji1 * n1} ({n1})  ?  {emoji2 * n2} ({n2})\n")
+            lines.append("Look carefully at these two groups of fruits.")
+            lines.append(f"Group 1 has {n1} {emoji1}s.")
+            lines.append(f"Group 2 has {n2} {emoji2}s.\n")
+            lines.append("👉 When one number or group is GREATER, it means it has MORE than the other.")
+            lines.append("👉 When one number or group is LESS, it means it has FEWER than the other.")
+            lines.append("👉 When both groups are the SAME, they have EQUAL amounts.\n")
+            lines.append("So, is the first group >, <, or = the second group?")
+            lines.append("Think about it and pick the right symbol!")
+
+            return '\n'.join(lines)
+        else:
+            return None
+
+
+
+    # Counting / word problem hints
+    if any(op in question for op in ["count", "how many", "word problem", "more", "fewer", "left"]):
+        if n1 <= MAX_EMOJIS:
+            lines = []
+            lines.append("Let's practice counting!\n")
+            lines.append("Here are some fruits for you:\n")
+            lines.append(f"{emoji * n1} ({n1})\n")
+            lines.append("Can you count how many fruits are here?")
+            lines.append("Take your time and try to count each fruit carefully.\n")
+            return '\n'.join(lines)
+        else:
+            return None
+
+
+
+
+
+
+
+allowed_interactions = {
+    "hello", "hi", "hey", "good morning", "good afternoon", "good evening",
+    "thank you", "thanks", "ty", "ok", "okay", "yes", "no", "sure", "alright"
+}
+
+math_keywords = [
+    "add", "addition", "plus",
+    "subtract", "subtraction", "minus",
+    "multiply", "multiplication", "times",
+    "divide", "division",
+    "count", "number", "place value", "roman numeral", "compare",
+    "greater than", "less than", "equal",
+    "word problem", "how many", "left", "more", "fewer",
+    "counting forward", "skip counting", "counting backwards",
+    "borrowing", "regrouping", "long division",
+    "reading roman numerals", "converting roman numerals",
+    "ones", "tens", "hundreds", "thousands", "ten thousands"
+]
+
+yes_responses = {"yes", "yeah", "yep", "sure", "more help", "help"}
+no_responses = {"no", "nah", "nope", "stop"}
+
+def is_math_question(message: str) -> bool:
+    has_number = bool(re.search(r'\d', message))
+    has_keyword = any(k in message for k in math_keywords)
+    return has_number or has_keyword
+
+def compute_answer(question: str):
+    try:
+        numbers = list(map(float, re.findall(r'\d+', question)))
+        if len(numbers) < 2:
+            return None
+
+        if any(op in question for op in ["add", "plus", "+"]):
+            return int(numbers[0] + numbers[1])
+        elif any(op in question for op in ["subtract", "minus", "-"]):
+            return int(numbers[0] - numbers[1])
+        elif any(op in question.lower() for op in ["multiply", "multiplication", "times", "x", "*"]):
+            return int(numbers[0] * numbers[1])
+        elif any(op in question for op in ["divide", "division", "/", "divided by", "over", "÷"]):
+            if numbers[1] == 0:
+                return None
+            return int(numbers[0] / numbers[1])
+        else:
+            return None
+    except:
+        return None
+
+
+def check_answer(user_answer: str, expected_answer) -> bool:
+    try:
+        numbers = re.findall(r'\d+\.?\d*', user_answer)
+        log.debug("Extracted numbers from user answer: %s", numbers)
+        if not numbers:
+            return False
+        user_num = int(float(numbers[0]))
+        expected_num = int(float(expected_answer))
+        log.debug("User number: %s, Expected number: %s", user_num, expected_num)
+        return user_num == expected_num
+    except Exception as e:
+        log.debug("Error in check_answer: %s", e)
+        return False
+
+keyword_synonyms = {
+    "plus": "add",
+    "addition": "add",
+    "minus": "subtract",
+    "subtraction": "subtract",
+    "times": "multiply",
+    "multiplied": "multiply",
+    "multiplication": "multiply",
+    "divide": "divide",
+    "division": "divide",
+    "greater than": "greater than",
+    ">": "greater than",
+    "less than": "less than",
+    "<": "less than",
+    "equal": "equal",
+    "=": "equal",
+    "counting": "count",
+    "count": "count",
+    "place value": "place value",
+    "placevalue": "place value",
+    # add more as needed
+}
+
+# The tips (about 350 lines of text) live in data/chatbot_tips.json and are read
+# on the first tip request instead of on every worker start
+TIPS_FILE = Path(__file__).resolve().parent / 'data' / 'chatbot_tips.json'
+
+
+@lru_cache(maxsize=None)
+def load_tips():
+    """topic -> list of tips, in file order (random.choice draws depend on it)."""
+    with open(TIPS_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+
+
+def get_random_tip(user_message: str) -> str:
+
+
+    user_message_lower = user_message.lower()
+
+    replacements = {
+        "x": " multiply ",
+        "*": " multiply ",
+        "+": " add ",
+        "-": " subtract ",
+        "÷": " divide ",
+        "/": " divide ",
+        "%": " modulo ",
+        ">": " greater than ",
+        "<": " less than ",
+        "=": " equal "
+    }
+
+    for symbol, word in replacements.items():
+        user_message_lower = user_message_lower.replace(symbol, word)
+
+    tokens = re.findall(r"\b\w+\b", user_message_lower)
+    log.debug("Normalized message: %r, tokens: %s", user_message_lower, tokens)
+
+    tips_per_topic = load_tips()
+    multi_word_keywords = [kw for kw in keyword_synonyms.keys() if " " in kw]
+
+    for mw_key in multi_word_keywords:
+        if mw_key in user_message_lower:
+            log.debug("Matched multi-word keyword: %s", mw_key)
+            canonical_key = keyword_synonyms[mw_key]
+            tips = tips_per_topic.get(canonical_key)
+            if tips:
+                return random.choice(tips)
+
+    for token in tokens:
+        if token in keyword_synonyms:
+            canonical_key = keyword_synonyms[token]
+            tips = tips_per_topic.get(canonical_key)
+            if tips:
+                return random.choice(tips)
+        elif token in tips_per_topic:
+            # token is canonical key itself
+            tips = tips_per_topic.get(token)
+            if tips:
+                return random.choice(tips)
+
+
+    log.debug("No keywords matched, returning generic tip.")
+    generic_tips = [
+        "Let's try to understand the problem step by step. Would you like more help?",
+        "Math can be fun if we break it down together. Need some help?",
+        "Take it one step at a time. Want me to guide you?",
+        "Try to look at each number carefully. Need some help?",
+        "Don't worry, I'm here to help you understand. Would you like more help?"
+    ]
+    return random.choice(generic_tips)
@@ -0,0 +1,42 @@
+"""Running under cooperative (gevent) workers as well as threads.
+
+With ``GUNICORN_PROFILE=gevent`` (see gunicorn.conf.py) the standard library is
+monkey-patched before the app is imported: sockets, sleeps, locks and threads
+become greenlets on one OS thread, so a request waiting on MySQL or the LLM
+costs a few KB instead of a worker. Two things still block every greenlet of
+the worker and are handled here and in database.py:
+
+    C-level I/O      the mysql-connector C extension talks to the socket
+                     itself; database.settings() picks the pure-Python
+                     protocol while we are patched
+    CPU-bound calls  bcrypt hashing; ``offload`` and ``executor`` run it on
+                     real OS threads (bcrypt releases the GIL meanwhile)
+
+Under the default sync/threaded servers both helpers are plain calls.
+"""
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+def cooperative():
+    """True when gevent has patched the socket module of this process."""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('socket')
+
+
+def offload(function, *args, **kwargs):
+    """Call ``function`` on a native thread when cooperative, so the other greenlets keep running."""
+    if not cooperative():
+        return function(*args, **kwargs)
+    import gevent
+
+    return gevent.get_hub().threadpool.apply(function, args, kwargs)
+
+
+def executor(max_workers, thread_name_prefix=''):
+    """A ThreadPoolExecutor whose workers are OS threads even when ``threading`` is patched."""
+    if not cooperative():
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+    from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+
+    return NativeThreadPoolExecutor(max_workers=max_workers)
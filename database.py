@@ -0,0 +1,476 @@
+"""Thin wrappers around mysql.connector connections and cursors.
+
+Every call that waits on the server (execute, fetch, commit, ...) is charged to
+the current request's db time in ``metrics``. Executed statements are also
+profiled per request: query count, time per statement shape (fingerprint),
+a slow-query log and a warning when the same shape is repeated within one
+request (the usual N+1 pattern). Everything else is passed straight through
+to the real connector objects.
+
+Connections: ``get_db()`` hands each request one connection from a pool that
+is created on first use, so the app starts (and serves pages that need no
+data) while MySQL is unreachable; the connection goes back to the pool when
+the request ends. ``connection()`` borrows one outside that lifecycle. When
+the pool is empty it waits up to DB_POOL_TIMEOUT seconds for a connection to
+come back, then opens a direct one, at most DB_POOL_OVERFLOW of them at a time;
+past that it raises PoolExhausted, which a request gets as a 503 with
+Retry-After rather than piling more connections on MySQL. Under gevent
+workers the pure-Python protocol is used, so waiting on MySQL yields to the
+other greenlets (see concurrency.py).
+
+Read replicas: ``get_db(read_only=True)`` gives the request a connection to
+one of DB_REPLICA_HOSTS (round robin) for queries that only read. A replica is
+skipped, and the read goes to the primary, while it is unreachable or more
+than DB_REPLICA_MAX_LAG seconds behind (checked with SHOW REPLICA STATUS at
+most every DB_REPLICA_CHECK_SECONDS; the DB_USER needs REPLICATION CLIENT).
+Read-your-writes: a commit during a request stamps the logged-in user's
+session, and for DB_READ_YOUR_WRITES_SECONDS afterwards that user's reads go
+to the primary too, as do reads later in the request that wrote.
+
+Embedded: with DB_SQLITE_PATH set the data lives in that SQLite file instead
+(sqlite_db.py) and the MySQL settings are not used; there are no replicas.
+
+Settings (environment):
+    DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_DATABASE (or DB_NAME)
+    DB_SQLITE_PATH          use this SQLite file instead of MySQL (one machine, no server)
+    DB_POOL_SIZE            pooled connections per process (default 10, at most 32)
+    DB_POOL_TIMEOUT         seconds to wait for a pooled connection (default 0)
+    DB_POOL_OVERFLOW        direct connections per process once the pool is empty (default DB_POOL_SIZE)
+    DB_USE_PURE             1/0 forces the pure-Python / C protocol (default: pure under gevent)
+    DB_REPLICA_HOSTS        host[:port],... read replicas (same user, password and database)
+    DB_REPLICA_POOL_SIZE    pooled connections per replica (default DB_POOL_SIZE)
+    DB_REPLICA_MAX_LAG      seconds a replica may be behind and still serve reads (default 2)
+    DB_REPLICA_CHECK_SECONDS  how often each replica's lag is checked (default 5)
+    DB_READ_YOUR_WRITES_SECONDS  reads go to the primary this long after the user wrote
+                            (default DB_REPLICA_MAX_LAG + DB_REPLICA_CHECK_SECONDS)
+    SLOW_QUERY_MS           log statements slower than this (default 200)
+    QUERY_REPEAT_THRESHOLD  warn when one shape runs this often in a request (default 3)
+    SQL_PROFILE_HEADER      set to 1 to send the X-SQL-Profile header outside debug mode
+"""
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from time import perf_counter
+
+import mysql.connector
+from flask import g, has_app_context, session
+from werkzeug.exceptions import ServiceUnavailable
+
+import concurrency
+import metrics
+import sqlite_db
+
+
+log = logging.getLogger('sql')
+
+SLOW_QUERY_SECONDS = float(os.getenv('SLOW_QUERY_MS', '200')) / 1000
+REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', '3'))
+
+_LITERAL = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|\b\d+(?:\.\d+)?\b|%\(\w+\)s|%s""")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement):
+    """Normalise a statement so that calls differing only in values compare equal.
+
+    >>> fingerprint("SELECT * FROM users WHERE id = %s AND name IN ('a', 'b')")
+    'SELECT * FROM users WHERE id = ? AND name IN (...)'
+    """
+    shape = _LITERAL.sub('?', statement)
+    shape = _PLACEHOLDER_LIST.sub('(...)', shape)
+    shape = _REPEATED_ROWS.sub('(...)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+class QueryProfile:
+    __slots__ = ('count', 'time', 'shapes', 'flagged')
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.shapes = {}     # fingerprint -> [executions, seconds]
+        self.flagged = []    # fingerprints repeated >= REPEAT_THRESHOLD times
+
+    def record(self, shape, seconds):
+        self.count += 1
+        self.time += seconds
+        entry = self.shapes.get(shape)
+        if entry is None:
+            self.shapes[shape] = [1, seconds]
+            return 1
+        entry[0] += 1
+        entry[1] += seconds
+        return entry[0]
+
+    def summary(self):
+        return f"queries={self.count}; time_ms={self.time * 1000:.1f}; shapes={len(self.shapes)}; repeated={len(self.flagged)}"
+
+
+def _record(statement, seconds):
+    metrics.add_time('db', seconds)
+    if isinstance(statement, bytes):
+        statement = statement.decode('utf-8', 'replace')
+    shape = fingerprint(statement)
+
+    stats = metrics.current_request()
+    endpoint = stats.endpoint if stats is not None else None
+    if seconds >= SLOW_QUERY_SECONDS:
+        log.warning("slow query %.1f ms [%s]: %s", seconds * 1000, endpoint, shape)
+
+    if stats is None:
+        return
+    if stats.queries is None:
+        stats.queries = QueryProfile()
+    runs = stats.queries.record(shape, seconds)
+    if runs == REPEAT_THRESHOLD:
+        stats.queries.flagged.append(shape)
+        log.warning("statement repeated %d times in one request [%s]: %s", runs, endpoint, shape)
+
+
+class Cursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            _record(operation, perf_counter() - start)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            _record(operation, perf_counter() - start)
+
+    def fetchone(self):
+        with metrics.timed('db'):
+            return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        with metrics.timed('db'):
+            return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        with metrics.timed('db'):
+            return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class Connection:
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return Cursor(self._connection.cursor(*args, **kwargs))
+
+    def commit(self):
+        with metrics.timed('db'):
+            result = self._connection.commit()
+        if has_app_context():
+            g.db_wrote = True   # see get_db(read_only=True)
+        return result
+
+    def rollback(self):
+        with metrics.timed('db'):
+            return self._connection.rollback()
+
+    def ping(self, *args, **kwargs):
+        with metrics.timed('db'):
+            return self._connection.ping(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def embedded():
+    """The SQLite file to use instead of MySQL (DB_SQLITE_PATH), or None."""
+    return os.getenv('DB_SQLITE_PATH') or None
+
+
+def connect(**kwargs):
+    with metrics.timed('db'):
+        if embedded():
+            return Connection(sqlite_db.connect(embedded()))
+        return Connection(mysql.connector.connect(**kwargs))
+
+
+def settings():
+    """Connection settings from the DB_* environment variables."""
+    use_pure = os.getenv("DB_USE_PURE")
+    return dict(
+        host=os.getenv("DB_HOST"),
+        port=int(os.getenv("DB_PORT", 3306)),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_DATABASE") or os.getenv("DB_NAME"),
+        # The C extension does its socket I/O where gevent cannot switch greenlets
+        use_pure=use_pure == "1" if use_pure else concurrency.cooperative(),
+    )
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool, opened on first use (and retried on the next call if that fails)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from mysql.connector import pooling
+
+                if embedded():
+                    _pool = sqlite_db.Pool(embedded(), int(os.getenv('DB_POOL_SIZE', '10')))
+                    return _pool
+                with metrics.timed('db'):
+                    _pool = pooling.MySQLConnectionPool(
+                        pool_name='app',
+                        pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+                        pool_reset_session=True,
+                        **settings(),
+                    )
+    return _pool
+
+
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '0'))
+POOL_OVERFLOW = int(os.getenv('DB_POOL_OVERFLOW') or os.getenv('DB_POOL_SIZE', '10'))
+_overflow = threading.BoundedSemaphore(POOL_OVERFLOW) if POOL_OVERFLOW > 0 else None
+
+
+class PoolExhausted(ServiceUnavailable):
+    """The pool stayed empty and DB_POOL_OVERFLOW direct connections are already open."""
+
+
+class Overflow(Connection):
+    """A direct connection opened past the pool; close() frees its overflow slot."""
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._released = False
+
+    def close(self):
+        try:
+            return self._connection.close()
+        finally:
+            if not self._released:
+                self._released = True
+                _overflow.release()
+
+
+def connection():
+    """A pooled connection (a direct one when the pool stays exhausted); close() gives it back.
+
+    Raises PoolExhausted (a 503 in a request) when DB_POOL_OVERFLOW direct ones are open too.
+    """
+    deadline = perf_counter() + POOL_TIMEOUT
+    delay = 0.005
+    with metrics.timed('db'):
+        while True:
+            try:
+                return Connection(get_pool().get_connection())
+            except mysql.connector.errors.PoolError:
+                if perf_counter() >= deadline:
+                    break
+            # The pool has no blocking get; poll (a greenlet switch under gevent)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+    if _overflow is None or not _overflow.acquire(blocking=False):
+        log.warning("connection pool exhausted and %d direct connections open, refusing", POOL_OVERFLOW)
+        raise PoolExhausted("The database is busy, please try again.", retry_after=1)
+    log.warning("connection pool exhausted, opening a direct connection")
+    try:
+        return Overflow(connect(**settings())._connection)
+    except BaseException:
+        _overflow.release()
+        raise
+
+
+REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '2'))
+REPLICA_CHECK_SECONDS = float(os.getenv('DB_REPLICA_CHECK_SECONDS', '5'))
+READ_YOUR_WRITES_SECONDS = float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', REPLICA_MAX_LAG + REPLICA_CHECK_SECONDS))
+WROTE_AT = '_db_wrote_at'   # session key: when this user last committed a write
+
+
+def replica_lag(conn):
+    """Seconds ``conn``'s server is behind its source, or None when it is not replicating."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except mysql.connector.ProgrammingError:   # MySQL before 8.0.22, MariaDB
+            cursor.execute("SHOW SLAVE STATUS")
+        channels = cursor.fetchall()
+    finally:
+        cursor.close()
+    lags = [row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master')) for row in channels]
+    if not lags or None in lags:
+        return None
+    return max(lags)
+
+
+class Replica:
+    """One read replica: its own lazily opened pool and the result of the last lag check."""
+
+    def __init__(self, index, host, port):
+        self.name = f'{host}:{port}'
+        self.index = index
+        self.host = host
+        self.port = port
+        self.pool = None
+        self.healthy = True
+        self.checked = None   # perf_counter() of the last check; None forces one
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        if self.pool is None:
+            with self._lock:
+                if self.pool is None:
+                    from mysql.connector import pooling
+
+                    self.pool = pooling.MySQLConnectionPool(
+                        pool_name=f'replica{self.index}',
+                        pool_size=int(os.getenv('DB_REPLICA_POOL_SIZE') or os.getenv('DB_POOL_SIZE', '10')),
+                        pool_reset_session=True,
+                        **dict(settings(), host=self.host, port=self.port),
+                    )
+        return self.pool
+
+    def _mark(self, healthy, reason=None):
+        if healthy != self.healthy:
+            if healthy:
+                log.info("replica %s is back in rotation", self.name)
+            else:
+                log.warning("replica %s taken out of rotation: %s", self.name, reason)
+        self.healthy = healthy
+        self.checked = perf_counter()
+
+    def connection(self):
+        """A pooled connection, or None while this replica is down, lagging or out of connections."""
+        due = self.checked is None or perf_counter() - self.checked >= REPLICA_CHECK_SECONDS
+        if not (self.healthy or due):
+            return None
+        try:
+            with metrics.timed('db'):
+                conn = Connection(self._get_pool().get_connection())
+        except mysql.connector.errors.PoolError:
+            return None
+        except mysql.connector.Error as e:
+            self._mark(False, e)
+            return None
+        if due:
+            try:
+                lag = replica_lag(conn)
+            except mysql.connector.Error as e:
+                lag, reason = None, e
+            else:
+                reason = 'replication is not running' if lag is None else f'{lag}s behind'
+            self._mark(lag is not None and lag <= REPLICA_MAX_LAG, reason)
+            if not self.healthy:
+                conn.close()
+                return None
+        return conn
+
+
+_replicas = None
+_next_replica = itertools.count()
+
+
+def replicas():
+    """The replicas from DB_REPLICA_HOSTS (empty when there are none)."""
+    global _replicas
+    if _replicas is None and embedded():
+        _replicas = []
+    if _replicas is None:
+        found = []
+        for index, address in enumerate(filter(None, (part.strip() for part in os.getenv('DB_REPLICA_HOSTS', '').split(',')))):
+            host, _, port = address.partition(':')
+            found.append(Replica(index, host, int(port or os.getenv("DB_PORT", 3306))))
+        _replicas = found
+    return _replicas
+
+
+def replica_connection():
+    """A connection to the next healthy replica, or None when none can serve reads right now."""
+    pool = replicas()
+    start = next(_next_replica)
+    for offset in range(len(pool)):
+        conn = pool[(start + offset) % len(pool)].connection()
+        if conn is not None:
+            return conn
+    return None
+
+
+def _must_read_primary():
+    if g.get('db_wrote'):
+        return True
+    wrote_at = session.get(WROTE_AT)
+    return wrote_at is not None and time.time() - wrote_at < READ_YOUR_WRITES_SECONDS
+
+
+def get_db(read_only=False):
+    """The current request's connection, borrowed on first use and returned at teardown.
+
+    With ``read_only=True`` the caller promises to only read, and gets a replica
+    connection when one is configured, healthy and safe for this user to read
+    from (see the module docstring); otherwise the primary connection.
+    """
+    if read_only and replicas() and not _must_read_primary():
+        if 'db_replica' not in g:
+            g.db_replica = replica_connection()
+        if g.db_replica is not None:
+            return g.db_replica
+    if 'db' not in g:
+        g.db = connection()
+    return g.db
+
+
+def init_app(app):
+    """Return request connections to the pool, and send a per-request query summary
+    header in debug mode (or with SQL_PROFILE_HEADER=1)."""
+    enabled = os.getenv('SQL_PROFILE_HEADER') == '1'
+
+    @app.after_request
+    def _remember_write(response):
+        # Read-your-writes: keep this user's reads on the primary for a while
+        if g.get('db_wrote') and replicas() and 'user_id' in session:
+            session[WROTE_AT] = time.time()
+        return response
+
+    @app.teardown_appcontext
+    def _release_connection(exc):
+        for name in ('db', 'db_replica'):
+            db = g.pop(name, None)
+            if db is not None:
+                try:
+                    db.close()
+                except Exception:
+                    log.exception("could not return a connection to the pool")
+
+    @app.after_request
+    def _query_summary(response):
+        if not (enabled or app.debug):
+            return response
+        stats = metrics.current_request()
+        profile = stats.queries if stats is not None else None
+        if profile is not None:
+            response.headers['X-SQL-Profile'] = profile.summary()
+            response.headers['Server-Timing'] = f"db;dur={stats.db * 1000:.1f}"
+        return response
+
+    return app
@@ -0,0 +1,107 @@
+"""Extension objects shared by the blueprints, bound to the app in create_app()."""
+import hashlib
+from functools import wraps
+
+from flask import current_app, jsonify, request, session
+from flask_bcrypt import Bcrypt
+
+import state
+
+bcrypt = Bcrypt()
+
+
+def get_leaderboards():
+    """The app's leaderboards (they load in the background; wait_loaded() before reading them)."""
+    return current_app.extensions['leaderboards']
+
+
+def get_state():
+    """The shared state store (state.py) chosen by STATE_URL."""
+    return current_app.extensions['state']
+
+
+def get_keys():
+    """Where idempotency keys and rate limit counters live, the same for every worker.
+
+    The state store when it is shared, otherwise the database (state.DatabaseBackend).
+    """
+    return current_app.extensions['keys']
+
+
+def cache(name):
+    """One of the app's state.Cache instances.
+
+    'stage-progress', 'game-progress', 'progress-doc', 'player-flags' and 'profile'.
+    """
+    return current_app.extensions['caches'][name]
+
+
+def rate_limited(setting, key, body):
+    """Answer 429 with ``body`` once ``key()`` has used up the app's ``setting``.
+
+    The setting is "COUNT/SECONDS" (empty turns the limit off); only POSTs count.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            rule = current_app.config.get(setting)
+            if rule and request.method == 'POST':
+                limit, window = (int(part) for part in rule.split('/'))
+                if not state.allow(get_keys(), f'{setting}:{key()}', limit, window):
+                    return jsonify(body), 429
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+# How long the first request with an idempotency key may run before a repeat may run it again
+IDEMPOTENCY_PENDING_SECONDS = 30
+
+
+def idempotent(scope):
+    """Answer a repeated ``Idempotency-Key`` header with the stored first response.
+
+    The first request with a key runs the view, and its JSON body and status are
+    kept for IDEMPOTENCY_SECONDS, per user. A retry gets that answer without
+    running the view again. A retry that arrives while the first request is
+    still running gets 409. The same key with a different body gets 422.
+    Server errors are not stored, so they can be retried. Requests without the
+    header, or from anonymous users, run as usual.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            key = request.headers.get('Idempotency-Key', '').strip()
+            user_id = session.get('user_id')
+            if not key or not user_id:
+                return view(*args, **kwargs)
+            if len(key) > 100:
+                return jsonify({'error': 'Idempotency-Key is too long'}), 400
+
+            store = get_keys()
+            name = f'idempotency:{scope}:{user_id}:{key}'
+            digest = hashlib.sha1(request.get_data()).hexdigest()[:16]
+            if not store.add(name, {'request': digest}, ttl=IDEMPOTENCY_PENDING_SECONDS):
+                outcome = store.get(name) or {}
+                if outcome.get('request', digest) != digest:
+                    return jsonify({'error': 'Idempotency-Key was already used for a different request'}), 422
+                if 'status' not in outcome:
+                    return jsonify({'error': 'The first request with this Idempotency-Key is still running'}), 409
+                response = jsonify(outcome['body'])
+                response.status_code = outcome['status']
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except Exception:
+                store.delete(name)
+                raise
+            if response.status_code >= 500 or not response.is_json:
+                store.delete(name)
+            else:
+                store.set(name, {'request': digest, 'status': response.status_code, 'body': response.get_json()},
+                          ttl=current_app.config['IDEMPOTENCY_SECONDS'])
+            return response
+        return wrapped
+    return decorator
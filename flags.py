@@ -0,0 +1,112 @@
+"""Tutorials seen and stage rewards claimed, as per-player bitsets.
+
+Both are yes/no facts about a fixed set of keys, so one player's flags fit in
+an integer per registry (catalogue.TUTORIAL_KEYS and REWARD_KEYS). Bit i
+stands for the registry's i-th key. A key outside the registry is kept by
+name in a short extra list next to the bits, for example the tutorial of a
+page added before its key was registered or a stage the catalogue does not
+know. A player's flags are
+
+    {'t': [bits, [extra tutorial keys]], 'r': [bits, [extra "map-stage" keys]]}
+
+and get() answers from the cache ('player-flags'). On a miss it loads them
+with one query over user_tutorials and stage_rewards_claimed. In document mode
+they are part of the progress document, which is loaded and cached the same
+way. tutorial_done() and reward_claimed() are then a bit test.
+"""
+from catalogue import REWARD_KEYS, TUTORIAL_KEYS
+from database import get_db
+from extensions import cache
+
+
+class Registry:
+    """Maps the keys of one kind of flag to bit positions."""
+
+    def __init__(self, keys, name=str):
+        self.keys = tuple(keys)
+        self.name = name   # key -> its name in the extra list
+        self._bits = {key: bit for bit, key in enumerate(self.keys)}
+
+    def empty(self):
+        return [0, []]
+
+    def add(self, flags, key):
+        bit = self._bits.get(key)
+        if bit is not None:
+            flags[0] |= 1 << bit
+        elif self.name(key) not in flags[1]:
+            flags[1].append(self.name(key))
+
+    def has(self, flags, key):
+        bit = self._bits.get(key)
+        if bit is not None:
+            return bool(flags[0] >> bit & 1)
+        return self.name(key) in flags[1]
+
+    def pack(self, keys):
+        flags = self.empty()
+        for key in keys:
+            self.add(flags, key)
+        return flags
+
+    def unpack(self, flags):
+        """The registered keys that are set (the extra names are in flags[1])."""
+        return [key for bit, key in enumerate(self.keys) if flags[0] >> bit & 1]
+
+
+TUTORIALS = Registry(TUTORIAL_KEYS)
+REWARDS = Registry(REWARD_KEYS, name=lambda key: f"{key[0]}-{key[1]}")
+
+
+def reward_key(map_name, stage):
+    try:
+        return map_name, int(stage)
+    except (TypeError, ValueError):
+        return map_name, stage
+
+
+def load(cursor, user_id):
+    """One player's flags from the row tables, in one query."""
+    cursor.execute("""
+        SELECT 't', tutorial_key, NULL FROM user_tutorials WHERE user_id = %s AND completed = 1
+        UNION ALL
+        SELECT 'r', map_name, stage_number FROM stage_rewards_claimed WHERE user_id = %s AND claimed = 1
+    """, (user_id, user_id))
+    flags = {'t': TUTORIALS.empty(), 'r': REWARDS.empty()}
+    for kind, key, stage in cursor.fetchall():
+        if kind == 't':
+            TUTORIALS.add(flags['t'], key)
+        else:
+            REWARDS.add(flags['r'], reward_key(key, stage))
+    return flags
+
+
+def _read(user_id):
+    cursor = get_db(read_only=True).cursor()
+    try:
+        return load(cursor, user_id)
+    finally:
+        cursor.close()
+
+
+def get(user_id):
+    """One player's flags (see the module docstring)."""
+    import progress_doc
+
+    if progress_doc.enabled():
+        doc = progress_doc.get(user_id)
+        return {'t': doc['t'], 'r': doc['r']}
+    return cache('player-flags').get(user_id, lambda: _read(user_id))
+
+
+def changed(user_id):
+    """Drop the cached flags after a committed tutorial or reward change."""
+    cache('player-flags').invalidate(user_id)
+
+
+def tutorial_done(flags, key):
+    return TUTORIALS.has(flags['t'], key)
+
+
+def reward_claimed(flags, map_name, stage):
+    return REWARDS.has(flags['r'], reward_key(map_name, stage))
@@ -0,0 +1,62 @@
+"""Production server settings.
+
+    gunicorn -c gunicorn.conf.py 'app:create_app()'
+    GUNICORN_PROFILE=gevent gunicorn -c gunicorn.conf.py 'app:create_app()'
+
+Profiles (GUNICORN_PROFILE):
+    sync    (default) one request per worker process; a chat turn waiting on
+            the LLM holds its worker for the whole wait
+    gevent  cooperative workers: each process serves up to
+            GUNICORN_WORKER_CONNECTIONS requests at once, switching greenlets
+            whenever one waits on MySQL or the LLM. Needs ``pip install gevent``.
+
+Other settings: PORT (default 8000), WEB_CONCURRENCY (worker processes),
+GUNICORN_TIMEOUT. The app is not preloaded: every worker builds its own
+create_app(), so the DB pool and LLM client are opened after the fork (and,
+under gevent, after the monkey-patching). benchmarks/loadtest.py --profile
+compares the two.
+
+More than one worker needs STATE_URL (see state.py), as several hosts do.
+Without it each worker has its own in-process store, and a save handled by
+one worker does not clear the others' cached copy of that player. Those caches
+then keep entries for a few seconds only (state.Cache), instead of
+PROGRESS_CACHE_SECONDS / PROFILE_CACHE_SECONDS, each worker's leaderboards
+take in the others' saves only when it rebuilds them from the database (every
+LEADERBOARD_REBUILD_SECONDS), and when_ready() logs a warning.
+Rate limits and idempotency keys are kept in the database then (state_keys),
+so they hold across workers either way.
+"""
+import multiprocessing
+import os
+
+profile = os.getenv('GUNICORN_PROFILE', 'sync')
+if profile not in ('sync', 'gevent'):
+    raise RuntimeError(f"GUNICORN_PROFILE must be sync or gevent, not {profile!r}")
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '8000')}")
+preload_app = False
+
+if profile == 'gevent':
+    worker_class = 'gevent'
+    workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+    # Only a heartbeat here: a long LLM wait does not block the worker
+    timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+    # Many requests share one process: let them queue for a pooled MySQL
+    # connection instead of each opening its own when the pool runs dry
+    os.environ.setdefault('DB_POOL_SIZE', '32')
+    os.environ.setdefault('DB_POOL_TIMEOUT', '10')
+else:
+    worker_class = 'sync'
+    workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+    # Longer than LLM_TIMEOUT, or a slow completion kills the worker mid-request
+    timeout = int(os.getenv('GUNICORN_TIMEOUT', 90))
+    # One request at a time per process (plus one for an export or leaderboard rebuild)
+    os.environ.setdefault('DB_POOL_SIZE', '2')
+
+
+def when_ready(server):
+    if workers > 1 and not os.getenv('STATE_URL'):
+        server.log.warning("%d workers without STATE_URL: every worker caches on its own, so player "
+                           "caches expire after a few seconds instead of PROGRESS_CACHE_SECONDS, and the "
+                           "leaderboards agree only after each LEADERBOARD_REBUILD_SECONDS rebuild", workers)
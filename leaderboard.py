@@ -0,0 +1,521 @@
+"""In-memory leaderboards for stars, accuracy and 3-star streaks.
+
+Each board keeps its entries in an indexable skip list ordered best-first, so
+updating a player, looking up their rank and reading a page of the top N are
+all O(log n) instead of an ORDER BY over every user per request.
+
+Boards exist globally and per map:
+
+    stars      total stars earned
+    accuracy   correct / total answers (players with ACCURACY_MIN_ANSWERS or more)
+    streak     longest run of consecutive 3-star stages, following the roadmap
+               order of the maps in the catalogue (per map: within that map)
+
+The boards are fed by the progress save routes and can be rebuilt from
+user_progress / user_game_progress at any time. Every process keeps its own
+copy, loaded by a background thread when the app starts (load_in_background);
+saves recorded before it is ready are applied on top once it is.
+
+The raw per-player numbers are kept in a JSON snapshot, so a restart does not
+always have to read the whole tables again. Its ``saved_at`` is when the copy
+it holds was last complete, and one older than LEADERBOARD_SNAPSHOT_MAX_AGE is
+rebuilt from the database instead of loaded. With a shared state store
+(STATE_URL, see state.py) each update is broadcast, so the workers on every
+node apply the saves handled by the others, and one of them writes the
+snapshot to the store every LEADERBOARD_SAVE_SECONDS. Without one, each
+process only sees its own saves, so every process rebuilds its copy from the
+database every LEADERBOARD_REBUILD_SECONDS (start_rebuild) to take in the
+others'; the snapshot file is written right after each rebuild, and ages from
+then.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from catalogue import MAPS, reward_data
+
+log = logging.getLogger('app.leaderboard')
+
+ACCURACY_MIN_ANSWERS = 20
+STAGES = {map_name: tuple(sorted(reward_data[map_name])) for map_name in MAPS}
+METRICS = ('stars', 'accuracy', 'streak')
+SNAPSHOT_VERSION = 1
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        # width[i]: how many level-0 steps next[i] jumps over
+        self.width = [1] * level
+
+
+class SkipList:
+    """Sorted set of comparable keys with O(log n) rank and positional access."""
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self, seed=None):
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+        self._random = random.Random(seed)
+
+    def __len__(self):
+        return self._size
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and self._random.random() < self.P:
+            level += 1
+        return level
+
+    def insert(self, key):
+        update = [self._head] * self.MAX_LEVEL
+        steps = [0] * self.MAX_LEVEL   # level-0 position of update[i]
+        node = self._head
+        for i in reversed(range(self._level)):
+            steps[i] = steps[i + 1] if i + 1 < self._level else 0
+            while node.next[i] is not None and node.next[i].key < key:
+                steps[i] += node.width[i]
+                node = node.next[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                self._head.width[i] = self._size
+            self._level = level
+
+        new = _Node(key, level)
+        for i in range(level):
+            new.next[i] = update[i].next[i]
+            update[i].next[i] = new
+            new.width[i] = update[i].width[i] - (steps[0] - steps[i])
+            update[i].width[i] = steps[0] - steps[i] + 1
+        for i in range(level, self._level):
+            update[i].width[i] += 1
+        self._size += 1
+
+    def remove(self, key):
+        update = [self._head] * self.MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            update[i] = node
+        target = node.next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for i in range(self._level):
+            if update[i].next[i] is target:
+                update[i].width[i] += target.width[i] - 1
+                update[i].next[i] = target.next[i]
+            else:
+                update[i].width[i] -= 1
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+
+    def rank(self, key):
+        """1-based position of ``key``, or None if absent."""
+        node, position = self._head, 0
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key <= key:
+                position += node.width[i]
+                node = node.next[i]
+        return position if node is not self._head and node.key == key else None
+
+    def slice(self, start, count):
+        """Up to ``count`` keys from 0-based position ``start``."""
+        if start >= self._size or count <= 0:
+            return []
+        node, position = self._head, 0
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and position + node.width[i] <= start + 1:
+                position += node.width[i]
+                node = node.next[i]
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class Board:
+    """Players ordered by a score tuple, highest first; ties go to the lower user id."""
+
+    def __init__(self):
+        self._scores = {}
+        self._index = SkipList()
+
+    def __len__(self):
+        return len(self._scores)
+
+    @staticmethod
+    def _key(user_id, score):
+        return tuple(-value for value in score) + (user_id,)
+
+    def set(self, user_id, score):
+        """Set (or with None, drop) a player's score."""
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._index.remove(self._key(user_id, old))
+            del self._scores[user_id]
+        if score is not None:
+            self._index.insert(self._key(user_id, score))
+            self._scores[user_id] = score
+
+    def get(self, user_id):
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._index.rank(self._key(user_id, score)), score
+
+    def page(self, offset=0, limit=10):
+        return [(offset + i + 1, key[-1], self._scores[key[-1]])
+                for i, key in enumerate(self._index.slice(offset, limit))]
+
+
+def _streak(stars_by_map, maps):
+    best = run = 0
+    for map_name in maps:
+        stages = stars_by_map.get(map_name, {})
+        for stage in STAGES[map_name]:
+            run = run + 1 if stages.get(stage, 0) >= 3 else 0
+            best = max(best, run)
+    return best
+
+
+class Leaderboards:
+    SNAPSHOT_KEY = 'leaderboards:snapshot'
+    SAVER_KEY = 'leaderboards:saver'
+    CHANNEL = 'leaderboard'
+
+    def __init__(self, snapshot_path=None, store=None):
+        self.snapshot_path = snapshot_path
+        # Only a store shared between nodes replaces the snapshot file
+        self.store = store if store is not None and store.shared else None
+        self._lock = threading.RLock()
+        self._loaded = threading.Event()
+        self._pending = []        # updates recorded during a load or rebuild, replayed after it
+        self._filling = False
+        self._complete_at = 0.0   # when this copy last held every player's numbers
+        self._dirty = False
+        self._reset()
+
+    def _reset(self):
+        self._stars = {}     # user_id -> {map: {stage: stars}}
+        self._answers = {}   # user_id -> {map: (correct, total)}
+        self._boards = {(metric, map_name): Board()
+                        for metric in METRICS for map_name in (None,) + MAPS}
+
+    def board(self, metric, map_name=None):
+        return self._boards[(metric, map_name)]
+
+    # --- Updates ---
+
+    def _refresh_stars(self, user_id):
+        stars = self._stars.get(user_id, {})
+        for map_name in MAPS:
+            stages = stars.get(map_name)
+            self.board('stars', map_name).set(user_id, (sum(stages.values()),) if stages else None)
+            self.board('streak', map_name).set(user_id, (_streak(stars, (map_name,)),) if stages else None)
+        self.board('stars').set(user_id, (sum(sum(s.values()) for s in stars.values()),) if stars else None)
+        self.board('streak').set(user_id, (_streak(stars, MAPS),) if stars else None)
+
+    def _refresh_answers(self, user_id):
+        answers = self._answers.get(user_id, {})
+
+        def score(correct, total):
+            return (round(correct / total, 4), total) if total >= ACCURACY_MIN_ANSWERS else None
+
+        for map_name in MAPS:
+            self.board('accuracy', map_name).set(user_id, score(*answers.get(map_name, (0, 0))))
+        self.board('accuracy').set(user_id, score(sum(c for c, _ in answers.values()),
+                                                  sum(t for _, t in answers.values())))
+
+    def _set_stars(self, user_id, map_name, stage, stars):
+        self._stars.setdefault(user_id, {}).setdefault(map_name, {})[stage] = stars
+        self._refresh_stars(user_id)
+
+    def _set_answers(self, user_id, map_name, correct, total):
+        self._answers.setdefault(user_id, {})[map_name] = (correct, total)
+        self._refresh_answers(user_id)
+
+    def record_stars(self, user_id, map_name, stage, stars, broadcast=True):
+        try:
+            stage, stars = int(stage), int(stars)
+        except (TypeError, ValueError):
+            return
+        if map_name not in STAGES:
+            return
+        with self._lock:
+            if self._loaded.is_set():
+                self._set_stars(user_id, map_name, stage, stars)
+                self._dirty = True
+            if self._filling or not self._loaded.is_set():
+                self._pending.append((self._set_stars, (user_id, map_name, stage, stars)))
+        if broadcast:
+            self._publish({'kind': 'stars', 'user_id': user_id, 'map': map_name, 'stage': stage, 'stars': stars})
+
+    def record_answers(self, user_id, map_name, correct, total, broadcast=True):
+        try:
+            correct, total = int(correct), int(total)
+        except (TypeError, ValueError):
+            return
+        if map_name not in STAGES:
+            return
+        with self._lock:
+            if self._loaded.is_set():
+                self._set_answers(user_id, map_name, correct, total)
+                self._dirty = True
+            if self._filling or not self._loaded.is_set():
+                self._pending.append((self._set_answers, (user_id, map_name, correct, total)))
+        if broadcast:
+            self._publish({'kind': 'answers', 'user_id': user_id, 'map': map_name,
+                           'correct': correct, 'total': total})
+
+    # --- Other nodes ---
+
+    def _publish(self, message):
+        if self.store is None:
+            return
+        try:
+            self.store.publish(self.CHANNEL, message)
+        except Exception:
+            log.exception("Could not broadcast a leaderboard update")
+
+    def _apply(self, message):
+        kind = message.get('kind')
+        if kind == 'stars':
+            self.record_stars(message['user_id'], message['map'], message['stage'], message['stars'], broadcast=False)
+        elif kind == 'answers':
+            self.record_answers(message['user_id'], message['map'], message['correct'], message['total'],
+                                broadcast=False)
+        elif kind == 'reload':
+            self.load()
+
+    def announce_reload(self):
+        """Tell the other nodes to reload from the (just saved) shared snapshot."""
+        self._publish({'kind': 'reload'})
+
+    # --- Reads ---
+
+    def wait_loaded(self, timeout=None):
+        """True once the boards have been loaded (waiting up to ``timeout`` seconds for it)."""
+        return self._loaded.wait(timeout)
+
+    def top(self, metric, map_name=None, offset=0, limit=10):
+        with self._lock:
+            return self.board(metric, map_name).page(offset, limit)
+
+    def position(self, metric, user_id, map_name=None):
+        """(rank, score) of one player, or None when they are not on the board."""
+        with self._lock:
+            return self.board(metric, map_name).get(user_id)
+
+    # --- Loading and persistence ---
+
+    def _start_fill(self):
+        with self._lock:
+            self._filling = True
+
+    def _abandon_fill(self):
+        with self._lock:
+            self._filling = False
+            if self._loaded.is_set():
+                self._pending = []
+
+    def _fill(self, stars, answers, complete_at):
+        with self._lock:
+            self._reset()
+            self._stars, self._answers = stars, answers
+            for user_id in stars:
+                self._refresh_stars(user_id)
+            for user_id in answers:
+                self._refresh_answers(user_id)
+            # Saves recorded while loading; the values are absolute, so newer ones win
+            for apply, args in self._pending:
+                apply(*args)
+            self._dirty = bool(self._pending)
+            self._pending = []
+            self._filling = False
+            self._complete_at = complete_at
+            self._loaded.set()
+
+    def rebuild(self, connection, chunk_rows=5000):
+        """Reload every player from the progress tables."""
+        started = time.time()
+        stars, answers = {}, {}
+        self._start_fill()
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT user_id, map_name, stage_number, stars FROM user_progress")
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                for user_id, map_name, stage, value in rows:
+                    if map_name in STAGES:
+                        stars.setdefault(user_id, {}).setdefault(map_name, {})[int(stage)] = int(value)
+            cursor.execute("SELECT user_id, map, correct, total FROM user_game_progress")
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                for user_id, map_name, correct, total in rows:
+                    if map_name in STAGES:
+                        answers.setdefault(user_id, {})[map_name] = (correct, total)
+        except BaseException:
+            self._abandon_fill()
+            raise
+        finally:
+            cursor.close()
+        self._fill(stars, answers, started)
+        self._dirty = True
+        log.info("Leaderboards rebuilt: %d players with stars, %d with answers", len(stars), len(answers))
+
+    def save(self):
+        """Write the snapshot; without a shared store, call it only right after rebuild()."""
+        # Never overwrite a good snapshot with the empty state of an unused process
+        if not (self.snapshot_path or self.store) or not self._loaded.is_set():
+            return False
+        with self._lock:
+            if self.store is not None:
+                # Every update reaches this copy, so it is complete now
+                self._complete_at = time.time()
+            data = {
+                'version': SNAPSHOT_VERSION,
+                'saved_at': self._complete_at,
+                'stars': {user_id: {m: {str(s): v for s, v in stages.items()} for m, stages in maps.items()}
+                          for user_id, maps in self._stars.items()},
+                'answers': {user_id: {m: list(pair) for m, pair in maps.items()}
+                            for user_id, maps in self._answers.items()},
+            }
+            self._dirty = False
+        if self.store is not None:
+            self.store.set(self.SNAPSHOT_KEY, data)
+            return True
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        temporary = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temporary, self.snapshot_path)
+        return True
+
+    def load(self, max_age=None):
+        """Load the snapshot; False when it is missing, unreadable or older than ``max_age`` seconds."""
+        if self.store is not None:
+            data = self.store.get(self.SNAPSHOT_KEY) or {}
+        else:
+            try:
+                with open(self.snapshot_path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (TypeError, OSError, ValueError):
+                return False
+        if data.get('version') != SNAPSHOT_VERSION:
+            return False
+        if max_age is not None and time.time() - data.get('saved_at', 0) > max_age:
+            return False
+        self._start_fill()
+        try:
+            stars = {int(user_id): {m: {int(s): v for s, v in stages.items()} for m, stages in maps.items()}
+                     for user_id, maps in data['stars'].items()}
+            answers = {int(user_id): {m: tuple(pair) for m, pair in maps.items()}
+                       for user_id, maps in data['answers'].items()}
+        except BaseException:
+            self._abandon_fill()
+            raise
+        self._fill(stars, answers, data.get('saved_at', 0))
+        log.info("Leaderboards loaded from %s", 'the state store' if self.store is not None else self.snapshot_path)
+        return True
+
+    def load_in_background(self, connect, max_age=None):
+        """Load from the snapshot, or rebuild with a connection from ``connect()``, in a thread.
+
+        Retried until it works, so a database that is not up yet only delays it.
+        """
+        if self.store is not None:
+            # Listen first, so updates saved elsewhere while we load are not lost
+            self.store.subscribe(self.CHANNEL, self._apply)
+
+        def run():
+            delay = 1
+            while True:
+                try:
+                    if self.load(max_age):
+                        return
+                    self._rebuild_with(connect)
+                    break
+                except Exception:
+                    log.exception("Could not load the leaderboards, retrying in %ds", delay)
+                    time.sleep(delay)
+                    delay = min(delay * 2, 60)
+            if self.store is None:
+                self._save_file()
+
+        threading.Thread(target=run, name='leaderboard-load', daemon=True).start()
+
+    def _rebuild_with(self, connect):
+        connection = connect()
+        try:
+            self.rebuild(connection)
+        finally:
+            connection.close()
+
+    def _save_file(self):
+        try:
+            self.save()
+        except OSError:
+            log.exception("Could not save the leaderboard snapshot")
+
+    def start_rebuild(self, connect, interval):
+        """Without a shared store, rebuild from the database every ``interval`` seconds.
+
+        That is how a process takes in the saves handled by the other workers, so
+        their boards agree again after at most ``interval`` seconds (and after a
+        teacher's rebuild). With a store every update reaches every copy already.
+        """
+        if self.store is not None or not interval or interval <= 0:
+            return
+
+        def run():
+            while True:
+                # Spread the workers' rebuilds rather than having them all read the tables at once
+                time.sleep(interval * random.uniform(0.9, 1.1))
+                try:
+                    self._rebuild_with(connect)
+                except Exception:
+                    log.exception("Could not rebuild the leaderboards")
+                    continue
+                self._save_file()
+
+        threading.Thread(target=run, name='leaderboard-rebuild', daemon=True).start()
+
+    def start_autosave(self, interval):
+        """With a shared store, have one process write the snapshot every ``interval`` seconds.
+
+        Without one there is nothing to do: the snapshot file is written after each rebuild.
+        """
+        if self.store is None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                # Whichever worker takes the turn first saves; the others' copies are the same
+                if self._dirty and self.store.add(self.SAVER_KEY, os.getpid(), ttl=interval):
+                    try:
+                        self.save()
+                    except Exception:
+                        log.exception("Could not save the leaderboard snapshot")
+
+        threading.Thread(target=run, name='leaderboard-autosave', daemon=True).start()
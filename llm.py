@@ -0,0 +1,56 @@
+"""Chat completions for Counticus through an OpenAI-compatible API (OpenRouter by default).
+
+The openai package is imported and configured on the first completion rather
+than at startup: it is one of the slowest imports in the app and most
+requests never talk to the model. LLM_API_KEY is required (there is no
+default; a completion without it fails with a RuntimeError). LLM_API_BASE
+points the chatbot somewhere else (the benchmarks use a local stub server),
+LLM_TIMEOUT caps one completion (default 60 s).
+
+The client goes through ``requests``, so under gevent workers the wait for
+the model is a cooperative socket read and does not hold up the worker.
+"""
+import os
+import threading
+
+import metrics
+
+MODEL = "gpt-3.5-turbo"
+SYSTEM_PROMPT = "You are Counticus, a friendly Grade 1 math tutor."
+TIMEOUT = float(os.getenv("LLM_TIMEOUT", 60))
+
+_client = None
+_lock = threading.Lock()
+
+
+def client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                api_key = os.getenv("LLM_API_KEY")
+                if not api_key:
+                    raise RuntimeError("LLM_API_KEY is not set: the chatbot needs an OpenRouter "
+                                       "(or other OpenAI-compatible) API key")
+                import openai
+
+                # 🔥 OpenRouter Setup
+                openai.api_base = os.getenv("LLM_API_BASE", "https://openrouter.ai/api/v1")
+                openai.api_key = api_key
+                _client = openai
+    return _client
+
+
+def complete(prompt, system=SYSTEM_PROMPT, model=MODEL):
+    """One system + user turn; returns the reply text."""
+    openai = client()
+    with metrics.timed('llm'):
+        response = openai.ChatCompletion.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            request_timeout=TIMEOUT,
+        )
+    return response['choices'][0]['message']['content']
@@ -0,0 +1,129 @@
+"""Asynchronous structured logging.
+
+Request threads only put records on a bounded queue; a background listener
+thread formats them (JSON lines or plain text) and writes them to stdout.
+When the queue is full records are dropped and counted instead of blocking
+the request.
+
+Settings (environment):
+    LOG_LEVEL              root level (default INFO)
+    LOG_LEVELS             per-logger levels, e.g. "app.chatbot=DEBUG,sql=WARNING"
+    LOG_FORMAT             "json" (default) or "text"
+    LOG_DEBUG_SAMPLE_EVERY keep 1 in N DEBUG records per call site (default 1 = keep all)
+    LOG_QUEUE_SIZE         max queued records before dropping (default 10000)
+"""
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+import metrics
+
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Tags records with the id of the request being handled (or '-')."""
+
+    def filter(self, record):
+        stats = metrics.current_request()
+        record.request_id = stats.request_id if stats is not None else '-'
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps the first and then every Nth DEBUG record of each call site."""
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = every
+        self.counters = {}
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.every <= 1:
+            return True
+        key = (record.pathname, record.lineno)
+        counter = self.counters.get(key)
+        if counter is None:
+            counter = self.counters.setdefault(key, itertools.count())
+        return next(counter) % self.every == 0
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread, not here
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """Install the queue handler on the root logger and start the writer thread."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    if os.getenv('LOG_FORMAT', 'json') == 'text':
+        formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+    else:
+        formatter = JsonFormatter()
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(DebugSampler(int(os.getenv('LOG_DEBUG_SAMPLE_EVERY', '1'))))
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    for name, level in _parse_levels(os.getenv('LOG_LEVELS', '')).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
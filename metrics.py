@@ -0,0 +1,242 @@
+"""Request timing middleware and Prometheus text exposition for /metrics.
+
+The middleware wraps ``app.wsgi_app`` so the whole request (including the
+time spent streaming the body) is measured. Inside a request, code that
+talks to the database or the LLM wraps the call in ``timed('db')`` /
+``timed('llm')`` so the time can be split into db / llm / handler.
+"""
+import os
+import re
+import uuid
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+from werkzeug.wsgi import ClosingIterator
+
+
+# Upper bounds (seconds) of the latency histogram buckets, +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class RequestStats:
+    __slots__ = ('start', 'request_id', 'endpoint', 'db', 'llm', 'queries')
+
+    def __init__(self, request_id):
+        self.start = perf_counter()
+        self.request_id = request_id
+        self.endpoint = None
+        self.db = 0.0
+        self.llm = 0.0
+        self.queries = None  # database.QueryProfile, created on the first query
+
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+def current_request():
+    """Stats of the request being handled by this thread, or None outside a request."""
+    return _current.get()
+
+
+def add_time(phase, seconds):
+    stats = _current.get()
+    if stats is not None:
+        setattr(stats, phase, getattr(stats, phase) + seconds)
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent inside the block to the current request's ``phase``."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        setattr(stats, phase, getattr(stats, phase) + perf_counter() - start)
+
+
+def set_endpoint(endpoint):
+    stats = _current.get()
+    if stats is not None:
+        stats.endpoint = endpoint
+
+
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+def _request_id(environ):
+    # Keep an id handed over by a proxy/load balancer so logs can be joined up
+    incoming = environ.get('HTTP_X_REQUEST_ID', '')
+    return incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.durations = {}   # (endpoint, phase) -> Histogram
+        self.statuses = {}    # (endpoint, status) -> count
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, stats, status):
+        elapsed = perf_counter() - stats.start
+        endpoint = stats.endpoint or 'unmatched'
+        observations = (
+            ('total', elapsed),
+            ('db', stats.db),
+            ('llm', stats.llm),
+            ('handler', max(elapsed - stats.db - stats.llm, 0.0)),
+        )
+        with self._lock:
+            self.in_flight -= 1
+            for phase, value in observations:
+                key = (endpoint, phase)
+                histogram = self.durations.get(key)
+                if histogram is None:
+                    histogram = self.durations[key] = Histogram()
+                histogram.observe(value)
+            key = (endpoint, status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            durations = [(key, list(h.counts), h.total, h.count) for key, h in self.durations.items()]
+            statuses = list(self.statuses.items())
+            in_flight = self.in_flight
+
+        lines = [
+            '# HELP http_request_duration_seconds Request latency split by phase (total, handler, db, llm).',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (endpoint, phase), counts, total, count in sorted(durations):
+            labels = f'endpoint="{_escape(endpoint)}",phase="{phase}"'
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, counts):
+                cumulative += n
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {count}')
+
+        lines.append('# HELP http_requests_total Requests by endpoint and response status.')
+        lines.append('# TYPE http_requests_total counter')
+        for (endpoint, status), n in sorted(statuses):
+            lines.append(f'http_requests_total{{endpoint="{_escape(endpoint)}",status="{status}"}} {n}')
+
+        lines.append('# HELP http_requests_in_flight Requests currently being handled.')
+        lines.append('# TYPE http_requests_in_flight gauge')
+        lines.append(f'http_requests_in_flight {in_flight}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+class _StatsBody:
+    """Re-enters the request's stats while a streamed body is being produced."""
+
+    def __init__(self, body, stats):
+        self.body = iter(body)
+        self.stats = stats
+        self.close = getattr(body, 'close', None)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        token = _current.set(self.stats)
+        try:
+            return next(self.body)
+        finally:
+            _current.reset(token)
+
+
+class MetricsMiddleware:
+    """WSGI middleware recording per-endpoint timings and serving ``/metrics``.
+
+    If METRICS_TOKEN is set, /metrics requires ``Authorization: Bearer <token>``.
+    """
+
+    def __init__(self, wsgi_app, path='/metrics', registry=registry):
+        self.wsgi_app = wsgi_app
+        self.path = path
+        self.registry = registry
+        self.token = os.getenv('METRICS_TOKEN')
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') == self.path:
+            return self.serve_metrics(environ, start_response)
+
+        stats = RequestStats(_request_id(environ))
+        token = _current.set(stats)
+        self.registry.started()
+        status_holder = []
+
+        def _start_response(status, headers, exc_info=None):
+            status_holder[:] = [status[:3]]
+            headers.append(('X-Request-ID', stats.request_id))
+            return start_response(status, headers, exc_info)
+
+        def _finish():
+            self.registry.finished(stats, status_holder[0] if status_holder else '500')
+
+        try:
+            body = self.wsgi_app(environ, _start_response)
+        except BaseException:
+            _finish()
+            raise
+        finally:
+            _current.reset(token)
+
+        # Streaming bodies keep accruing time until the server closes them
+        return ClosingIterator(_StatsBody(body, stats), _finish)
+
+    def serve_metrics(self, environ, start_response):
+        if self.token and environ.get('HTTP_AUTHORIZATION') != f'Bearer {self.token}':
+            start_response('401 UNAUTHORIZED', [('Content-Type', 'text/plain')])
+            return [b'unauthorized\n']
+        payload = self.registry.render().encode('utf-8')
+        start_response('200 OK', [
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+            ('Content-Length', str(len(payload))),
+        ])
+        return [payload]
+
+
+def init_app(app):
+    """Install the middleware on a Flask app and label requests with their endpoint."""
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app)
+
+    @app.before_request
+    def _label_endpoint():
+        from flask import request
+        set_endpoint(request.endpoint)
+
+    return app
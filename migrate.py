@@ -0,0 +1,297 @@
+"""Versioned schema migrations.
+
+Migrations live in migrations/ as NNNN_description.sql or NNNN_description.py
+(a module with ``upgrade(cursor)``) and are applied in order. Applied versions
+are recorded in ``schema_migrations``, so running the upgrade again is a no-op;
+a MySQL named lock keeps several app workers from migrating at the same time.
+SQL files are split on ``;`` and understand the mysql client's ``DELIMITER``
+directive for trigger bodies.
+
+With DB_SQLITE_PATH (see sqlite_db.py) the upgrade creates whatever is missing
+from migrations/sqlite_schema.sql instead, which stands for every migration,
+and records them all as applied.
+
+    python migrate.py                   # apply pending migrations
+    python migrate.py status            # list applied / pending versions
+    python migrate.py check-indexes     # EXPLAIN every query in the app code
+
+Connection settings come from the same DB_* environment variables as the app
+(database.settings).
+"""
+import argparse
+import ast
+import importlib.util
+import re
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parent
+MIGRATIONS_DIR = ROOT / 'migrations'
+LOCK_NAME = 'schema_migrations'
+
+_VERSION_FILE = re.compile(r'^(\d{4})_[\w-]+\.(sql|py)$')
+
+
+def connect():
+    import database
+
+    load_dotenv()
+    return database.connect(**database.settings())
+
+
+def available_migrations():
+    found = []
+    for path in sorted(MIGRATIONS_DIR.iterdir()):
+        match = _VERSION_FILE.match(path.name)
+        if match:
+            found.append((match.group(1), path))
+    return found
+
+
+def split_statements(sql):
+    statements, buffer, delimiter = [], [], ';'
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith('DELIMITER '):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        if not buffer and (not stripped or stripped.startswith('--')):
+            continue
+        buffer.append(line)
+        if stripped.endswith(delimiter):
+            statement = '\n'.join(buffer).rstrip()[:-len(delimiter)].strip()
+            if statement:
+                statements.append(statement)
+            buffer = []
+    if ''.join(buffer).strip():
+        statements.append('\n'.join(buffer).strip())
+    return statements
+
+
+# --- Helpers for .py migrations ---
+
+def index_exists(cursor, table, columns):
+    """True if ``table`` has an index whose leading columns are exactly ``columns``."""
+    cursor.execute("""
+        SELECT index_name, seq_in_index, column_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        ORDER BY index_name, seq_in_index
+    """, (table,))
+    indexes = {}
+    for name, _, column in cursor.fetchall():
+        indexes.setdefault(name, []).append(column.lower())
+    wanted = [column.lower() for column in columns]
+    return any(existing[:len(wanted)] == wanted for existing in indexes.values())
+
+
+def ensure_index(cursor, table, name, columns, unique=False):
+    if index_exists(cursor, table, columns):
+        return False
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    cursor.execute(f"ALTER TABLE {table} ADD {kind} {name} ({', '.join(columns)})")
+    return True
+
+
+def column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    return cursor.fetchone() is not None
+
+
+# --- Upgrade ---
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version CHAR(4) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply(cursor, path):
+    if path.suffix == '.sql':
+        for statement in split_statements(path.read_text(encoding='utf-8')):
+            cursor.execute(statement)
+            if cursor.with_rows:
+                cursor.fetchall()
+    else:
+        spec = importlib.util.spec_from_file_location(f'migration_{path.stem}', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(cursor)
+
+
+def _upgrade_embedded(connection, out):
+    import sqlite_db
+
+    cursor = connection.cursor()
+    try:
+        done = applied_versions(cursor)
+        pending = [(version, path) for version, path in available_migrations() if version not in done]
+        sqlite_db.create_schema(connection)
+        for version, path in pending:
+            out(f"applying {path.name} (sqlite_schema.sql)")
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                           (version, path.name))
+        connection.commit()
+        return [version for version, _ in pending]
+    finally:
+        cursor.close()
+
+
+def upgrade(connection, out=print):
+    """Apply pending migrations; returns the versions that were applied."""
+    import database
+
+    if database.embedded():   # one process owns the file: no lock needed
+        return _upgrade_embedded(connection, out)
+    cursor = connection.cursor()
+    cursor.execute("SELECT GET_LOCK(%s, 60)", (LOCK_NAME,))
+    if cursor.fetchone()[0] != 1:
+        raise RuntimeError("could not acquire the schema migration lock")
+    try:
+        done = applied_versions(cursor)
+        applied = []
+        for version, path in available_migrations():
+            if version in done:
+                continue
+            out(f"applying {path.name}")
+            apply(cursor, path)
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                           (version, path.name))
+            connection.commit()
+            applied.append(version)
+        return applied
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchall()
+        cursor.close()
+
+
+def status(connection):
+    cursor = connection.cursor()
+    done = applied_versions(cursor)
+    cursor.close()
+    return [(path.name, version in done) for version, path in available_migrations()]
+
+
+# --- Index check ---
+
+_EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+
+
+def source_files():
+    skip = {'benchmarks', 'migrations', 'node_modules', 'venv', '.venv', 'static', 'templates'}
+    for path in sorted(ROOT.rglob('*.py')):
+        if path.name != 'migrate.py' and not skip.intersection(path.relative_to(ROOT).parts):
+            yield path
+
+
+def collect_queries(paths):
+    """Yield (path, line, sql) for every literal statement passed to execute()."""
+    for path in paths:
+        tree = ast.parse(Path(path).read_text(encoding='utf-8'))
+        constants = {}
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name)
+                    and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)):
+                constants[node.targets[0].id] = node.value.value
+        found = []
+        for node in ast.walk(tree):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in ('execute', 'executemany') and node.args):
+                continue
+            arg = node.args[0]
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                found.append((node.lineno, arg.value))
+            elif isinstance(arg, ast.Name) and arg.id in constants:
+                found.append((node.lineno, constants[arg.id]))
+        for line, sql in sorted(found):
+            yield path, line, sql
+
+
+def explain_problems_embedded(rows):
+    """The same check on SQLite's EXPLAIN QUERY PLAN: a SCAN that uses no index."""
+    return [f"full scan: {row['detail']}" for row in rows
+            if row['detail'].startswith('SCAN ') and ' USING ' not in row['detail']]
+
+
+def explain_problems(rows):
+    problems = []
+    for row in rows:
+        extra = row.get('Extra') or ''
+        if row.get('table') is None or 'const table' in extra or 'Impossible' in extra:
+            continue
+        if row.get('key') is None and not row.get('possible_keys'):
+            problems.append(f"full scan of {row['table']} (type={row.get('type')})")
+    return problems
+
+
+def check_indexes(connection, paths=None, out=print):
+    """EXPLAIN each SELECT/UPDATE/DELETE found in the code; returns the number of failures."""
+    import database
+
+    embedded = database.embedded()
+    cursor = connection.cursor(dictionary=True)
+    failures = 0
+    for path, line, sql in collect_queries(paths or source_files()):
+        statement = ' '.join(sql.split())
+        if not statement.upper().startswith(_EXPLAINABLE):
+            continue
+        location = f"{Path(path).relative_to(ROOT)}:{line}"
+        try:
+            if embedded:
+                import sqlite_db
+
+                translated = sqlite_db.translate(_PLACEHOLDER.sub("'1'", statement))[0]
+                cursor.execute("EXPLAIN QUERY PLAN " + translated)
+                problems = explain_problems_embedded(cursor.fetchall())
+            else:
+                cursor.execute("EXPLAIN " + _PLACEHOLDER.sub("'1'", statement))
+                problems = explain_problems(cursor.fetchall())
+        except Exception as e:
+            problems = [f"EXPLAIN failed: {e}"]
+        failures += bool(problems)
+        out(f"{'FAIL' if problems else 'ok  '} {location}  {statement[:90]}")
+        for problem in problems:
+            out(f"       {problem}")
+    cursor.close()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', nargs='?', default='upgrade', choices=['upgrade', 'status', 'check-indexes'])
+    parser.add_argument('paths', nargs='*', help='files to scan for check-indexes (default: app code)')
+    args = parser.parse_args(argv)
+
+    connection = connect()
+    try:
+        if args.command == 'upgrade':
+            applied = upgrade(connection)
+            print(f"{len(applied)} migration(s) applied" if applied else "schema is up to date")
+        elif args.command == 'status':
+            for name, done in status(connection):
+                print(f"{'applied' if done else 'pending'}  {name}")
+        else:
+            failures = check_indexes(connection, args.paths or None)
+            print(f"\n{failures} quer{'y' if failures == 1 else 'ies'} without a usable index")
+            return 1 if failures else 0
+    finally:
+        connection.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
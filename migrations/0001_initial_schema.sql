@@ -0,0 +1,69 @@
+-- Tables used by app.py. Keys follow the hot queries:
+--   user_progress          (user_id, map_name, stage_number)  stars lookups/upserts
+--   user_game_progress     (user_id, map)                     counters and difficulty
+--   user_skins             (user_id, map), (user_id, skin_code), (user_id, claimed), (user_id, equipped)
+--   stage_rewards_claimed  (user_id, map_name, stage_number)  claim upsert
+--   user_tutorials         (user_id, tutorial_key)            tutorial upsert
+-- InnoDB clusters rows by primary key, so the composite primary keys also cover
+-- the per-user range scans (e.g. all stars of one user).
+
+CREATE TABLE IF NOT EXISTS users (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    username VARCHAR(50) NOT NULL,
+    first_name VARCHAR(50) NOT NULL DEFAULT '',
+    last_name VARCHAR(50) NOT NULL DEFAULT '',
+    birth_day TINYINT UNSIGNED NULL,
+    birth_month VARCHAR(10) NULL,
+    birth_year SMALLINT UNSIGNED NULL,
+    gender VARCHAR(10) NULL,
+    password VARCHAR(255) NOT NULL,
+    UNIQUE KEY uq_users_username (username)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS user_progress (
+    user_id INT NOT NULL,
+    map_name VARCHAR(32) NOT NULL,
+    stage_number INT NOT NULL,
+    stars TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, map_name, stage_number)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS user_game_progress (
+    user_id INT NOT NULL,
+    map VARCHAR(32) NOT NULL,
+    stage_key VARCHAR(16) NOT NULL DEFAULT '1',
+    correct INT NOT NULL DEFAULT 0,
+    wrong INT NOT NULL DEFAULT 0,
+    total INT NOT NULL DEFAULT 0,
+    difficulty VARCHAR(16) NOT NULL DEFAULT 'easy',
+    PRIMARY KEY (user_id, map)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS user_skins (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    skin_code VARCHAR(16) NOT NULL,
+    map VARCHAR(32) NULL,
+    claimed TINYINT(1) NOT NULL DEFAULT 0,
+    equipped TINYINT(1) NOT NULL DEFAULT 0,
+    UNIQUE KEY uq_user_skins_map (user_id, map),
+    UNIQUE KEY uq_user_skins_code (user_id, skin_code),
+    KEY ix_user_skins_claimed (user_id, claimed, map, skin_code),
+    KEY ix_user_skins_equipped (user_id, equipped, skin_code)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS stage_rewards_claimed (
+    user_id INT NOT NULL,
+    map_name VARCHAR(32) NOT NULL,
+    stage_number INT NOT NULL,
+    claimed TINYINT(1) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, map_name, stage_number)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS user_tutorials (
+    user_id INT NOT NULL,
+    tutorial_key VARCHAR(64) NOT NULL,
+    completed TINYINT(1) NOT NULL DEFAULT 0,
+    completed_at DATETIME NULL,
+    PRIMARY KEY (user_id, tutorial_key)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,23 @@
+"""Add the keys from 0001 to tables that were created by hand before migrations existed.
+
+On a database created by 0001 every index is already there and this is a no-op.
+Unique keys fail if the table holds duplicates; remove those first.
+"""
+from migrate import ensure_index
+
+INDEXES = [
+    ('users', 'uq_users_username', ('username',), True),
+    ('user_progress', 'uq_user_progress_stage', ('user_id', 'map_name', 'stage_number'), True),
+    ('user_game_progress', 'uq_user_game_progress_map', ('user_id', 'map'), True),
+    ('user_skins', 'uq_user_skins_map', ('user_id', 'map'), True),
+    ('user_skins', 'uq_user_skins_code', ('user_id', 'skin_code'), True),
+    ('user_skins', 'ix_user_skins_claimed', ('user_id', 'claimed', 'map', 'skin_code'), False),
+    ('user_skins', 'ix_user_skins_equipped', ('user_id', 'equipped', 'skin_code'), False),
+    ('stage_rewards_claimed', 'uq_stage_rewards_claimed', ('user_id', 'map_name', 'stage_number'), True),
+    ('user_tutorials', 'uq_user_tutorials_key', ('user_id', 'tutorial_key'), True),
+]
+
+
+def upgrade(cursor):
+    for table, name, columns, unique in INDEXES:
+        ensure_index(cursor, table, name, columns, unique)
@@ -0,0 +1,14 @@
+"""Teacher accounts and classes.
+
+users.role is 'student' (default) or 'teacher'; users.class_name groups students
+for roster imports and class reports.
+"""
+from migrate import column_exists, ensure_index
+
+
+def upgrade(cursor):
+    if not column_exists(cursor, 'users', 'role'):
+        cursor.execute("ALTER TABLE users ADD COLUMN role VARCHAR(16) NOT NULL DEFAULT 'student'")
+    if not column_exists(cursor, 'users', 'class_name'):
+        cursor.execute("ALTER TABLE users ADD COLUMN class_name VARCHAR(64) NULL")
+    ensure_index(cursor, 'users', 'ix_users_class', ('class_name',))
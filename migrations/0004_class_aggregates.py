@@ -0,0 +1,52 @@
+"""Class summary tables for the teacher dashboard, kept current by triggers.
+
+See analytics.py for what each column means; the tables are filled from the
+existing rows once, after which the triggers apply per-row deltas.
+"""
+import analytics
+
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS class_stats (
+        class_name VARCHAR(64) NOT NULL PRIMARY KEY,
+        students INT NOT NULL DEFAULT 0
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS class_map_stats (
+        class_name VARCHAR(64) NOT NULL,
+        map VARCHAR(32) NOT NULL,
+        students INT NOT NULL DEFAULT 0,
+        correct BIGINT NOT NULL DEFAULT 0,
+        wrong BIGINT NOT NULL DEFAULT 0,
+        total BIGINT NOT NULL DEFAULT 0,
+        stuck INT NOT NULL DEFAULT 0,
+        on_easy INT NOT NULL DEFAULT 0,
+        on_normal INT NOT NULL DEFAULT 0,
+        on_hard INT NOT NULL DEFAULT 0,
+        on_extreme INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (class_name, map)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS class_stage_stats (
+        class_name VARCHAR(64) NOT NULL,
+        map_name VARCHAR(32) NOT NULL,
+        stage_number INT NOT NULL,
+        players INT NOT NULL DEFAULT 0,
+        stars_total INT NOT NULL DEFAULT 0,
+        stars_0 INT NOT NULL DEFAULT 0,
+        stars_1 INT NOT NULL DEFAULT 0,
+        stars_2 INT NOT NULL DEFAULT 0,
+        stars_3 INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (class_name, map_name, stage_number)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+]
+
+
+def upgrade(cursor):
+    for statement in TABLES:
+        cursor.execute(statement)
+    analytics.install_triggers(cursor)
+    analytics.rebuild(cursor)
@@ -0,0 +1,14 @@
+"""Row modification times, used to filter exports by date."""
+from migrate import column_exists, ensure_index
+
+TABLES = ('user_game_progress', 'user_progress', 'stage_rewards_claimed', 'user_skins')
+
+
+def upgrade(cursor):
+    for table in TABLES:
+        if not column_exists(cursor, table, 'updated_at'):
+            cursor.execute(f"""
+                ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP NOT NULL
+                DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            """)
+        ensure_index(cursor, table, f'ix_{table}_updated', ('updated_at',))
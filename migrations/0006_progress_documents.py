@@ -0,0 +1,16 @@
+"""One compact progress document per player, for PROGRESS_STORAGE=document (see progress_doc.py).
+
+The table starts empty: documents are built from the row tables on first use,
+or all at once with ``flask --app app build-progress-docs``.
+"""
+
+
+def upgrade(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_progress_docs (
+            user_id INT NOT NULL PRIMARY KEY,
+            version INT UNSIGNED NOT NULL DEFAULT 1,
+            doc BLOB NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
@@ -0,0 +1,18 @@
+"""Keys every worker has to agree on when there is no shared state store (state.DatabaseBackend).
+
+Idempotency keys and rate limit counters go here without STATE_URL, so two
+gunicorn workers on one host see the same ones. ``expires_at`` is a Unix time;
+expired rows are deleted as the app goes.
+"""
+
+
+def upgrade(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS state_keys (
+            name VARCHAR(255) NOT NULL PRIMARY KEY,
+            value TEXT NULL,
+            counter INT NOT NULL DEFAULT 0,
+            expires_at DOUBLE NULL,
+            KEY ix_state_keys_expires (expires_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
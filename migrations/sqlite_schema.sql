@@ -0,0 +1,164 @@
+-- The schema of migrations 0001-0007 for the embedded SQLite backend (sqlite_db.py).
+-- Not a numbered migration: sqlite_db.create_schema() runs it whole, then installs
+-- the analytics triggers (analytics.sqlite_trigger_statements). Every statement is
+-- IF NOT EXISTS, so running it again only adds what is missing. A new migration has
+-- to change this file too.
+--
+-- updated_at: MySQL's ON UPDATE CURRENT_TIMESTAMP is an AFTER UPDATE trigger here.
+-- Translated updates only touch rows they change, so the stamp moves when MySQL's would.
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) NOT NULL,
+    first_name VARCHAR(50) NOT NULL DEFAULT '',
+    last_name VARCHAR(50) NOT NULL DEFAULT '',
+    birth_day INTEGER NULL,
+    birth_month VARCHAR(10) NULL,
+    birth_year INTEGER NULL,
+    gender VARCHAR(10) NULL,
+    password VARCHAR(255) NOT NULL,
+    role VARCHAR(16) NOT NULL DEFAULT 'student',
+    class_name VARCHAR(64) NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_users_username ON users (username);
+CREATE INDEX IF NOT EXISTS ix_users_class ON users (class_name);
+
+CREATE TABLE IF NOT EXISTS user_progress (
+    user_id INTEGER NOT NULL,
+    map_name VARCHAR(32) NOT NULL,
+    stage_number INTEGER NOT NULL,
+    stars INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, map_name, stage_number)
+);
+CREATE INDEX IF NOT EXISTS ix_user_progress_updated ON user_progress (updated_at);
+
+CREATE TABLE IF NOT EXISTS user_game_progress (
+    user_id INTEGER NOT NULL,
+    map VARCHAR(32) NOT NULL,
+    stage_key VARCHAR(16) NOT NULL DEFAULT '1',
+    correct INTEGER NOT NULL DEFAULT 0,
+    wrong INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    difficulty VARCHAR(16) NOT NULL DEFAULT 'easy',
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, map)
+);
+CREATE INDEX IF NOT EXISTS ix_user_game_progress_updated ON user_game_progress (updated_at);
+
+CREATE TABLE IF NOT EXISTS user_skins (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    skin_code VARCHAR(16) NOT NULL,
+    map VARCHAR(32) NULL,
+    claimed INTEGER NOT NULL DEFAULT 0,
+    equipped INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_user_skins_map ON user_skins (user_id, map);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_user_skins_code ON user_skins (user_id, skin_code);
+CREATE INDEX IF NOT EXISTS ix_user_skins_claimed ON user_skins (user_id, claimed, map, skin_code);
+CREATE INDEX IF NOT EXISTS ix_user_skins_equipped ON user_skins (user_id, equipped, skin_code);
+CREATE INDEX IF NOT EXISTS ix_user_skins_updated ON user_skins (updated_at);
+
+CREATE TABLE IF NOT EXISTS stage_rewards_claimed (
+    user_id INTEGER NOT NULL,
+    map_name VARCHAR(32) NOT NULL,
+    stage_number INTEGER NOT NULL,
+    claimed INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, map_name, stage_number)
+);
+CREATE INDEX IF NOT EXISTS ix_stage_rewards_claimed_updated ON stage_rewards_claimed (updated_at);
+
+CREATE TABLE IF NOT EXISTS user_tutorials (
+    user_id INTEGER NOT NULL,
+    tutorial_key VARCHAR(64) NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    completed_at DATETIME NULL,
+    PRIMARY KEY (user_id, tutorial_key)
+);
+
+CREATE TABLE IF NOT EXISTS class_stats (
+    class_name VARCHAR(64) NOT NULL PRIMARY KEY,
+    students INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS class_map_stats (
+    class_name VARCHAR(64) NOT NULL,
+    map VARCHAR(32) NOT NULL,
+    students INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    wrong INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    stuck INTEGER NOT NULL DEFAULT 0,
+    on_easy INTEGER NOT NULL DEFAULT 0,
+    on_normal INTEGER NOT NULL DEFAULT 0,
+    on_hard INTEGER NOT NULL DEFAULT 0,
+    on_extreme INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (class_name, map)
+);
+
+CREATE TABLE IF NOT EXISTS class_stage_stats (
+    class_name VARCHAR(64) NOT NULL,
+    map_name VARCHAR(32) NOT NULL,
+    stage_number INTEGER NOT NULL,
+    players INTEGER NOT NULL DEFAULT 0,
+    stars_total INTEGER NOT NULL DEFAULT 0,
+    stars_0 INTEGER NOT NULL DEFAULT 0,
+    stars_1 INTEGER NOT NULL DEFAULT 0,
+    stars_2 INTEGER NOT NULL DEFAULT 0,
+    stars_3 INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (class_name, map_name, stage_number)
+);
+
+CREATE TABLE IF NOT EXISTS user_progress_docs (
+    user_id INTEGER NOT NULL PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 1,
+    doc BLOB NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_user_progress_touch AFTER UPDATE ON user_progress
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE user_progress SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_user_game_progress_touch AFTER UPDATE ON user_game_progress
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE user_game_progress SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_user_skins_touch AFTER UPDATE ON user_skins
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE user_skins SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stage_rewards_claimed_touch AFTER UPDATE ON stage_rewards_claimed
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE stage_rewards_claimed SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_user_progress_docs_touch AFTER UPDATE ON user_progress_docs
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE user_progress_docs SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+END;
+
+CREATE TABLE IF NOT EXISTS state_keys (
+    name VARCHAR(255) NOT NULL PRIMARY KEY,
+    value TEXT NULL,
+    counter INTEGER NOT NULL DEFAULT 0,
+    expires_at DOUBLE NULL
+);
+CREATE INDEX IF NOT EXISTS ix_state_keys_expires ON state_keys (expires_at);
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version CHAR(4) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,76 @@
+"""Pages that look the same for every player, rendered once per process.
+
+/roadmap, /shop, /monster_atlas, /chatbot and /stages render templates with
+no per-user content; their scripts fetch the player's progress afterwards.
+render() keeps each rendered page gzip-compressed, keyed by template, context
+and DEPLOY_VERSION, so a request neither runs Jinja nor compresses anything:
+
+- Clients that accept gzip get the stored bytes as they are.
+- The rest get them decompressed.
+- A client whose If-None-Match still holds the page's ETag gets 304.
+
+The ETag is a digest of the page, so it is the same on every node. With
+template auto-reload on (debug) pages are rendered every time, as usual.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import current_app, render_template, request
+
+
+class PageCache:
+    """Rendered pages as (etag, gzip bytes), the least recently used dropped beyond ``size``."""
+
+    def __init__(self, version='', size=256):
+        self.version = version
+        self.size = size
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def add(self, key, html):
+        body = html.encode()
+        page = (hashlib.sha1(body).hexdigest()[:20], gzip.compress(body, compresslevel=9))
+        with self._lock:
+            self._pages[key] = page
+            if len(self._pages) > self.size:
+                self._pages.popitem(last=False)
+        return page
+
+
+def render(template, **context):
+    """render_template() for a page without per-user content, served from the page cache.
+
+    The context is part of the cache key, so pass only values from a fixed set
+    (a map checked against the catalogue, not a raw query argument).
+    """
+    if current_app.jinja_env.auto_reload:
+        return render_template(template, **context)
+
+    pages = current_app.extensions['pages']
+    key = (pages.version, template, tuple(sorted(context.items())))
+    etag, body = pages.get(key) or pages.add(key, render_template(template, **context))
+
+    response = current_app.response_class(mimetype='text/html')
+    response.set_etag(etag, weak=True)
+    # Logged-in pages: browsers may keep them, but must ask again before reuse
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+    if request.if_none_match.contains_weak(etag):
+        response.status_code = 304
+        return response
+    if 'gzip' in request.accept_encodings:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response.set_data(gzip.decompress(body))
+    return response
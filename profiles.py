@@ -0,0 +1,52 @@
+"""Who the logged-in player is: the name card the dashboard and game pages show.
+
+    {'id': 7, 'first_name': 'Ana', 'last_name': 'Cruz', 'gender': 'female', 'role': 'student', 'skin': 'r2'}
+
+(skin is the equipped skin code, None before one is chosen; role is what
+teacher_required checks the session against). It is cached per
+user in the 'profile' cache for PROFILE_CACHE_SECONDS. Login stores a fresh
+copy from the row it has just read, a change of equipped skin drops it, and a
+miss loads it with one query, so rendering a page does not touch ``users``.
+"""
+from database import get_db
+from extensions import cache
+
+FIELDS = ('id', 'first_name', 'last_name', 'gender', 'role', 'skin')
+
+# One profile: the users columns with the equipped skin
+SELECT = """
+    SELECT u.id, u.first_name, u.last_name, u.gender, u.role, s.skin_code AS skin
+    FROM users u
+    LEFT JOIN user_skins s ON s.user_id = u.id AND s.equipped = 1
+    WHERE u.id = %s
+    LIMIT 1
+"""
+
+
+def from_row(row):
+    """A profile from a users row (dict) that also has the ``skin`` column."""
+    return {field: row.get(field) for field in FIELDS}
+
+
+def _read(user_id):
+    cursor = get_db(read_only=True).cursor(dictionary=True)
+    try:
+        cursor.execute(SELECT, (user_id,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return from_row(row) if row else None
+
+
+def get(user_id):
+    """One player's profile (None for an unknown user)."""
+    return cache('profile').get(user_id, lambda: _read(user_id))
+
+
+def remember(profile):
+    cache('profile').put(profile['id'], profile)
+
+
+def changed(user_id):
+    """Drop the cached profile after a committed change to the user (or their role) or their equipped skin."""
+    cache('profile').invalidate(user_id)
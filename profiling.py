@@ -0,0 +1,199 @@
+"""On-demand diagnostics of a live worker: a sampling CPU profile and tracemalloc snapshots.
+
+Off unless PROFILE_TOKEN is set. Then these routes exist and need
+``Authorization: Bearer <PROFILE_TOKEN>``, as /metrics does with METRICS_TOKEN:
+
+    GET  /debug/profile?seconds=10&interval_ms=10   sample every thread's stack for N seconds
+    POST /debug/memory/start?frames=10              start tracemalloc (frames per traceback)
+    GET  /debug/memory?key=lineno&limit=30          top allocations since tracing started
+    GET  /debug/memory?diff=1                       growth since the previous snapshot
+    POST /debug/memory/stop
+
+The profile is in collapsed-stack format, one ``thread;outer;...;inner count`` line
+per distinct stack, which flamegraph.pl, speedscope and inferno read as they are.
+Samples are taken from sys._current_frames() by a thread of their own (a native one
+under gevent, see concurrency.offload), so the code being profiled runs unmodified.
+Under gevent a worker's greenlets share one OS thread, and its stack is whichever
+greenlet was running when the sample was taken.
+
+Idle, none of this costs anything: no per-request hook, no sampler thread outside
+a profile, and tracemalloc, which slows every allocation while it runs, stays off
+until it is started. Each answer describes the worker process that served it
+(X-Worker-PID). The memory snapshot a diff compares with is kept per process, so
+with several workers repeat the call until the same pid answers.
+"""
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+from flask import Blueprint, current_app, jsonify, request
+
+import concurrency
+
+ROOT = Path(__file__).resolve().parent
+MAX_SECONDS = 60
+MEMORY_KEYS = ('lineno', 'filename', 'traceback')
+
+bp = Blueprint('profiling', __name__, url_prefix='/debug')
+
+_profiling = threading.Lock()   # one profile at a time per process
+_previous = None                # the last memory snapshot, for ?diff=1
+_IGNORED = [tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>')]
+
+
+def _short(filename):
+    """App files relative to the app, libraries from their package directory on."""
+    path = Path(filename)
+    try:
+        return str(path.relative_to(ROOT))
+    except ValueError:
+        return '/'.join(path.parts[-2:])
+
+
+def _label(code):
+    # ';' separates frames and ' ' the count in the collapsed format
+    return f"{code.co_name} ({_short(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+
+def _sleeper():
+    """time.sleep as it was before gevent patched it (the sampler runs on a native thread)."""
+    if concurrency.cooperative():
+        from gevent.monkey import get_original
+
+        return get_original('time', 'sleep')
+    return time.sleep
+
+
+def _sample(seconds, interval):
+    """Counter of collapsed stacks over ``seconds``, every thread but the sampler's own."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    own = _sample.__code__
+    sleep = _sleeper()
+    stacks = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for ident, frame in sys._current_frames().items():
+            labels = []
+            while frame is not None:
+                if frame.f_code is own:
+                    break
+                labels.append(_label(frame.f_code))
+                frame = frame.f_back
+            else:
+                labels.append(names.get(ident, f'thread-{ident}').replace(';', ':'))
+                stacks[';'.join(reversed(labels))] += 1
+        sleep(interval)
+    return stacks
+
+
+def _int_arg(name, default, low, high):
+    value = request.args.get(name, default, type=int)
+    if value is None or not low <= value <= high:
+        raise ValueError(f"{name} must be a whole number from {low} to {high}")
+    return value
+
+
+def _answer(body, status=200):
+    """JSON, or text for a str body, labelled with the worker that produced it."""
+    if isinstance(body, str):
+        response = current_app.response_class(body, mimetype='text/plain')
+    else:
+        response = jsonify(body)
+    response.status_code = status
+    response.headers['X-Worker-PID'] = str(os.getpid())
+    return response
+
+
+@bp.before_request
+def _authorize():
+    expected = f"Bearer {os.getenv('PROFILE_TOKEN', '')}"
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+        return _answer({'error': 'unauthorized'}, 401)
+
+
+@bp.errorhandler(ValueError)
+def _bad_argument(e):
+    return _answer({'error': str(e)}, 400)
+
+
+@bp.route('/profile')
+def profile():
+    """Collapsed stacks of every thread of this worker, sampled for ``seconds``."""
+    seconds = _int_arg('seconds', 10, 1, MAX_SECONDS)
+    interval = _int_arg('interval_ms', 10, 1, 1000) / 1000
+    if not _profiling.acquire(blocking=False):
+        return _answer({'error': 'a profile is already running in this worker'}, 409)
+    try:
+        stacks = concurrency.offload(_sample, seconds, interval)
+    finally:
+        _profiling.release()
+    response = _answer(''.join(f'{stack} {count}\n' for stack, count in stacks.most_common()))
+    response.headers['Content-Disposition'] = \
+        f'attachment; filename="profile-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}.collapsed"'
+    return response
+
+
+@bp.route('/memory/start', methods=['POST'])
+def memory_start():
+    frames = _int_arg('frames', 10, 1, 100)
+    if tracemalloc.is_tracing():
+        return _answer({'error': 'tracemalloc is already running in this worker'}, 409)
+    tracemalloc.start(frames)
+    return _answer({'tracing': True, 'frames': frames})
+
+
+@bp.route('/memory/stop', methods=['POST'])
+def memory_stop():
+    global _previous
+    tracemalloc.stop()
+    _previous = None
+    return _answer({'tracing': False})
+
+
+def _where(statistic, key):
+    frames = [f"{_short(frame.filename)}:{frame.lineno}" for frame in statistic.traceback]
+    if key == 'filename':
+        return frames[0].rpartition(':')[0]
+    return frames if key == 'traceback' else frames[0]
+
+
+@bp.route('/memory')
+def memory():
+    """The largest allocations by ``key`` (or, with diff=1, the largest changes since the last call)."""
+    global _previous
+    key = request.args.get('key', 'lineno')
+    if key not in MEMORY_KEYS:
+        raise ValueError(f"key must be one of {', '.join(MEMORY_KEYS)}")
+    limit = _int_arg('limit', 30, 1, 1000)
+    diff = request.args.get('diff') == '1'
+    if not tracemalloc.is_tracing():
+        return _answer({'error': 'tracemalloc is not running in this worker; POST /debug/memory/start'}, 409)
+    if diff and _previous is None:
+        return _answer({'error': 'no earlier snapshot in this worker to compare with'}, 409)
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+    if diff:
+        top = [{'where': _where(stat, key), 'size': stat.size, 'size_diff': stat.size_diff,
+                'count': stat.count, 'count_diff': stat.count_diff}
+               for stat in snapshot.compare_to(_previous, key)[:limit]]
+    else:
+        top = [{'where': _where(stat, key), 'size': stat.size, 'count': stat.count}
+               for stat in snapshot.statistics(key)[:limit]]
+    _previous = snapshot
+    current, peak = tracemalloc.get_traced_memory()
+    return _answer({'traced': current, 'peak': peak, 'overhead': tracemalloc.get_tracemalloc_memory(),
+                    'key': key, 'diff': diff, 'top': top})
+
+
+def init_app(app):
+    """Register the /debug routes when PROFILE_TOKEN is set (otherwise they do not exist)."""
+    if os.getenv('PROFILE_TOKEN'):
+        app.register_blueprint(bp)
+    return app
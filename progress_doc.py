@@ -0,0 +1,281 @@
+"""Each player's progress as one compact document (PROGRESS_STORAGE=document).
+
+The row tables spread one player over dozens of rows: a star row per stage, a
+counter row per map, and a row per claimed reward, skin and tutorial. In
+document mode the player-facing routes read all of it from one row of
+user_progress_docs, usually straight from the cache (extensions.cache):
+
+    {"v": 1,
+     "s": {"addition": [3, 1, null]},     stars per stage, stage 1 first (null: never played)
+     "g": {"addition": [12, 3, 15, "easy", "stage1"]},
+                                          correct, wrong, total, difficulty, stage key
+     "r": [5, []],                        claimed stage rewards   } flags.py bitsets over the
+     "t": [1, []],                        completed tutorials     } catalogue key registries
+     "k": 7,                              claimed skins, bit i = SKINS[i]
+     "e": "r2"}                           equipped skin (null: none)
+
+stored as compact JSON, a few hundred bytes for a player who has finished
+every map. The row tables stay the system of record, because the class
+aggregate triggers, the exports and the leaderboard rebuilds read them. The
+write routes still write the rows and apply the same change to the document
+in the same transaction (record()). The change is a compare-and-set on the
+row's ``version``, so two concurrent writes for one player cannot lose each
+other's update. A missing document is built from the rows on first use, and
+``flask --app app build-progress-docs`` builds them all ahead of time.
+Turning document mode off needs no migration back.
+
+Stars of stages outside 1..MAX_STAGE are only kept in the rows. Bump FORMAT when the
+layout changes, and teach decode() to upgrade the old one.
+"""
+import copy
+import json
+
+from flask import current_app, g
+
+from catalogue import DEFAULT_SKIN, skin_code_mapping
+from database import get_db
+from extensions import cache
+from flags import REWARDS, TUTORIALS, reward_key
+
+FORMAT = 1
+MAX_STAGE = 64
+# Bit positions of the claimed-skins set: only ever append
+SKINS = (DEFAULT_SKIN,) + tuple(skin_code_mapping.values())
+SKIN_BITS = {code: bit for bit, code in enumerate(SKINS)}
+SKIN_MAPS = {code: map_name for map_name, code in skin_code_mapping.items()}
+
+
+def empty():
+    return {'v': FORMAT, 's': {}, 'g': {}, 'r': REWARDS.empty(), 't': TUTORIALS.empty(), 'k': 0, 'e': None}
+
+
+def encode(doc):
+    return json.dumps(doc, separators=(',', ':')).encode()
+
+
+def decode(raw):
+    doc = json.loads(raw)
+    if doc.get('v') != FORMAT:
+        raise ValueError(f"unknown progress document format {doc.get('v')!r}")
+    return doc
+
+
+def _stage_index(stage):
+    try:
+        stage = int(stage)
+    except (TypeError, ValueError):
+        return None
+    return stage - 1 if 1 <= stage <= MAX_STAGE else None
+
+
+# --- Reading a document ---
+
+def stage_progress(doc):
+    """The /get_stage_progress answer: {"addition-1": {"stars": 3}, ...}."""
+    return {
+        f"{map_name}-{index + 1}": {'stars': stars}
+        for map_name, packed in doc['s'].items()
+        for index, stars in enumerate(packed) if stars is not None
+    }
+
+
+def game_progress(doc):
+    """The /get-progress answer (same shape as blueprints.progress.load_game_progress)."""
+    result = {'success': True, 'mapDifficulty': {}, 'selectedMap': 'multiplication', 'selectedStageKey': 'stage1'}
+    for map_name, (correct, wrong, total, difficulty, _) in doc['g'].items():
+        result['mapDifficulty'][map_name] = difficulty
+        result[map_name] = {
+            'correctAnswersCount': correct,
+            'wrongAnswersCount': wrong,
+            'totalQuestionsAnswered': total,
+        }
+    return result
+
+
+def difficulty(doc, map_name):
+    counters = doc['g'].get(map_name)
+    return counters[3] if counters else None
+
+
+def reward_claimed(doc, map_name, stage):
+    return REWARDS.has(doc['r'], reward_key(map_name, stage))
+
+
+def skins(doc):
+    """[(skin_code, map), ...] of the claimed skins (map is None for the default skin)."""
+    return [(code, SKIN_MAPS.get(code)) for code, bit in SKIN_BITS.items() if doc['k'] >> bit & 1]
+
+
+def skin_claimed(doc, map_name):
+    code = skin_code_mapping.get(map_name)
+    return code is not None and bool(doc['k'] >> SKIN_BITS[code] & 1)
+
+
+def tutorial_done(doc, key):
+    return TUTORIALS.has(doc['t'], key)
+
+
+# --- Changing a document (each mirrors one row statement of the routes) ---
+
+def set_stars(doc, map_name, stage, stars):
+    index = _stage_index(stage)
+    if index is None:
+        return
+    packed = doc['s'].setdefault(map_name, [])
+    packed.extend([None] * (index + 1 - len(packed)))
+    packed[index] = int(stars)
+
+
+def set_counters(doc, map_name, stage_key, correct, wrong, total, level):
+    doc['g'][map_name] = [int(correct), int(wrong), int(total), level, stage_key]
+
+
+def set_difficulty(doc, map_name, level):
+    if map_name in doc['g']:
+        doc['g'][map_name][3] = level
+
+
+def reset_counters(doc, map_name):
+    if map_name in doc['g']:
+        doc['g'][map_name][:3] = [0, 0, 0]
+
+
+def claim_reward(doc, map_name, stage):
+    REWARDS.add(doc['r'], reward_key(map_name, stage))
+
+
+def claim_skin(doc, code):
+    if code in SKIN_BITS:
+        doc['k'] |= 1 << SKIN_BITS[code]
+
+
+def equip(doc, code):
+    claim_skin(doc, code)
+    doc['e'] = code
+
+
+def complete_tutorial(doc, key):
+    TUTORIALS.add(doc['t'], key)
+
+
+# --- Building documents from the row tables ---
+
+def build_many(cursor, user_ids):
+    """{user_id: document} from the row tables, five queries for the whole batch."""
+    docs = {user_id: empty() for user_id in user_ids}
+    if not docs:
+        return docs
+    ids = list(docs)
+    where = f"user_id IN ({', '.join(['%s'] * len(ids))})"
+
+    cursor.execute(f"SELECT user_id, map_name, stage_number, stars FROM user_progress WHERE {where}", ids)
+    for user_id, map_name, stage, stars in cursor.fetchall():
+        set_stars(docs[user_id], map_name, stage, stars)
+    cursor.execute(
+        f"SELECT user_id, map, stage_key, correct, wrong, total, difficulty FROM user_game_progress WHERE {where}",
+        ids)
+    for user_id, map_name, stage_key, correct, wrong, total, level in cursor.fetchall():
+        set_counters(docs[user_id], map_name, stage_key, correct, wrong, total, level)
+    cursor.execute(
+        f"SELECT user_id, map_name, stage_number FROM stage_rewards_claimed WHERE {where} AND claimed = 1", ids)
+    for user_id, map_name, stage in cursor.fetchall():
+        claim_reward(docs[user_id], map_name, stage)
+    cursor.execute(f"SELECT user_id, skin_code, equipped FROM user_skins WHERE {where} AND claimed = 1", ids)
+    for user_id, code, equipped in cursor.fetchall():
+        (equip if equipped else claim_skin)(docs[user_id], code)
+    cursor.execute(f"SELECT user_id, tutorial_key FROM user_tutorials WHERE {where} AND completed = 1", ids)
+    for user_id, key in cursor.fetchall():
+        complete_tutorial(docs[user_id], key)
+    return docs
+
+
+def store_many(cursor, docs):
+    """Write freshly built documents, replacing existing ones (version starts again at 1)."""
+    if docs:
+        rows = [(user_id, encode(doc)) for user_id, doc in docs.items()]
+        cursor.execute(
+            "INSERT INTO user_progress_docs (user_id, version, doc) VALUES "
+            + ', '.join(['(%s, 1, %s)'] * len(rows))
+            + " ON DUPLICATE KEY UPDATE version = version + 1, doc = VALUES(doc)",
+            [value for row in rows for value in row])
+
+
+def load(cursor, user_id, for_update=False):
+    """{'version': n, 'doc': {...}} of one player, or None when there is no document yet."""
+    cursor.execute("SELECT version, doc FROM user_progress_docs WHERE user_id = %s"
+                   + (" FOR UPDATE" if for_update else ""), (user_id,))
+    row = cursor.fetchone()
+    return {'version': row[0], 'doc': decode(row[1])} if row is not None else None
+
+
+def create(cursor, user_id):
+    """Build and store one player's document unless another request just did; returns it."""
+    doc = build_many(cursor, [user_id])[user_id]
+    cursor.execute("INSERT IGNORE INTO user_progress_docs (user_id, version, doc) VALUES (%s, 1, %s)",
+                   (user_id, encode(doc)))
+    if cursor.rowcount:
+        return {'version': 1, 'doc': doc}
+    return load(cursor, user_id, for_update=True)
+
+
+# --- Used by the routes ---
+
+def enabled():
+    return current_app.config['PROGRESS_STORAGE'] == 'document'
+
+
+def _read(user_id):
+    cursor = get_db(read_only=True).cursor()
+    found = load(cursor, user_id)
+    cursor.close()
+    if found is None:
+        db = get_db()
+        cursor = db.cursor()
+        found = create(cursor, user_id)
+        db.commit()
+        cursor.close()
+    return found
+
+
+def get(user_id):
+    """One player's document: cached, else one query (built from the rows the first time)."""
+    return cache('progress-doc').get(user_id, lambda: _read(user_id))['doc']
+
+
+def record(db, user_id, change):
+    """Apply ``change(doc)`` to the player's document in the caller's transaction.
+
+    Call it after the row statement and before the commit. A no-op unless
+    document mode is on.
+    """
+    if not enabled():
+        return
+    cursor = db.cursor()
+    try:
+        found = cache('progress-doc').peek(user_id)
+        if found is not None:
+            doc = copy.deepcopy(found['doc'])
+            change(doc)
+            cursor.execute("""
+                UPDATE user_progress_docs SET doc = %s, version = version + 1
+                WHERE user_id = %s AND version = %s
+            """, (encode(doc), user_id, found['version']))
+            if cursor.rowcount:
+                return
+        # Nothing cached, or the cached copy is out of date: lock the row and change that
+        found = load(cursor, user_id, for_update=True) or create(cursor, user_id)
+        change(found['doc'])
+        cursor.execute("UPDATE user_progress_docs SET doc = %s, version = version + 1 WHERE user_id = %s",
+                       (encode(found['doc']), user_id))
+    finally:
+        cursor.close()
+        g.setdefault('progress_docs_changed', set()).add(user_id)
+
+
+def init_app(app):
+    """Drop the cached documents a request changed, once it has committed."""
+    @app.after_request
+    def _invalidate_documents(response):
+        for user_id in g.pop('progress_docs_changed', ()):
+            cache('progress-doc').invalidate(user_id)
+        return response
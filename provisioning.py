@@ -0,0 +1,85 @@
+"""Account creation with the default rows every new player needs.
+
+A new account gets the default skin (claimed and equipped) and a
+user_game_progress row for every map in the catalogue. Both are written with
+multi-row INSERTs, so one account costs three statements and a whole class
+roster costs a handful, independent of the number of maps.
+
+The caller owns the transaction: run these on one connection and commit (or
+roll back) once.
+"""
+from catalogue import MAPS, DEFAULT_SKIN
+
+# Rows per multi-row INSERT, keeps statements well below max_allowed_packet
+BATCH_ROWS = 1000
+
+USER_COLUMNS = ('username', 'first_name', 'last_name', 'birth_day', 'birth_month',
+                'birth_year', 'gender', 'password', 'class_name')
+
+
+def _insert_rows(cursor, head, row_sql, rows):
+    for start in range(0, len(rows), BATCH_ROWS):
+        batch = rows[start:start + BATCH_ROWS]
+        params = [value for row in batch for value in row]
+        cursor.execute(head + ', '.join([row_sql] * len(batch)), params)
+
+
+def insert_default_rows(cursor, user_ids):
+    """Default skin and per-map progress rows for freshly created users."""
+    _insert_rows(
+        cursor,
+        "INSERT INTO user_skins (user_id, skin_code, map, claimed, equipped) VALUES ",
+        "(%s, %s, NULL, 1, 1)",
+        [(user_id, DEFAULT_SKIN) for user_id in user_ids],
+    )
+    _insert_rows(
+        cursor,
+        "INSERT INTO user_game_progress (user_id, map, stage_key, correct, wrong, total, difficulty) VALUES ",
+        "(%s, %s, '1', 0, 0, 0, 'easy')",
+        [(user_id, map_name) for user_id in user_ids for map_name in MAPS],
+    )
+
+
+def provision_user(cursor, user):
+    """Create one account from a dict with USER_COLUMNS (password already hashed); returns its id.
+
+    Missing columns (e.g. class_name) are stored as NULL.
+    """
+    cursor.execute(f"""
+        INSERT INTO users ({', '.join(USER_COLUMNS)})
+        VALUES ({', '.join(['%s'] * len(USER_COLUMNS))})
+    """, [user.get(column) for column in USER_COLUMNS])
+    user_id = cursor.lastrowid
+    insert_default_rows(cursor, [user_id])
+    return user_id
+
+
+def provision_users(cursor, users):
+    """Create many accounts at once; returns {username: id}.
+
+    Duplicate usernames raise the driver's IntegrityError for the whole batch.
+    """
+    if not users:
+        return {}
+    _insert_rows(
+        cursor,
+        f"INSERT INTO users ({', '.join(USER_COLUMNS)}) VALUES ",
+        f"({', '.join(['%s'] * len(USER_COLUMNS))})",
+        [[user.get(column) for column in USER_COLUMNS] for user in users],
+    )
+
+    # Auto-increment ids of a multi-row insert are not guaranteed to be
+    # consecutive, so look them up by the (unique) usernames
+    ids = {}
+    usernames = [user['username'] for user in users]
+    for start in range(0, len(usernames), BATCH_ROWS):
+        batch = usernames[start:start + BATCH_ROWS]
+        cursor.execute(f"SELECT id, username FROM users WHERE username IN ({', '.join(['%s'] * len(batch))})", batch)
+        for row in cursor.fetchall():
+            if isinstance(row, dict):
+                ids[row['username']] = row['id']
+            else:
+                ids[row[1]] = row[0]
+
+    insert_default_rows(cursor, [ids[name] for name in usernames])
+    return ids
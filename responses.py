@@ -0,0 +1,129 @@
+"""How response bodies go out: the JSON encoder and compression.
+
+FastJSONProvider makes jsonify() use orjson when it is installed (``pip
+install orjson``). Dates, decimals and other types orjson leaves to the
+caller still go through Flask's own conversion, so the answers do not
+change, except that they are compact UTF-8. The emoji in chat replies were
+``\\ud83c\\udf4e`` escapes before. Without orjson it is Flask's provider,
+as before.
+
+compress() runs after every request. It compresses text, JSON and NDJSON
+bodies of at least COMPRESS_MIN_BYTES with brotli (``pip install brotli``)
+or gzip, whichever the client's Accept-Encoding prefers. Streamed bodies,
+such as the teacher exports, are compressed chunk by chunk as they are
+produced, so they stay streamed. Responses that are already encoded are
+left alone, such as the cached pages (page_cache.py), and so are files
+(static/). benchmarks/response_bench.py measures the CPU cost against the
+bytes saved for each endpoint.
+"""
+import zlib
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:   # optional: the json module is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:   # optional: gzip only
+    brotli = None
+
+# Cheap enough per response for the gain (see benchmarks/response_bench.py)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE = ('application/json', 'application/x-ndjson', 'application/javascript', 'image/svg+xml')
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, serialising with orjson when it is installed."""
+
+    if orjson is not None:
+        def dumps(self, obj, **kwargs):
+            if kwargs:   # indent, sort_keys, ...: only the json module has them
+                return super().dumps(obj, **kwargs)
+            return self._dump_bytes(obj).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s) if not kwargs else super().loads(s, **kwargs)
+
+        def response(self, *args, **kwargs):
+            if self._app.debug:   # pretty-printed, as Flask does in debug mode
+                return super().response(*args, **kwargs)
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(self._dump_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+        def _dump_bytes(self, obj):
+            return orjson.dumps(obj, default=self.default,
+                                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+class _Encoder:
+    """One response's compressor: compress(chunk), flush() between chunks, finish()."""
+
+    def __init__(self, encoding):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.flush, self.finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)   # 31: gzip framing
+            self.compress, self.finish = compressor.compress, compressor.flush
+            self.flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def _stream(chunks, encoder):
+    for chunk in chunks:
+        # Flushed per chunk, so the client gets each one as soon as it is produced
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+def _compressible(response):
+    mimetype = response.mimetype or ''
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE or mimetype.endswith('+json')
+
+
+def init_app(app):
+    app.json = FastJSONProvider(app)
+
+    @app.after_request
+    def compress(response):
+        minimum = app.config['COMPRESS_MIN_BYTES']
+        if (minimum < 0 or response.status_code != 200 or request.method == 'HEAD'
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or not _compressible(response)):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(ENCODINGS)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            body = response.response
+            response.response = _stream(response.iter_encoded(), _Encoder(encoding))
+            if hasattr(body, 'close'):
+                response.call_on_close(body.close)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < minimum:
+                return response
+            encoder = _Encoder(encoding)
+            packed = encoder.compress(data) + encoder.finish()
+            if len(packed) >= len(data):
+                return response
+            response.set_data(packed)
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:   # the bytes differ from the unencoded ones
+            response.set_etag(etag, weak=True)
+        return response
+
+    return app
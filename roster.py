@@ -0,0 +1,230 @@
+"""Bulk class-roster import.
+
+A roster is a CSV file with a header row:
+
+    username,first_name,last_name,birth_day,birth_month,birth_year,gender,password[,class_name]
+
+Rows are read one at a time from the upload stream and validated as they
+arrive, so memory stays flat whatever the size of the file. Valid rows are
+grouped into batches: while one batch is inserted, the passwords of the next
+are bcrypt-hashed on a thread pool (bcrypt releases the GIL; OS threads even
+under gevent, see concurrency.py), and each batch
+is written by provisioning.provision_users in its own transaction. A batch
+that hits a username registered in the meantime is retried row by row, so a
+clash only fails that row.
+"""
+import codecs
+import csv
+import logging
+import os
+import time
+
+import mysql.connector
+from mysql.connector import errorcode
+
+import concurrency
+from provisioning import provision_user, provision_users
+
+log = logging.getLogger('app.roster')
+
+REQUIRED_COLUMNS = ('username', 'first_name', 'last_name', 'birth_day', 'birth_month',
+                    'birth_year', 'gender', 'password')
+MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July',
+          'August', 'September', 'October', 'November', 'December')
+GENDERS = ('male', 'female')
+
+BATCH_SIZE = int(os.getenv("ROSTER_BATCH_SIZE", 200))
+HASH_WORKERS = int(os.getenv("ROSTER_HASH_WORKERS", os.cpu_count() or 2))
+# Per-row errors kept in the report; the counts are always complete
+MAX_REPORTED_ERRORS = 500
+
+
+class RosterError(ValueError):
+    """The file as a whole cannot be imported (bad header, not UTF-8)."""
+
+
+class ImportReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, line, username, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'username': username, 'error': message})
+
+    def as_dict(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'failed': self.failed,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(self.rows / seconds, 1) if seconds else None,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def validate(row, class_name=None):
+    """Turn a CSV row into a provisioning dict (plain-text password); raises ValueError."""
+    user = {column: (row.get(column) or '').strip() for column in REQUIRED_COLUMNS}
+    user['password'] = row.get('password') or ''  # passwords are not trimmed
+    user['class_name'] = (row.get('class_name') or '').strip() or class_name
+
+    missing = [column for column in REQUIRED_COLUMNS if not user[column]]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}.")
+    if not 3 <= len(user['username']) <= 50:
+        raise ValueError('Username must be 3 to 50 characters.')
+    if len(user['password']) < 6:
+        raise ValueError('Password must be at least 6 characters.')
+    if not user['birth_day'].isdigit() or not 1 <= int(user['birth_day']) <= 31:
+        raise ValueError('birth_day must be a number from 1 to 31.')
+    month = user['birth_month'].capitalize()
+    if month not in MONTHS:
+        raise ValueError('birth_month must be a month name, e.g. January.')
+    user['birth_month'] = month
+    if not user['birth_year'].isdigit() or len(user['birth_year']) != 4:
+        raise ValueError('birth_year must be a four-digit year.')
+    user['gender'] = user['gender'].lower()
+    if user['gender'] not in GENDERS:
+        raise ValueError('gender must be male or female.')
+    if user['class_name'] and len(user['class_name']) > 64:
+        raise ValueError('class_name must be at most 64 characters.')
+    return user
+
+
+def _valid_rows(stream, report, class_name):
+    """Yield (line, user) for each valid row, recording the invalid ones."""
+    reader = csv.DictReader(codecs.getreader('utf-8-sig')(stream))
+    try:
+        header = [name.strip().lower() for name in reader.fieldnames or ()]
+    except UnicodeDecodeError:
+        raise RosterError('The roster must be a UTF-8 encoded CSV file.')
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise RosterError(f"The header row is missing: {', '.join(missing)}.")
+    reader.fieldnames = header
+
+    # MySQL compares usernames case-insensitively, so do the same within the file
+    seen = set()
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except UnicodeDecodeError:
+            raise RosterError(f"Line {reader.line_num + 1} is not valid UTF-8.")
+        except csv.Error as e:
+            raise RosterError(f"Line {reader.line_num}: {e}")
+        report.rows += 1
+        username = (row.get('username') or '').strip()
+        try:
+            if None in row:
+                raise ValueError('Too many fields.')
+            user = validate(row, class_name)
+            if username.lower() in seen:
+                raise ValueError('Username appears more than once in the file.')
+        except ValueError as e:
+            report.fail(reader.line_num, username, str(e))
+            continue
+        seen.add(username.lower())
+        yield reader.line_num, user
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _drop_existing(connection, batch, report):
+    """Fail rows whose username is already taken, before paying for their hash."""
+    cursor = connection.cursor()
+    try:
+        usernames = [user['username'] for _, user in batch]
+        cursor.execute(
+            f"SELECT username FROM users WHERE username IN ({', '.join(['%s'] * len(usernames))})",
+            usernames,
+        )
+        taken = {row[0].lower() for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+    kept = []
+    for line, user in batch:
+        if user['username'].lower() in taken:
+            report.fail(line, user['username'], 'Username already exists.')
+        else:
+            kept.append((line, user))
+    return kept
+
+
+def _insert(connection, batch, hashes, report):
+    users = []
+    for (_, user), hashed in zip(batch, hashes):
+        user['password'] = hashed.result()
+        users.append(user)
+
+    cursor = connection.cursor()
+    try:
+        try:
+            provision_users(cursor, users)
+            connection.commit()
+            report.created += len(users)
+            return
+        except mysql.connector.IntegrityError as e:
+            connection.rollback()
+            if e.errno != errorcode.ER_DUP_ENTRY:
+                raise
+
+        # Someone took one of the names since _drop_existing; isolate it
+        for line, user in batch:
+            try:
+                provision_user(cursor, user)
+                connection.commit()
+                report.created += 1
+            except mysql.connector.IntegrityError as e:
+                connection.rollback()
+                if e.errno != errorcode.ER_DUP_ENTRY:
+                    raise
+                report.fail(line, user['username'], 'Username already exists.')
+    finally:
+        cursor.close()
+
+
+def import_roster(stream, connection, hash_password, class_name=None,
+                  batch_size=BATCH_SIZE, workers=HASH_WORKERS):
+    """Import a roster CSV from a binary stream; returns the report dict.
+
+    ``hash_password`` maps a plain-text password to the stored hash and runs
+    on the worker pool. ``class_name`` is used for rows without their own.
+    Raises RosterError when the file cannot be read at all; rows already
+    committed by then stay committed.
+    """
+    report = ImportReport()
+    with concurrency.executor(workers, thread_name_prefix='roster-hash') as pool:
+        pending = None
+        for batch in _batches(_valid_rows(stream, report, class_name), batch_size):
+            batch = _drop_existing(connection, batch, report)
+            if not batch:
+                continue
+            hashes = [pool.submit(hash_password, user['password']) for _, user in batch]
+            if pending:
+                _insert(connection, *pending, report)
+            pending = (batch, hashes)
+        if pending:
+            _insert(connection, *pending, report)
+
+    result = report.as_dict()
+    log.info("Roster import: %d rows, %d created, %d failed in %.2fs",
+             result['rows'], result['created'], result['failed'], result['seconds'])
+    return result
@@ -0,0 +1,98 @@
+"""Server-side sessions in the shared state store (SESSION_STORE=state).
+
+Flask's default session is the whole dict in a signed cookie: it already works
+on any node that shares SECRET_KEY, but a copied cookie stays valid until it
+expires. With this interface the cookie only carries a signed random id and
+the contents live in the store (state.py) for PERMANENT_SESSION_LIFETIME, so
+logout on one node ends the session on every node. The store has to be shared
+by every worker: without STATE_URL the app passes the database backend.
+
+Login and a change of role start the session over under a new id
+(regenerate()), so an id planted in a browser before login (session fixation)
+never becomes a logged-in one.
+"""
+import secrets
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, URLSafeSerializer
+from werkzeug.datastructures import CallbackDict
+
+
+class StoredSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(session):
+            session.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.replaced = None   # the stored id this session had before regenerate()
+
+    def regenerate(self):
+        """Move to a new random id; the old one is deleted from the store when the session is saved."""
+        if not self.new and self.replaced is None:
+            self.replaced = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+
+def regenerate(session):
+    """Empty ``session`` and give it a new id, at login or when the user's privileges change.
+
+    Flask's cookie session has no id of its own, so emptying it is all it needs.
+    """
+    session.clear()
+    if isinstance(session, StoredSession):
+        session.regenerate()
+
+
+class StateSessionInterface(SessionInterface):
+    prefix = 'session:'
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return URLSafeSerializer(app.secret_key, salt='state-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).loads(cookie)
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.store.get(self.prefix + sid)
+                if data is not None:
+                    return StoredSession(data, sid=sid)
+        return StoredSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.replaced is not None:
+            self.store.delete(self.prefix + session.replaced)
+            session.replaced = None
+        if not session:
+            if session.modified:
+                self.store.delete(self.prefix + session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not (session.modified or self.should_set_cookie(app, session)):
+            return
+
+        self.store.set(self.prefix + session.sid, dict(session),
+                       ttl=app.permanent_session_lifetime.total_seconds())
+        response.set_cookie(
+            name, self._signer(app).dumps(session.sid),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+            domain=domain, path=path,
+        )
+        response.vary.add('Cookie')
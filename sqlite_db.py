@@ -0,0 +1,389 @@
+"""Embedded SQLite storage, for one classroom on one machine (DB_SQLITE_PATH).
+
+With DB_SQLITE_PATH=instance/thesis.db the app needs no MySQL server: the
+connections database.py hands out are adapters around ``sqlite3`` that look
+like mysql.connector ones to the routes. Each statement is translated once
+(translate(), cached) from the MySQL dialect the app is written in:
+
+    %s placeholders                     ?  (reordered/repeated where a rewrite moves them)
+    INSERT IGNORE                       INSERT OR IGNORE
+    ON DUPLICATE KEY UPDATE, VALUES(c)  ON CONFLICT DO UPDATE, excluded.c
+    UPDATE a JOIN b ON ... SET ...      UPDATE a SET ... FROM b WHERE ...
+    IF(), NOW(), <=>, GREATEST/LEAST    IIF(), CURRENT_TIMESTAMP, IS, MAX/MIN
+    SELECT ... FOR UPDATE               the transaction takes the write lock instead
+
+MySQL reports *changed* rows (the connector does not ask for found rows), and
+the routes rely on that: an upsert or update that leaves a row as it was
+counts 0. SQLite counts every row it touches, so translated updates and
+upserts only touch rows they would change. An upsert that does change a row
+counts 1 here, not 2 as in MySQL, and every caller only tells 0 apart from
+more. sqlite3 errors are raised as the matching mysql.connector errors (a
+unique key violation is an IntegrityError with errno ER_DUP_ENTRY), so the
+routes' error handling works unchanged.
+
+Statements run in autocommit mode until the first one that writes (or locks
+with FOR UPDATE). That one starts a BEGIN IMMEDIATE transaction, which holds
+the database's single write lock until commit() or rollback(). Readers never
+wait for it in WAL mode, and writers queue for up to busy_timeout.
+
+The schema is sqlite_schema.sql in migrations/, the state of every MySQL
+migration at once, plus the triggers MySQL gives for free (updated_at) or
+that analytics.py generates. ``python migrate.py`` (or AUTO_MIGRATE=1)
+creates it. A new migration has to be added there too. Needs SQLite 3.35 or
+newer (ON CONFLICT without a target, UPDATE ... FROM).
+"""
+import datetime
+import itertools
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import mysql.connector
+from mysql.connector import errorcode
+
+SCHEMA = Path(__file__).resolve().parent / 'migrations' / 'sqlite_schema.sql'
+
+# Applied to every new connection. WAL lets pages be read while a write is in
+# progress; NORMAL sync is safe in WAL mode (a power cut can lose the last
+# commits, never corrupt the file).
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",        # ms a writer waits for the write lock
+    "PRAGMA cache_size = -16000",        # 16 MB page cache per connection
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",      # read through a 256 MB memory map
+    "PRAGMA wal_autocheckpoint = 1000",
+)
+
+# DATETIME/TIMESTAMP columns come back as datetime, as they do from MySQL
+for _type in ('DATETIME', 'TIMESTAMP'):
+    sqlite3.register_converter(_type, lambda raw: datetime.datetime.fromisoformat(raw.decode()))
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+
+
+# --- Translating statements ---
+
+_MARK = re.compile(r'\x00(\d+)\x00')
+_FOR_UPDATE = re.compile(r'\s+FOR\s+UPDATE\s*$', re.I)
+_WORDS = [
+    (re.compile(r'\bINSERT\s+IGNORE\b', re.I), 'INSERT OR IGNORE'),
+    (re.compile(r'\bIF\s*\(', re.I), 'IIF('),
+    (re.compile(r'\bNOW\(\)', re.I), 'CURRENT_TIMESTAMP'),
+    (re.compile(r'\bGREATEST\s*\(', re.I), 'MAX('),
+    (re.compile(r'\bLEAST\s*\(', re.I), 'MIN('),
+    (re.compile(r'<=>'), ' IS '),
+]
+_VALUES = re.compile(r'\bVALUES\s*\(\s*(\w+)\s*\)', re.I)   # VALUES(column) of an ON DUPLICATE KEY list
+_UPDATE = re.compile(
+    r'^\s*UPDATE\s+(?P<table>\w+)(?:\s+(?:AS\s+)?(?!JOIN\b|SET\b)(?P<alias>\w+))?'
+    r'(?:\s+JOIN\s+(?P<source>\w+)(?:\s+(?:AS\s+)?(?!ON\b)(?P<source_alias>\w+))?\s+ON\s+)?',
+    re.I | re.S)
+_WRITES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER')
+
+
+def _scan(text):
+    """(index, char) of the characters outside quotes and parentheses."""
+    depth, quote = 0, None
+    for index, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '\'"`':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0:
+            yield index, char
+
+
+def _split_commas(text):
+    parts, start = [], 0
+    for index, char in _scan(text):
+        if char == ',':
+            parts.append(text[start:index].strip())
+            start = index + 1
+    parts.append(text[start:].strip())
+    return parts
+
+
+def _keyword(text, word):
+    """Index of the first ``word`` (a regex) outside quotes and parentheses, or -1."""
+    pattern = re.compile(rf'\b{word}\b', re.I)
+    top = {index for index, _ in _scan(text)}
+    for match in pattern.finditer(text):
+        if match.start() in top:
+            return match.start()
+    return -1
+
+
+def _assignments(text):
+    """[(column, expression)] of a SET list."""
+    pairs = []
+    for part in _split_commas(text):
+        column, _, expression = part.partition('=')
+        pairs.append((column.strip(), expression.strip()))
+    return pairs
+
+
+def _changes(pairs):
+    """Predicate that holds when the assignments would change the row."""
+    return ' OR '.join(f'{column} IS NOT ({expression})' for column, expression in pairs)
+
+
+def _set_list(pairs):
+    return ', '.join(f"{column.rpartition('.')[2]} = {expression}" for column, expression in pairs)
+
+
+def _upsert(statement):
+    at = _keyword(statement, r'ON\s+DUPLICATE\s+KEY\s+UPDATE')
+    if at < 0:
+        return statement
+    insert, updates = statement[:at].rstrip(), statement[at:].split(None, 4)[4]
+    pairs = [(column, _VALUES.sub(r'excluded.\1', expression)) for column, expression in _assignments(updates)]
+    select = _keyword(insert, 'SELECT')
+    if select >= 0 and _keyword(insert[select:], 'WHERE') < 0:
+        insert += ' WHERE true'   # or SQLite reads ON CONFLICT as a join condition
+    return f"{insert} ON CONFLICT DO UPDATE SET {_set_list(pairs)} WHERE {_changes(pairs)}"
+
+
+def _update(statement):
+    match = _UPDATE.match(statement)
+    if match is None:
+        return statement
+    rest, target = statement[match.end():], match['table']
+    if match['alias']:   # no alias on the updated table inside a trigger
+        rest = re.sub(rf"\b{match['alias']}\.", f'{target}.', rest)
+    conditions = []
+    if match['source']:
+        at = _keyword(rest, 'SET')
+        conditions.append(f'({rest[:at].strip()})')
+        rest = rest[at:]
+    elif not re.match(r'\s*SET\b', rest, re.I):
+        return statement
+    rest = re.sub(r'^\s*SET\s+', '', rest, flags=re.I)
+    at = _keyword(rest, 'WHERE')
+    sets, where = (rest[:at], rest[at + 5:]) if at >= 0 else (rest, '')
+    pairs = _assignments(sets)
+    if where.strip():
+        conditions.append(f'({where.strip()})')
+    conditions.append(f'({_changes(pairs)})')
+    source = ''
+    if match['source']:
+        source = f" FROM {match['source']}" + (f" AS {match['source_alias']}" if match['source_alias'] else '')
+    return f"UPDATE {target} SET {_set_list(pairs)}{source} WHERE {' AND '.join(conditions)}"
+
+
+@lru_cache(maxsize=1024)
+def translate(statement):
+    """(SQLite statement, parameter order or None, whether it writes) for a MySQL one."""
+    count = itertools.count()
+    marked = re.sub(r'%s', lambda _: f'\x00{next(count)}\x00', statement)
+    locks = bool(_FOR_UPDATE.search(marked))
+    marked = _FOR_UPDATE.sub('', marked)
+    for pattern, replacement in _WORDS:
+        marked = pattern.sub(replacement, marked)
+    verb = marked.lstrip().split(None, 1)[0].upper() if marked.strip() else ''
+    if verb == 'INSERT':
+        marked = _upsert(marked)
+    elif verb == 'UPDATE':
+        marked = _update(marked)
+    order = tuple(int(index) for index in _MARK.findall(marked))
+    if order == tuple(range(len(order))):
+        order = None
+    return _MARK.sub('?', marked), order, locks or verb in _WRITES
+
+
+def _reorder(order, params):
+    if order is None or params is None:
+        return params if params is not None else ()
+    params = list(params)
+    return [params[index] for index in order]
+
+
+# --- Errors ---
+
+def _mysql_error(error):
+    """The mysql.connector error the routes expect for a sqlite3 one."""
+    message = str(error)
+    if isinstance(error, sqlite3.IntegrityError):
+        errno = errorcode.ER_DUP_ENTRY if 'UNIQUE' in message or 'PRIMARY KEY' in message else None
+        return mysql.connector.IntegrityError(msg=message, errno=errno)
+    if isinstance(error, sqlite3.OperationalError):
+        errno = errorcode.ER_LOCK_WAIT_TIMEOUT if 'locked' in message or 'busy' in message else None
+        return mysql.connector.OperationalError(msg=message, errno=errno)
+    if isinstance(error, sqlite3.ProgrammingError):
+        return mysql.connector.ProgrammingError(msg=message)
+    if isinstance(error, sqlite3.DataError):
+        return mysql.connector.DataError(msg=message)
+    return mysql.connector.DatabaseError(msg=message)
+
+
+# --- Connections ---
+
+class Cursor:
+    """A sqlite3 cursor that takes MySQL statements; ``dictionary=True`` rows are dicts."""
+
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection.raw.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        if isinstance(operation, bytes):
+            operation = operation.decode()
+        sql, order, writes = translate(operation)
+        try:
+            if writes:
+                self._connection.begin()
+            self._cursor.execute(sql, _reorder(order, params))
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        sql, order, writes = translate(operation)
+        try:
+            if writes:
+                self._connection.begin()
+            self._cursor.executemany(sql, (_reorder(order, params) for params in seq_params))
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip((column[0] for column in self._cursor.description), row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def with_rows(self):
+        return self._cursor.description is not None
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    """One sqlite3 connection with the mysql.connector methods the app calls."""
+
+    def __init__(self, raw, pool=None):
+        self.raw = raw
+        self._pool = pool
+
+    def cursor(self, dictionary=False, **kwargs):
+        return Cursor(self, dictionary=dictionary)
+
+    @property
+    def in_transaction(self):
+        return self.raw.in_transaction
+
+    def begin(self):
+        if not self.raw.in_transaction:
+            self.raw.execute("BEGIN IMMEDIATE")
+
+    start_transaction = begin
+
+    def commit(self):
+        try:
+            if self.raw.in_transaction:
+                self.raw.execute("COMMIT")
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def rollback(self):
+        if self.raw.in_transaction:
+            self.raw.execute("ROLLBACK")
+
+    def ping(self, *args, **kwargs):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        """Back to the pool (a transaction left open is rolled back), or closed."""
+        self.rollback()
+        if self._pool is None or not self._pool.put(self):
+            self.raw.close()
+
+
+def connect(path):
+    raw = sqlite3.connect(path, isolation_level=None, check_same_thread=False,
+                          detect_types=sqlite3.PARSE_DECLTYPES)
+    for pragma in PRAGMAS:
+        raw.execute(pragma)
+    return Connection(raw)
+
+
+class Pool:
+    """Idle connections for reuse, so the pragmas run once per connection; never runs out."""
+
+    def __init__(self, path, size=10):
+        self.path = path
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def get_connection(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        connection = connect(self.path)
+        connection._pool = self
+        return connection
+
+    def put(self, connection):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(connection)
+                return True
+        return False
+
+
+# --- Schema ---
+
+def create_schema(connection):
+    """Create every table, index and trigger that is missing (safe to run again)."""
+    import analytics
+
+    connection.rollback()
+    connection.raw.executescript(SCHEMA.read_text(encoding='utf-8'))
+    cursor = connection.cursor()
+    try:
+        for statement in analytics.sqlite_trigger_statements():
+            cursor.execute(statement)
+        connection.commit()
+    finally:
+        cursor.close()
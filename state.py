@@ -0,0 +1,387 @@
+"""Shared state for running several app processes or hosts behind a load balancer.
+
+One store per process, chosen by STATE_URL:
+
+    (unset)              MemoryBackend: a dict in this process (development,
+                         a single worker), at most STATE_MAX_KEYS keys
+    redis://host:6379/0  RedisBackend: any server speaking the Redis protocol
+                         (Redis, Valkey, KeyDB, ...); needs ``pip install redis``
+
+Idempotency keys and rate limit counters only work if every worker sees the
+same ones. Without a shared store they go to a DatabaseBackend (the state_keys
+table) instead; see extensions.get_keys.
+
+Values are JSON. On top of the store:
+
+    Cache        read-through cache with a short-lived local copy per process;
+                 invalidate() deletes the shared entry and broadcasts the key so
+                 every other node drops its local copy too. Over a
+                 MemoryBackend, entries only live as long as those local copies.
+    allow()      fixed-window rate limit counters
+    add()        set-if-absent, for claiming a key once (idempotency keys)
+    publish() / subscribe()
+                 fire-and-forget messages to the other nodes (a node never
+                 receives its own); the leaderboards use them to apply each
+                 other's updates
+
+Keys and channels are prefixed with STATE_PREFIX (default "thesis:") so
+several apps can share one server.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+log = logging.getLogger('app.state')
+
+EVENTS = 'events'
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'))
+
+
+class _Dispatcher:
+    """Routes incoming broadcast messages to the local subscribers of their channel."""
+
+    def __init__(self, node):
+        self.node = node
+        self._handlers = {}
+        self._lock = threading.Lock()
+
+    def add(self, channel, callback):
+        with self._lock:
+            self._handlers.setdefault(channel, []).append(callback)
+
+    def dispatch(self, raw):
+        try:
+            envelope = json.loads(raw)
+        except ValueError:
+            log.warning("ignoring malformed state message")
+            return
+        if envelope.get('node') == self.node:
+            return
+        for callback in self._handlers.get(envelope.get('channel'), ()):
+            try:
+                callback(envelope.get('data'))
+            except Exception:
+                log.exception("state subscriber for %s failed", envelope.get('channel'))
+
+
+class MemoryBackend:
+    """Everything in one process; publish() reaches nobody, as there are no other nodes.
+
+    Holds at most ``max_keys`` keys: a new key beyond that first clears out the
+    expired ones, then the oldest until a tenth of the room is free again.
+    """
+    shared = False
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._data = {}   # key -> (json, expires_at or None), oldest first
+        self._lock = threading.Lock()
+
+    def _make_room(self, key, now):
+        if key in self._data or len(self._data) < self.max_keys:
+            return
+        for old in [old for old, item in self._data.items() if item[1] is not None and item[1] <= now]:
+            del self._data[old]
+        while len(self._data) > self.max_keys - max(1, self.max_keys // 10):
+            del self._data[next(iter(self._data))]
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= now:
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key, time.monotonic())
+        return json.loads(item[0]) if item is not None else None
+
+    def set(self, key, value, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            self._make_room(key, now)
+            self._data.pop(key, None)
+            self._data[key] = (_dumps(value), now + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        """set() only when ``key`` does not exist; True when it was stored."""
+        now = time.monotonic()
+        with self._lock:
+            if self._live(key, now) is not None:
+                return False
+            self._make_room(key, now)
+            self._data[key] = (_dumps(value), now + ttl if ttl else None)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key, ttl):
+        """Add one to the counter at ``key``, created with a lifetime of ``ttl`` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._live(key, now)
+            if item is None:
+                self._make_room(key, now)
+            count = int(item[0]) + 1 if item is not None else 1
+            self._data[key] = (str(count), item[1] if item is not None else now + ttl)
+        return count
+
+    def publish(self, channel, message):
+        pass
+
+    def subscribe(self, channel, callback):
+        pass
+
+
+class RedisBackend:
+    """A Redis-protocol server shared by every node; the client connects on first use."""
+    shared = True
+
+    def __init__(self, url, prefix='thesis:'):
+        import redis
+
+        self.prefix = prefix
+        self.node = uuid.uuid4().hex[:12]
+        self._client = redis.Redis.from_url(url)
+        self._dispatcher = _Dispatcher(self.node)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, _dumps(value), px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self._client.set(self.prefix + key, _dumps(value), px=int(ttl * 1000) if ttl else None, nx=True))
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+
+    def incr(self, key, ttl):
+        key = self.prefix + key
+        pipe = self._client.pipeline()
+        pipe.incr(key)
+        pipe.pttl(key)
+        count, remaining = pipe.execute()
+        if remaining < 0:   # new counter (or one that lost its expiry)
+            self._client.pexpire(key, int(ttl * 1000))
+        return count
+
+    def publish(self, channel, message):
+        self._client.publish(self.prefix + EVENTS, _dumps({'node': self.node, 'channel': channel, 'data': message}))
+
+    def subscribe(self, channel, callback):
+        """Register ``callback(data)``; the listener thread starts with the first subscription."""
+        self._dispatcher.add(channel, callback)
+        with self._lock:
+            if self._listener is None:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.prefix + EVENTS: lambda message: self._dispatcher.dispatch(message['data'])})
+                self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True,
+                                                      exception_handler=self._listener_failed)
+
+    @staticmethod
+    def _listener_failed(error, pubsub, thread):
+        # The pubsub connection re-subscribes when it reconnects; keep the thread alive
+        log.warning("state listener: %s; retrying", error)
+        time.sleep(1.0)
+
+
+class DatabaseBackend:
+    """Keys in the app's database (state_keys), seen by every worker without a shared store.
+
+    The key/value half of the store interface only: there are no messages, so
+    it is no store for Cache or the leaderboards. Every statement is its own
+    short transaction on a connection from ``connect()`` (database.connection),
+    so two workers claiming one key never hold locks the other waits for.
+    Expired keys are deleted every PRUNE_SECONDS. Unlike the other stores,
+    incr() does not restart a counter that has expired but is not deleted yet;
+    rate limit keys name their window, so none is used again.
+    """
+    PRUNE_SECONDS = 60
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._pruned = 0.0
+
+    def _execute(self, sql, params, fetch=False):
+        """Run one statement and commit; the first row with ``fetch``, otherwise the row count."""
+        connection = self._connect()
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(sql, params)
+                result = cursor.fetchone() if fetch else cursor.rowcount
+            finally:
+                cursor.close()
+            connection.commit()
+            return result
+        finally:
+            connection.close()
+
+    def _prune(self, now):
+        if now - self._pruned < self.PRUNE_SECONDS:
+            return
+        self._pruned = now
+        try:
+            self._execute("DELETE FROM state_keys WHERE expires_at <= %s", (now,))
+        except Exception:
+            log.exception("could not delete expired state keys")
+
+    def get(self, key):
+        row = self._execute("SELECT value FROM state_keys WHERE name = %s AND (expires_at IS NULL OR expires_at > %s)",
+                            (key, time.time()), fetch=True)
+        return json.loads(row[0]) if row is not None and row[0] is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._execute("""
+            INSERT INTO state_keys (name, value, counter, expires_at) VALUES (%s, %s, 0, %s)
+            ON DUPLICATE KEY UPDATE value = VALUES(value), counter = 0, expires_at = VALUES(expires_at)
+        """, (key, _dumps(value), time.time() + ttl if ttl else None))
+
+    def add(self, key, value, ttl=None):
+        """set() only when ``key`` does not exist (or has expired); True when it was stored."""
+        now = time.time()
+        self._prune(now)
+        expires_at = now + ttl if ttl else None
+        if self._execute("INSERT IGNORE INTO state_keys (name, value, counter, expires_at) VALUES (%s, %s, 0, %s)",
+                         (key, _dumps(value), expires_at)):
+            return True
+        # Take over an expired key; of two workers doing so at once, the second updates nothing
+        return self._execute("UPDATE state_keys SET value = %s, counter = 0, expires_at = %s "
+                             "WHERE name = %s AND expires_at <= %s",
+                             (_dumps(value), expires_at, key, now)) == 1
+
+    def delete(self, *keys):
+        if keys:
+            self._execute(f"DELETE FROM state_keys WHERE name IN ({', '.join(['%s'] * len(keys))})", keys)
+
+    def incr(self, key, ttl):
+        """Add one to the counter at ``key``, created with a lifetime of ``ttl`` seconds."""
+        now = time.time()
+        self._prune(now)
+        connection = self._connect()
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("""
+                    INSERT INTO state_keys (name, counter, expires_at) VALUES (%s, 1, %s)
+                    ON DUPLICATE KEY UPDATE counter = counter + 1
+                """, (key, now + ttl))
+                # The row stays locked until commit, so this is the count after our own hit
+                cursor.execute("SELECT counter FROM state_keys WHERE name = %s", (key,))
+                count = cursor.fetchone()[0]
+            finally:
+                cursor.close()
+            connection.commit()
+            return count
+        finally:
+            connection.close()
+
+
+def from_env():
+    url = os.getenv('STATE_URL')
+    if not url:
+        return MemoryBackend(max_keys=int(os.getenv('STATE_MAX_KEYS', 100000)))
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url, prefix=os.getenv('STATE_PREFIX', 'thesis:'))
+    raise ValueError(f"STATE_URL must be a redis:// URL, not {url!r}")
+
+
+class Cache:
+    """Read-through cache of JSON values (None is never cached).
+
+    With a shared store each process also keeps a local copy for up to
+    ``local_ttl`` seconds, so hot keys cost no round trip; invalidate() tells
+    the other nodes to drop theirs, and ``local_ttl`` bounds how stale a copy
+    can get if such a message is lost. A store that is not shared is itself
+    such a copy: the other worker processes of a server have their own, and
+    invalidate() only clears this one. Its entries expire after ``local_ttl``
+    too, whatever ``ttl`` asks for.
+    """
+
+    def __init__(self, store, name, ttl=300, local_ttl=5, local_size=10000):
+        self.store = store
+        self.name = name
+        self.ttl = ttl if store.shared else min(ttl, local_ttl)
+        self.local_ttl = local_ttl if store.shared else 0
+        self.local_size = local_size
+        self._local = {}   # key -> (value, expires_at)
+        self._subscribed = False
+        self._lock = threading.Lock()
+
+    def _key(self, key):
+        return f'cache:{self.name}:{key}'
+
+    def get(self, key, load):
+        """The cached value of ``key``, computing and storing ``load()`` on a miss."""
+        key = str(key)
+        if self.local_ttl:
+            item = self._local.get(key)
+            if item is not None and item[1] > time.monotonic():
+                return item[0]
+        value = self.store.get(self._key(key))
+        if value is None:
+            value = load()
+            if value is None:
+                return None
+            self.store.set(self._key(key), value, self.ttl)
+        if self.local_ttl:
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store a value the caller has just loaded, replacing any cached one."""
+        key = str(key)
+        self.store.set(self._key(key), value, self.ttl)
+        if self.local_ttl:
+            self._remember(key, value)
+
+    def peek(self, key):
+        """The cached value of ``key`` without loading it; None on a miss."""
+        key = str(key)
+        if self.local_ttl:
+            item = self._local.get(key)
+            if item is not None and item[1] > time.monotonic():
+                return item[0]
+        return self.store.get(self._key(key))
+
+    def _remember(self, key, value):
+        with self._lock:
+            if not self._subscribed:
+                self.store.subscribe('invalidate', self._invalidated)
+                self._subscribed = True
+            if len(self._local) >= self.local_size:
+                self._local.clear()
+            self._local[key] = (value, time.monotonic() + self.local_ttl)
+
+    def _invalidated(self, message):
+        if message.get('cache') == self.name:
+            self._local.pop(message.get('key'), None)
+
+    def invalidate(self, key):
+        key = str(key)
+        self._local.pop(key, None)
+        self.store.delete(self._key(key))
+        if self.store.shared:
+            self.store.publish('invalidate', {'cache': self.name, 'key': key})
+
+
+def allow(store, key, limit, window):
+    """Count one hit on ``key``; False once it has more than ``limit`` hits in the current ``window`` seconds."""
+    bucket = int(time.time() // window)
+    return store.incr(f'rate:{key}:{bucket}', window) <= limit
@@ -0,0 +1,26 @@
+// Claims that are safe to retry on a flaky connection: every attempt of one claim
+// sends the same Idempotency-Key, so the server applies it once and answers the
+// repeats with the first result (no need to ask "already claimed?" beforehand).
+function postClaim(url, body, attempts = 3) {
+  const key = (window.crypto && crypto.randomUUID)
+    ? crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+  const retry = (left) => new Promise(resolve => setTimeout(resolve, 500 * (attempts - left + 1)))
+    .then(() => send(left - 1));
+
+  const send = (left) => fetch(url, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'Idempotency-Key': key },
+    body: JSON.stringify(body)
+  }).then(res => {
+    // 409: the first attempt is still running on the server
+    if ((res.status >= 500 || res.status === 409) && left > 1) return retry(left);
+    return res.json();
+  }, err => {
+    if (left > 1) return retry(left);
+    throw err;
+  });
+
+  return send(attempts);
+}
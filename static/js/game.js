@@ -1316,62 +1316,39 @@ function showVictoryScreen() {
           [badgeElement, titleElement, borderElement].forEach(el => el?.classList.add('hidden'));
           document.getElementById('reward-claimed-text')?.remove();
 
-          // Check if the reward has already been claimed
-          fetch('/check_reward_claimed', {
-              method: 'POST',
-              headers: { 'Content-Type': 'application/json' },
-              body: JSON.stringify({
-                  map: selectedMap,
-                  stage: selectedStage
-              })
+          // Claim the reward; the answer says whether it had been claimed before
+          postClaim('/claim_reward', {
+              map: selectedMap,
+              stage: selectedStage
           })
-          .then(res => res.json())
           .then(data => {
-              console.log("Reward claim status:", data);
+              console.log("Reward claim result:", data);
               const rewardStatusText = document.createElement('div');
               rewardStatusText.id = "reward-claimed-text";
               rewardStatusText.className = "reward-claimed-text fade-in";
 
               if (data.error) {
-                  console.warn('Reward check failed:', data.error);
+                  console.warn('Reward claim failed:', data.error);
                   rewardStatusText.textContent = "⚠️ Unable to verify reward.";
                   victoryBox.appendChild(rewardStatusText);
                   return;
               }
 
-              if (data.claimed) {
+              if (data.already_claimed) {
                   rewardStatusText.textContent = "🎉 Reward Claimed!";
                   victoryBox.appendChild(rewardStatusText);
-              } else {
-                  if (selectedStage === 1 && badgeElement) {
-                      badgeElement.src = badge;
-                      badgeElement.classList.remove('hidden');
-                  } else if (selectedStage === 2 && titleElement) {
-                      titleElement.src = title;
-                      titleElement.classList.remove('hidden');
-                  } else if (selectedStage === 3 && borderElement) {
-                      borderElement.src = border;
-                      borderElement.classList.remove('hidden');
-                  }
-
-                  fetch('/claim_reward', {
-                      method: 'POST',
-                      headers: { 'Content-Type': 'application/json' },
-                      body: JSON.stringify({
-                          map: selectedMap,
-                          stage: selectedStage
-                      })
-                  })
-                  .then(res => res.json())
-                  .then(() => {
-                      console.log("Reward claimed successfully");
-                  })
-                  .catch(err => {
-                      console.warn('Claim reward failed:', err.message);
-                  });
+              } else if (selectedStage === 1 && badgeElement) {
+                  badgeElement.src = badge;
+                  badgeElement.classList.remove('hidden');
+              } else if (selectedStage === 2 && titleElement) {
+                  titleElement.src = title;
+                  titleElement.classList.remove('hidden');
+              } else if (selectedStage === 3 && borderElement) {
+                  borderElement.src = border;
+                  borderElement.classList.remove('hidden');
               }
           })
-          .catch(err => console.error('Error checking reward:', err));
+          .catch(err => console.warn('Claim reward failed:', err.message));
       })
       .catch(err => console.error('Error fetching stage reward:', err));
 